@@ -0,0 +1,37 @@
+# Agregação dos lançamentos: soma dos valores agrupados por uma chave, em uma
+# única passada pela lista. Usado pelo comparativo de despesas, pela tabela
+# de despesas por categoria do relatório e pelo comparativo de cartões.
+#
+# A chave pode ser o nome de um campo ('descricao', 'cartao') ou uma função
+# que recebe o item e devolve o grupo (ver chave_cartao). Itens
+# cujo grupo é None ficam de fora.
+
+# {grupo: total} dos itens
+def agrupar(itens, chave, campo_valor='valor'):
+    totais = {}
+    if callable(chave):
+        for item in itens:
+            grupo = chave(item)
+            if grupo is not None:
+                totais[grupo] = totais.get(grupo, 0) + item[campo_valor]
+    else:
+        for item in itens:
+            grupo = item[chave]
+            totais[grupo] = totais.get(grupo, 0) + item[campo_valor]
+    return totais
+
+# Agrupa uma lista de cada mês. 'meses_dados' é {(ano, mes): dados do mês};
+# devolve {(ano, mes): {grupo: total}}.
+def agrupar_meses(meses_dados, lista, chave, campo_valor='valor'):
+    return {ano_mes: agrupar(dados[lista], chave, campo_valor) for ano_mes, dados in meses_dados.items()}
+
+# Chave que agrupa despesas pelo cartão citado na descrição
+# ("Cartão X - Parcela 1/3: ..."). Despesas sem cartão ficam de fora.
+def chave_cartao(cartoes):
+    def cartao_do_item(item):
+        descricao = item['descricao']
+        for cartao in cartoes:
+            if cartao in descricao:
+                return cartao
+        return None
+    return cartao_do_item
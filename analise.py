@@ -0,0 +1,162 @@
+# Análises de tendência sobre todos os meses gravados, com NumPy: médias
+# móveis, variação em relação ao mesmo mês do ano anterior, crescimento por
+# categoria e taxa de poupança, em qualquer intervalo de meses.
+#
+# Os lançamentos viram colunas (arrays) com um elemento por lançamento:
+#   mes        índice do mês: ano * 12 + (mes - 1)
+#   tipo       ENTRADAS, DESPESAS ou INVESTIMENTOS
+#   categoria  código da descrição (o nome está em colunas['categorias'])
+#   valor      valor em centavos
+# e as contas são feitas sobre as colunas inteiras, sem laços em Python. As
+# colunas de cada mês são guardadas e só refeitas quando o mês muda, então
+# atualizar a análise de dez anos relê só os meses alterados.
+import numpy as np
+import orcamento_core as core
+
+TIPOS = ('entradas', 'despesas', 'investimentos')
+ENTRADAS, DESPESAS, INVESTIMENTOS = 0, 1, 2
+
+_codigos_categorias = {}  # descrição -> código
+_nomes_categorias = []    # código -> descrição
+_colunas_meses = {}       # (ano, mes) -> (versão do mês, colunas do mês)
+
+def indice_mes(ano, mes):
+    return ano * 12 + (mes - 1)
+
+def mes_do_indice(indice):
+    ano, mes = divmod(int(indice), 12)
+    return ano, mes + 1
+
+def _codigo_categoria(descricao):
+    codigo = _codigos_categorias.get(descricao)
+    if codigo is None:
+        codigo = len(_nomes_categorias)
+        _codigos_categorias[descricao] = codigo
+        _nomes_categorias.append(descricao)
+    return codigo
+
+def _colunas_do_mes(ano, mes):
+    chave = (ano, mes)
+    versao = core.versao_mes(ano, mes)
+    entrada = _colunas_meses.get(chave)
+    if versao is not None and entrada is not None and entrada[0] == versao:
+        return entrada[1]
+    dados = core.carregar_dados(ano, mes, somente_leitura=True)
+    tipos, categorias, valores = [], [], []
+    for tipo, lista in enumerate(TIPOS):
+        for item in dados[lista]:
+            tipos.append(tipo)
+            categorias.append(_codigo_categoria(item['descricao']))
+            valores.append(item['valor'])
+    colunas = (np.array(tipos, dtype=np.int8),
+               np.array(categorias, dtype=np.int32),
+               np.array(valores, dtype=np.int64))
+    # A versão lida antes da leitura: se o mês mudou no meio, a próxima
+    # chamada não a reconhece e as colunas são refeitas. Meses com alterações
+    # ainda em memória (versão None) são sempre refeitos.
+    _colunas_meses[chave] = (versao, colunas)
+    return colunas
+
+# Colunas de todos os meses entre 'inicio' e 'fim' ((ano, mes), inclusive;
+# None = sem limite).
+def carregar_colunas(inicio=None, fim=None):
+    partes = []
+    for ano, mes in core.listar_meses():
+        if (inicio is not None and (ano, mes) < inicio) or (fim is not None and (ano, mes) > fim):
+            continue
+        tipos, categorias, valores = _colunas_do_mes(ano, mes)
+        partes.append((indice_mes(ano, mes), tipos, categorias, valores))
+    if not partes:
+        vazio = np.zeros(0, dtype=np.int64)
+        return {'mes': vazio.astype(np.int32), 'tipo': vazio.astype(np.int8), 'categoria': vazio.astype(np.int32),
+                'valor': vazio, 'categorias': list(_nomes_categorias)}
+    return {
+        'mes': np.concatenate([np.full(len(p[1]), p[0], dtype=np.int32) for p in partes]),
+        'tipo': np.concatenate([p[1] for p in partes]),
+        'categoria': np.concatenate([p[2] for p in partes]),
+        'valor': np.concatenate([p[3] for p in partes]),
+        'categorias': list(_nomes_categorias),
+    }
+
+# Total de cada mês de 'inicio' a 'fim' (índices de mês, inclusive) para um
+# tipo de lançamento, em centavos. Meses sem lançamentos dão zero.
+def serie_mensal(colunas, tipo, inicio, fim, categoria=None):
+    mascara = (colunas['tipo'] == tipo) & (colunas['mes'] >= inicio) & (colunas['mes'] <= fim)
+    if categoria is not None:
+        mascara &= colunas['categoria'] == categoria
+    # bincount soma em float64, exato para totais abaixo de 2**53 centavos
+    somas = np.bincount(colunas['mes'][mascara] - inicio, weights=colunas['valor'][mascara], minlength=fim - inicio + 1)
+    return np.rint(somas).astype(np.int64)
+
+# Média dos últimos 'janela' meses para cada posição da série; as primeiras
+# janela - 1 posições ficam NaN.
+def media_movel(serie, janela):
+    resultado = np.full(len(serie), np.nan)
+    if janela <= 0 or len(serie) < janela:
+        return resultado
+    acumulado = np.cumsum(np.concatenate(([0], serie)).astype(np.float64))
+    resultado[janela - 1:] = (acumulado[janela:] - acumulado[:-janela]) / janela
+    return resultado
+
+# Diferença para o mesmo mês do ano anterior, em valor e em %. As primeiras
+# 12 posições (sem mês correspondente na série) ficam NaN.
+def variacao_anual(serie):
+    serie = serie.astype(np.float64)
+    delta = np.full(len(serie), np.nan)
+    pct = np.full(len(serie), np.nan)
+    if len(serie) > 12:
+        delta[12:] = serie[12:] - serie[:-12]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct[12:] = np.where(serie[:-12] > 0, delta[12:] / serie[:-12] * 100, np.nan)
+    return delta, pct
+
+# Parte das entradas que não foi gasta, em %; NaN nos meses sem entradas
+def taxa_poupanca(entradas, despesas):
+    entradas = entradas.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(entradas > 0, (entradas - despesas) / entradas * 100, np.nan)
+
+# Despesas de cada categoria nos últimos 'meses' meses até 'fim' contra os
+# 'meses' meses anteriores. Devolve [(categoria, atual, anterior, pct)]
+# ordenado pelo valor atual; pct é None quando não havia gasto antes.
+def crescimento_por_categoria(colunas, fim, meses=12):
+    quantidade = len(colunas['categorias'])
+    despesas = colunas['tipo'] == DESPESAS
+    atual_mascara = despesas & (colunas['mes'] > fim - meses) & (colunas['mes'] <= fim)
+    anterior_mascara = despesas & (colunas['mes'] > fim - 2 * meses) & (colunas['mes'] <= fim - meses)
+    atual = np.rint(np.bincount(colunas['categoria'][atual_mascara], weights=colunas['valor'][atual_mascara], minlength=quantidade)).astype(np.int64)
+    anterior = np.rint(np.bincount(colunas['categoria'][anterior_mascara], weights=colunas['valor'][anterior_mascara], minlength=quantidade)).astype(np.int64)
+    usados = np.flatnonzero((atual != 0) | (anterior != 0))
+    usados = usados[np.argsort(-atual[usados], kind='stable')]
+    resultado = []
+    for codigo in usados:
+        pct = float((atual[codigo] - anterior[codigo]) / anterior[codigo] * 100) if anterior[codigo] > 0 else None
+        resultado.append((colunas['categorias'][codigo], int(atual[codigo]), int(anterior[codigo]), pct))
+    return resultado
+
+# Tudo o que a aba de análises mostra, de 'inicio' a 'fim' ((ano, mes)).
+# Os meses anteriores ao início necessários para a média móvel e para a
+# variação anual também são lidos.
+def analisar(inicio, fim, janela=3, meses_crescimento=12):
+    indice_inicio, indice_fim = indice_mes(*inicio), indice_mes(*fim)
+    if indice_fim < indice_inicio:
+        raise ValueError("O mês final deve ser igual ou posterior ao inicial.")
+    recuo = max(12, janela - 1, 2 * meses_crescimento - 1 - (indice_fim - indice_inicio))
+    colunas = carregar_colunas(mes_do_indice(indice_inicio - recuo), fim)
+    primeiro = indice_inicio - recuo
+    series = {tipo: serie_mensal(colunas, codigo, primeiro, indice_fim) for codigo, tipo in enumerate(TIPOS)}
+    media_despesas = media_movel(series['despesas'], janela)
+    delta_despesas, pct_despesas = variacao_anual(series['despesas'])
+    poupanca = taxa_poupanca(series['entradas'], series['despesas'])
+    corte = slice(recuo, None)
+    return {
+        'meses': [mes_do_indice(i) for i in range(indice_inicio, indice_fim + 1)],
+        'entradas': series['entradas'][corte],
+        'despesas': series['despesas'][corte],
+        'investimentos': series['investimentos'][corte],
+        'media_despesas': media_despesas[corte],
+        'variacao_anual_despesas': delta_despesas[corte],
+        'variacao_anual_despesas_pct': pct_despesas[corte],
+        'taxa_poupanca': poupanca[corte],
+        'categorias': crescimento_por_categoria(colunas, indice_fim, meses_crescimento),
+    }
@@ -0,0 +1,317 @@
+# Armazenamento dos meses em um banco SQLite, alternativa ao arquivo JSON por
+# mês. Para usar: ORCAMENTO_BACKEND=sqlite. Para migrar os meses existentes:
+#
+#     python armazenamento_sqlite.py [diretorio_dos_json]
+#
+# Cada lista do mês (inclusive os movimentos entre contas) vira uma tabela com
+# uma linha por lançamento, indexada por (ano, mes, descricao), e os saldos
+# iniciais informados ficam em saldos_iniciais, uma linha por conta. Campos
+# que não têm coluna própria são guardados em 'extras' (JSON), para que nada
+# se perca se o formato do mês ganhar campos.
+#
+# Além de ler e gravar meses, o banco responde às consultas entre meses do
+# núcleo (totais_meses, fluxos_meses) com uma consulta agregada por intervalo,
+# sem montar os meses em Python.
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+# Colunas fixas de cada tabela de lançamentos (além de ano, mes, posicao, extras)
+COLUNAS = {
+    'entradas': ['descricao', 'valor', 'observacoes', 'data'],
+    'despesas': ['descricao', 'valor', 'observacoes', 'data'],
+    'investimentos': ['descricao', 'valor', 'observacoes', 'data'],
+    'cartoes_parcelados': ['cartao', 'descricao', 'valor_total', 'valor_parcela', 'num_parcelas',
+                           'parcelas_restantes', 'ano_vencimento', 'mes_vencimento', 'data_registro'],
+    'movimentos': ['descricao', 'de', 'para', 'valor', 'data'],
+}
+
+# Versão do esquema (PRAGMA user_version). Na versão 0 os movimentos e os
+# saldos iniciais ficavam dentro de meses.extras.
+VERSAO_ESQUEMA = 1
+
+# As consultas entre meses só respondem por meses já no formato de dados 3
+# (core.FORMATO_DADOS: centavos, saldos derivados dos lançamentos); os meses
+# mais antigos o núcleo converte ao ler.
+FORMATO_CONSULTAS = 3
+CONTA_CORRENTE = 'conta_corrente'
+
+def _criar_esquema(conexao):
+    conexao.execute('''CREATE TABLE IF NOT EXISTS meses (
+        ano INTEGER NOT NULL,
+        mes INTEGER NOT NULL,
+        versao INTEGER NOT NULL DEFAULT 0,
+        extras TEXT,
+        PRIMARY KEY (ano, mes))''')
+    for tabela, colunas in COLUNAS.items():
+        conexao.execute(f'''CREATE TABLE IF NOT EXISTS {tabela} (
+            id INTEGER PRIMARY KEY,
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            posicao INTEGER NOT NULL,
+            {', '.join(colunas)},
+            extras TEXT)''')
+        conexao.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_mes ON {tabela} (ano, mes, descricao)')
+    # Saldo inicial informado de cada conta no mês ('conta_corrente' ou o tipo
+    # do investimento), em centavos
+    conexao.execute('''CREATE TABLE IF NOT EXISTS saldos_iniciais (
+        ano INTEGER NOT NULL,
+        mes INTEGER NOT NULL,
+        conta TEXT NOT NULL,
+        valor INTEGER NOT NULL,
+        PRIMARY KEY (ano, mes, conta))''')
+    # Resumo de cada mês (JSON), válido enquanto 'versao' for a mesma do mês
+    conexao.execute('''CREATE TABLE IF NOT EXISTS resumos (
+        ano INTEGER NOT NULL,
+        mes INTEGER NOT NULL,
+        versao INTEGER NOT NULL,
+        conteudo TEXT NOT NULL,
+        PRIMARY KEY (ano, mes))''')
+    if conexao.execute('PRAGMA user_version').fetchone()[0] < 1:
+        # Movimentos e saldos iniciais saem de meses.extras para as tabelas
+        meses = conexao.execute('SELECT ano, mes, extras FROM meses WHERE extras IS NOT NULL').fetchall()
+        for ano, mes, extras in meses:
+            extras = json.loads(extras)
+            if 'movimentos' not in extras and 'saldo_inicial' not in extras:
+                continue
+            _gravar_lista(conexao, 'movimentos', ano, mes, extras.pop('movimentos', []))
+            _gravar_saldos_iniciais(conexao, ano, mes, extras.pop('saldo_inicial', {}))
+            conexao.execute('UPDATE meses SET extras = ? WHERE ano = ? AND mes = ?',
+                            (json.dumps(extras) if extras else None, ano, mes))
+    conexao.execute(f'PRAGMA user_version = {VERSAO_ESQUEMA}')
+
+def _gravar_lista(conexao, tabela, ano, mes, itens):
+    colunas = COLUNAS[tabela]
+    conexao.execute(f'DELETE FROM {tabela} WHERE ano = ? AND mes = ?', (ano, mes))
+    linhas = []
+    for posicao, item in enumerate(itens):
+        extras = {chave: valor for chave, valor in item.items() if chave not in colunas}
+        linhas.append((ano, mes, posicao, *(item.get(coluna) for coluna in colunas),
+                       json.dumps(extras) if extras else None))
+    marcadores = ', '.join('?' * (len(colunas) + 4))
+    conexao.executemany(
+        f'INSERT INTO {tabela} (ano, mes, posicao, {", ".join(colunas)}, extras) VALUES ({marcadores})', linhas)
+
+def _gravar_saldos_iniciais(conexao, ano, mes, saldos):
+    conexao.execute('DELETE FROM saldos_iniciais WHERE ano = ? AND mes = ?', (ano, mes))
+    conexao.executemany('INSERT INTO saldos_iniciais (ano, mes, conta, valor) VALUES (?, ?, ?, ?)',
+                        [(ano, mes, conta, valor) for conta, valor in saldos.items()])
+
+# Caixas guardados pelos meses anteriores ao formato 3 (categoria:
+# 'conta_corrente' ou 'investimentos'; nome: tipo do investimento). A coluna
+# 'valor' é REAL porque no formato 1 os caixas eram reais em float. A tabela
+# só existe enquanto houver meses antigos: ela não é criada em bancos novos,
+# cada mês antigo é convertido pelo núcleo ao ser lido (core.migrar_saldos) e
+# regravado sem caixas, e quando não sobra nenhuma linha a tabela é removida.
+# Para converter todos de uma vez: python orcamento_core.py reconstruir-resumos
+ESQUEMA_CAIXAS = '''CREATE TABLE IF NOT EXISTS caixas (
+    ano INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    categoria TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    valor REAL NOT NULL,
+    PRIMARY KEY (ano, mes, categoria, nome))'''
+
+def _tem_caixas(conexao):
+    return conexao.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'caixas'").fetchone() is not None
+
+# Remove a tabela de caixas se nenhum mês antigo usa mais
+def _remover_caixas_vazia(conexao):
+    if _tem_caixas(conexao) and conexao.execute('SELECT 1 FROM caixas LIMIT 1').fetchone() is None:
+        conexao.execute('DROP TABLE caixas')
+
+class ArmazenamentoSQLite:
+    def __init__(self, caminho_banco):
+        self.caminho_banco = caminho_banco
+        # A mesma conexão é usada pela interface e pela thread de gravação
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_banco, check_same_thread=False)
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        with self._conexao:
+            _criar_esquema(self._conexao)
+            _remover_caixas_vazia(self._conexao)
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+    def assinatura(self, ano, mes):
+        with self._lock:
+            linha = self._conexao.execute('SELECT versao FROM meses WHERE ano = ? AND mes = ?', (ano, mes)).fetchone()
+        return linha[0] if linha else None
+
+    def ler_mes(self, ano, mes):
+        with self._lock:
+            linha = self._conexao.execute('SELECT extras FROM meses WHERE ano = ? AND mes = ?', (ano, mes)).fetchone()
+            if linha is None:
+                return None
+            dados = json.loads(linha[0]) if linha[0] else {}
+            for tabela, colunas in COLUNAS.items():
+                cursor = self._conexao.execute(
+                    f'SELECT {", ".join(colunas)}, extras FROM {tabela} WHERE ano = ? AND mes = ? ORDER BY posicao',
+                    (ano, mes))
+                itens = []
+                for registro in cursor:
+                    item = {coluna: valor for coluna, valor in zip(colunas, registro) if valor is not None}
+                    if registro[-1]:
+                        item.update(json.loads(registro[-1]))
+                    itens.append(item)
+                if itens or tabela not in dados:
+                    dados[tabela] = itens
+            saldos = self._conexao.execute(
+                'SELECT conta, valor FROM saldos_iniciais WHERE ano = ? AND mes = ? ORDER BY rowid', (ano, mes)).fetchall()
+            if saldos:
+                dados['saldo_inicial'] = dict(saldos)
+            # Desde o formato 3 os meses não guardam caixas (só os antigos têm linhas)
+            linhas_caixas = []
+            if _tem_caixas(self._conexao):
+                linhas_caixas = self._conexao.execute(
+                    'SELECT categoria, nome, valor FROM caixas WHERE ano = ? AND mes = ? ORDER BY rowid', (ano, mes)).fetchall()
+            if linhas_caixas:
+                caixas = {'conta_corrente': 0.0, 'investimentos': {}}
+                for categoria, nome, valor in linhas_caixas:
+                    if categoria == 'conta_corrente':
+                        caixas['conta_corrente'] = valor
+                    else:
+                        caixas['investimentos'][nome] = valor
+                if dados.get('formato', 1) >= 2:
+                    # A coluna 'valor' de caixas é REAL e devolve float; desde o
+                    # formato 2 os saldos são centavos inteiros
+                    caixas['conta_corrente'] = int(caixas['conta_corrente'])
+                    caixas['investimentos'] = {nome: int(valor) for nome, valor in caixas['investimentos'].items()}
+                dados['caixas'] = caixas
+        return dados
+
+    # Grava todos os meses (e seus resumos) em uma única transação do banco:
+    # ou todos, ou nenhum
+    def gravar_meses(self, meses_dados, resumos=None):
+        with self._lock, self._conexao:
+            for (ano, mes), dados in meses_dados.items():
+                self._gravar_mes(ano, mes, dados)
+                if resumos and (ano, mes) in resumos:
+                    self._conexao.execute(
+                        '''INSERT OR REPLACE INTO resumos (ano, mes, versao, conteudo)
+                           SELECT ano, mes, versao, ? FROM meses WHERE ano = ? AND mes = ?''',
+                        (json.dumps(resumos[(ano, mes)]), ano, mes))
+            _remover_caixas_vazia(self._conexao)
+
+    def ler_resumo(self, ano, mes):
+        with self._lock:
+            linha = self._conexao.execute(
+                '''SELECT r.conteudo FROM resumos r JOIN meses m ON m.ano = r.ano AND m.mes = r.mes
+                   WHERE r.ano = ? AND r.mes = ? AND r.versao = m.versao''', (ano, mes)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def _gravar_mes(self, ano, mes, dados):
+        conexao = self._conexao
+        extras_mes = {chave: valor for chave, valor in dados.items() if chave not in COLUNAS and chave not in ('caixas', 'saldo_inicial')}
+        conexao.execute('''INSERT INTO meses (ano, mes, versao, extras) VALUES (?, ?, 1, ?)
+            ON CONFLICT (ano, mes) DO UPDATE SET versao = versao + 1, extras = excluded.extras''',
+            (ano, mes, json.dumps(extras_mes) if extras_mes else None))
+        for tabela in COLUNAS:
+            _gravar_lista(conexao, tabela, ano, mes, dados.get(tabela, []))
+        _gravar_saldos_iniciais(conexao, ano, mes, dados.get('saldo_inicial', {}))
+        if _tem_caixas(conexao):
+            conexao.execute('DELETE FROM caixas WHERE ano = ? AND mes = ?', (ano, mes))
+        if 'caixas' in dados:
+            conexao.execute(ESQUEMA_CAIXAS)
+            caixas = dados['caixas']
+            linhas = [(ano, mes, 'conta_corrente', '', caixas.get('conta_corrente', 0.0))]
+            linhas += [(ano, mes, 'investimentos', nome, valor) for nome, valor in caixas.get('investimentos', {}).items()]
+            conexao.executemany('INSERT INTO caixas (ano, mes, categoria, nome, valor) VALUES (?, ?, ?, ?, ?)', linhas)
+
+    def listar_meses(self):
+        with self._lock:
+            return [tuple(linha) for linha in self._conexao.execute('SELECT ano, mes FROM meses ORDER BY ano, mes')]
+
+    # Condição e parâmetros para as linhas de (inicio, fim), inclusive, na tabela 'apelido'
+    @staticmethod
+    def _intervalo(apelido, inicio, fim):
+        return f'({apelido}.ano, {apelido}.mes) BETWEEN (?, ?) AND (?, ?)', (*inicio, *fim)
+
+    # Meses de 'inicio' a 'fim' que as consultas entre meses respondem
+    def _meses_consultaveis(self, inicio, fim):
+        condicao, parametros = self._intervalo('m', inicio, fim)
+        cursor = self._conexao.execute(
+            f"SELECT ano, mes FROM meses m WHERE {condicao} AND json_extract(m.extras, '$.formato') >= ?",
+            (*parametros, FORMATO_CONSULTAS))
+        return [tuple(linha) for linha in cursor]
+
+    # Total de entradas, despesas e investimentos de cada mês de 'inicio' a
+    # 'fim' ((ano, mes), inclusive), somado pelo banco, em centavos.
+    # Devolve {(ano, mes): {'entradas', 'despesas', 'investimentos'}}; meses
+    # em formatos antigos ficam de fora.
+    def totais_meses(self, inicio, fim):
+        condicao, parametros = self._intervalo('t', inicio, fim)
+        with self._lock:
+            totais = {chave: {'entradas': 0, 'despesas': 0, 'investimentos': 0} for chave in self._meses_consultaveis(inicio, fim)}
+            cursor = self._conexao.execute(' UNION ALL '.join(
+                f"SELECT t.ano, t.mes, '{tabela}', SUM(t.valor) FROM {tabela} t WHERE {condicao} GROUP BY t.ano, t.mes"
+                for tabela in ('entradas', 'despesas', 'investimentos')), parametros * 3)
+            for ano, mes, tabela, total in cursor:
+                if (ano, mes) in totais:
+                    totais[(ano, mes)][tabela] = total
+        return totais
+
+    # Fluxo de cada mês de 'inicio' a 'fim' ((ano, mes), inclusive), somado
+    # pelo banco: {(ano, mes): {'movimento': {conta: total}, 'saldo_inicial':
+    # {conta: valor}}}, como core.calcular_fluxo. Lançamentos com 'sem_caixa'
+    # não contam; meses em formatos antigos ficam de fora.
+    def fluxos_meses(self, inicio, fim):
+        condicao, parametros = self._intervalo('t', inicio, fim)
+        com_caixa = "COALESCE(json_extract(t.extras, '$.sem_caixa'), 0) = 0"
+        partes = [
+            f"SELECT t.ano, t.mes, '{CONTA_CORRENTE}' AS conta, t.valor AS valor FROM entradas t WHERE {condicao} AND {com_caixa}",
+            f"SELECT t.ano, t.mes, '{CONTA_CORRENTE}', -t.valor FROM despesas t WHERE {condicao} AND {com_caixa}",
+            f"SELECT t.ano, t.mes, '{CONTA_CORRENTE}', -t.valor FROM investimentos t WHERE {condicao} AND {com_caixa}",
+            f"SELECT t.ano, t.mes, t.descricao, t.valor FROM investimentos t WHERE {condicao} AND {com_caixa}",
+            f"SELECT t.ano, t.mes, t.de, -t.valor FROM movimentos t WHERE {condicao}",
+            f"SELECT t.ano, t.mes, t.para, t.valor FROM movimentos t WHERE {condicao}",
+        ]
+        with self._lock:
+            fluxos = {chave: {'movimento': {}, 'saldo_inicial': {}} for chave in self._meses_consultaveis(inicio, fim)}
+            cursor = self._conexao.execute(
+                f"SELECT ano, mes, conta, SUM(valor) FROM ({' UNION ALL '.join(partes)}) "
+                "GROUP BY ano, mes, conta", parametros * len(partes))
+            for ano, mes, conta, total in cursor:
+                if (ano, mes) in fluxos:
+                    fluxos[(ano, mes)]['movimento'][conta] = total
+            cursor = self._conexao.execute(
+                f'SELECT t.ano, t.mes, t.conta, t.valor FROM saldos_iniciais t WHERE {condicao} ORDER BY t.rowid', parametros)
+            for ano, mes, conta, valor in cursor:
+                if (ano, mes) in fluxos:
+                    fluxos[(ano, mes)]['saldo_inicial'][conta] = valor
+        return fluxos
+
+PADRAO_ARQUIVO_JSON = re.compile(r'^data_orcamento_(\d{4})_(\d{2})\.json$')
+
+# Copia todos os meses em JSON de 'diretorio_json' para o banco, em uma única
+# transação. Arquivos que não puderem ser lidos são ignorados e listados no retorno.
+def importar_json(diretorio_json, caminho_banco):
+    meses_dados = {}
+    ignorados = []
+    for nome in sorted(os.listdir(diretorio_json)):
+        encontrado = PADRAO_ARQUIVO_JSON.match(nome)
+        if not encontrado:
+            continue
+        try:
+            with open(os.path.join(diretorio_json, nome), 'r') as f:
+                meses_dados[(int(encontrado.group(1)), int(encontrado.group(2)))] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            ignorados.append(nome)
+    armazenamento = ArmazenamentoSQLite(caminho_banco)
+    try:
+        armazenamento.gravar_meses(meses_dados)
+    finally:
+        armazenamento.fechar()
+    return len(meses_dados), ignorados
+
+if __name__ == '__main__':
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else 'data'
+    importados, ignorados = importar_json(diretorio, os.path.join(diretorio, 'orcamento.db'))
+    print(f"{importados} mês(es) importado(s) para {os.path.join(diretorio, 'orcamento.db')}")
+    for nome in ignorados:
+        print(f"Ignorado (arquivo inválido): {nome}")
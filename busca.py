@@ -0,0 +1,243 @@
+# Busca de lançamentos em todos os meses, para responder "quando paguei o
+# dentista pela última vez?" ou "quanto gastei no pet shop em 2025?" sem abrir
+# mês por mês.
+#
+# A busca é pelo texto da descrição (categoria), das observações e do nome do
+# cartão, sem diferenciar acentos e maiúsculas, e cada palavra digitada vale
+# como começo de palavra ('dent' acha 'Dentista'; 'pet sh' acha 'Pet Shop').
+# Os resultados podem ser filtrados por tipo, por valor e por período (meses
+# de/até), e vêm do mês mais recente para o mais antigo.
+#
+# O índice invertido (palavra -> lançamentos) fica em DATA_DIR/indice_busca/,
+# um arquivo por mês (AAAA_MM.json) com a versão do mês (core.versao_mes), os
+# lançamentos e as palavras de cada um. Ao abrir, só os meses cuja versão
+# mudou são reindexados; depois disso o índice é avisado de cada mês alterado
+# (core.ao_alterar_mes) e só esses meses são reindexados, na busca seguinte.
+import os
+import re
+import json
+import bisect
+import threading
+import orcamento_core as core
+
+VERSAO_INDICE = 1
+TIPOS = ('entradas', 'despesas', 'investimentos', 'cartoes_parcelados')
+LIMITE_RESULTADOS = 500
+PADRAO_PALAVRA = re.compile(r'\w+')
+PADRAO_ARQUIVO = re.compile(r'^(\d{4})_(\d{2})\.json$')
+
+# Campos de cada lançamento guardado no índice
+ID, TIPO, DESCRICAO, VALOR, OBSERVACOES, DATA, CARTAO = range(7)
+
+_cartao_da_despesa = core.chave_cartao(core.CARTOES)
+
+# 'Pão de Açúcar' -> ['PAO', 'DE', 'ACUCAR']
+def palavras(texto):
+    return PADRAO_PALAVRA.findall(core.normalizar_texto(texto or ''))
+
+# Lançamentos de um mês como ficam no índice: [id, tipo, descrição, valor,
+# observações, data, cartão]. Das faturas parceladas entram o valor total e a
+# data da compra.
+def _lancamentos_mes(dados):
+    lancamentos = []
+    for tipo in TIPOS:
+        for item in dados[tipo]:
+            if tipo == 'cartoes_parcelados':
+                lancamentos.append([item['id'], tipo, item['descricao'], item['valor_total'], '',
+                                    item.get('data_registro', ''), item['cartao']])
+            else:
+                cartao = _cartao_da_despesa(item) if tipo == 'despesas' else None
+                lancamentos.append([item['id'], tipo, item['descricao'], item['valor'], item.get('observacoes', ''),
+                                    item.get('data', ''), cartao])
+    return lancamentos
+
+# {palavra: [posição do lançamento]} de um mês
+def _palavras_mes(lancamentos):
+    indice = {}
+    for posicao, lancamento in enumerate(lancamentos):
+        for palavra in set(palavras(lancamento[DESCRICAO]) + palavras(lancamento[OBSERVACOES]) + palavras(lancamento[CARTAO])):
+            indice.setdefault(palavra, []).append(posicao)
+    return indice
+
+# Versão do mês como fica no JSON (tuplas viram listas)
+def _versao(ano, mes):
+    return json.loads(json.dumps(core.versao_mes(ano, mes)))
+
+class IndiceBusca:
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.meses = {}           # (ano, mes) -> {'versao', 'lancamentos', 'palavras'}
+        self.ocorrencias = {}     # palavra -> {(ano, mes): [posições]}
+        self.ordenadas = []       # palavras em ordem, para achar as que começam com um prefixo
+        self.ordenadas_em_dia = True
+        self._lock_anotacoes = threading.Lock()   # só protege as anotações abaixo
+        self._lock_atualizacao = threading.Lock()  # uma atualização por vez
+        self.conferir_todos = True  # ao abrir, confere a versão de todos os meses
+        self.alterados = set()
+        self.nao_gravados = set()   # meses indexados com alterações ainda não gravadas
+        os.makedirs(diretorio, exist_ok=True)
+        self._ler_arquivos()
+
+    def caminho(self, ano, mes):
+        return os.path.join(self.diretorio, f'{ano}_{mes:02d}.json')
+
+    def _ler_arquivos(self):
+        for nome in os.listdir(self.diretorio):
+            encontrado = PADRAO_ARQUIVO.match(nome)
+            if not encontrado:
+                continue
+            try:
+                with open(os.path.join(self.diretorio, nome), 'r', encoding='utf-8') as f:
+                    indice_mes = json.load(f)
+            except (OSError, ValueError):
+                continue  # reindexado na conferência
+            if indice_mes.get('versao_indice') == VERSAO_INDICE:
+                self._incluir((int(encontrado.group(1)), int(encontrado.group(2))), indice_mes)
+
+    def _incluir(self, chave, indice_mes):
+        self.meses[chave] = indice_mes
+        for palavra, posicoes in indice_mes['palavras'].items():
+            if palavra not in self.ocorrencias:
+                self.ocorrencias[palavra] = {}
+                self.ordenadas_em_dia = False
+            self.ocorrencias[palavra][chave] = posicoes
+
+    def _retirar(self, chave):
+        indice_mes = self.meses.pop(chave, None)
+        if indice_mes is None:
+            return
+        for palavra in indice_mes['palavras']:
+            ocorrencias = self.ocorrencias[palavra]
+            del ocorrencias[chave]
+            if not ocorrencias:
+                del self.ocorrencias[palavra]
+                self.ordenadas_em_dia = False
+
+    def _gravar(self, chave):
+        indice_mes = self.meses[chave]
+        core.gravar_arquivo_atomico(self.caminho(*chave), json.dumps(dict(indice_mes, versao_indice=VERSAO_INDICE)))
+
+    # Chamada pelo núcleo quando um mês muda (ver core.ao_alterar_mes)
+    def anotar(self, ano, mes):
+        with self._lock_anotacoes:
+            if ano is None:
+                self.conferir_todos = True
+            else:
+                self.alterados.add((ano, mes))
+
+    def _reindexar(self, chave):
+        # A versão é lida antes do mês: se ele mudar no meio, o aviso do
+        # núcleo faz com que seja reindexado de novo
+        versao = _versao(*chave)
+        lancamentos = _lancamentos_mes(core.carregar_dados(*chave, somente_leitura=True))
+        self._retirar(chave)
+        self._incluir(chave, {'versao': versao, 'lancamentos': lancamentos, 'palavras': _palavras_mes(lancamentos)})
+        if versao is None:
+            # Alterações ainda em memória: o arquivo é gravado quando o mês for
+            self.nao_gravados.add(chave)
+        else:
+            self.nao_gravados.discard(chave)
+            self._gravar(chave)
+
+    # Reindexa os meses alterados desde a última atualização
+    def atualizar(self):
+        with self._lock_atualizacao:
+            with self._lock_anotacoes:
+                conferir_todos, self.conferir_todos = self.conferir_todos, False
+                alterados, self.alterados = self.alterados, set()
+            if conferir_todos:
+                existentes = core.listar_meses()
+                for chave in set(self.meses) - set(existentes):
+                    self._retirar(chave)
+                    self.nao_gravados.discard(chave)
+                    try:
+                        os.remove(self.caminho(*chave))
+                    except OSError:
+                        pass
+                alterados |= {chave for chave in existentes
+                              if chave not in self.meses or self.meses[chave]['versao'] != _versao(*chave)}
+            for chave in sorted(alterados):
+                self._reindexar(chave)
+            for chave in list(self.nao_gravados - alterados):
+                versao = _versao(*chave)
+                if versao is not None:
+                    self.meses[chave]['versao'] = versao
+                    self.nao_gravados.discard(chave)
+                    self._gravar(chave)
+            if not self.ordenadas_em_dia:
+                self.ordenadas = sorted(self.ocorrencias)
+                self.ordenadas_em_dia = True
+
+    # {(ano, mes): set(posições)} dos lançamentos com alguma palavra que começa com 'prefixo'
+    def _com_prefixo(self, prefixo, meses_validos):
+        encontrados = {}
+        i = bisect.bisect_left(self.ordenadas, prefixo)
+        while i < len(self.ordenadas) and self.ordenadas[i].startswith(prefixo):
+            for chave, posicoes in self.ocorrencias[self.ordenadas[i]].items():
+                if chave in meses_validos:
+                    encontrados.setdefault(chave, set()).update(posicoes)
+            i += 1
+        return encontrados
+
+    def buscar(self, texto='', tipos=None, valor_minimo=None, valor_maximo=None, inicio=None, fim=None, limite=LIMITE_RESULTADOS):
+        self.atualizar()
+        meses_validos = {chave for chave in self.meses
+                         if (inicio is None or chave >= inicio) and (fim is None or chave <= fim)}
+        consulta = palavras(texto)
+        if consulta:
+            # Lançamentos que têm todas as palavras da consulta
+            candidatos = self._com_prefixo(consulta[0], meses_validos)
+            for prefixo in consulta[1:]:
+                encontrados = self._com_prefixo(prefixo, set(candidatos))
+                candidatos = {chave: posicoes & encontrados[chave] for chave, posicoes in candidatos.items() if chave in encontrados}
+        else:
+            candidatos = {chave: range(len(self.meses[chave]['lancamentos'])) for chave in meses_validos}
+        resultados = []
+        for chave in sorted(candidatos, reverse=True):
+            lancamentos = self.meses[chave]['lancamentos']
+            encontrados = []
+            for posicao in candidatos[chave]:
+                lancamento = lancamentos[posicao]
+                if ((tipos is None or lancamento[TIPO] in tipos)
+                        and (valor_minimo is None or lancamento[VALOR] >= valor_minimo)
+                        and (valor_maximo is None or lancamento[VALOR] <= valor_maximo)):
+                    encontrados.append(lancamento)
+            encontrados.sort(key=lambda lancamento: lancamento[DATA], reverse=True)
+            resultados.extend((chave, lancamento) for lancamento in encontrados)
+        return {
+            'total': len(resultados),
+            'soma': sum(lancamento[VALOR] for _, lancamento in resultados),
+            'resultados': [{'ano': ano, 'mes': mes, 'id': lancamento[ID], 'tipo': lancamento[TIPO],
+                            'descricao': lancamento[DESCRICAO], 'valor': lancamento[VALOR],
+                            'observacoes': lancamento[OBSERVACOES], 'data': lancamento[DATA], 'cartao': lancamento[CARTAO]}
+                           for (ano, mes), lancamento in resultados[:limite]],
+        }
+
+# --- Índice da pasta de dados atual ---
+_indice = None
+_lock_indice = threading.Lock()
+
+def indice():
+    global _indice
+    diretorio = os.path.join(core.DATA_DIR, 'indice_busca')
+    with _lock_indice:
+        if _indice is None or _indice.diretorio != diretorio:
+            _indice = IndiceBusca(diretorio)
+        return _indice
+
+def _anotar(ano, mes):
+    if _indice is not None:
+        _indice.anotar(ano, mes)
+
+core.ao_alterar_mes(_anotar)
+
+# Lançamentos de todos os meses com todas as palavras de 'texto' (começo de
+# palavra, sem acentos), dos 'tipos' pedidos (padrão: todos), com valor entre
+# valor_minimo e valor_maximo (centavos) e no período de 'inicio' a 'fim'
+# ((ano, mes), inclusive). Texto vazio traz tudo o que passa nos filtros.
+# Devolve {'total', 'soma', 'resultados'}, com no máximo 'limite' resultados
+# (dicionários com ano, mes, id, tipo, descricao, valor, observacoes, data e
+# cartao), do mês mais recente para o mais antigo; 'total' e 'soma' contam
+# todos os encontrados.
+def buscar(texto='', tipos=None, valor_minimo=None, valor_maximo=None, inicio=None, fim=None, limite=LIMITE_RESULTADOS):
+    return indice().buscar(texto, tipos, valor_minimo, valor_maximo, inicio, fim, limite)
@@ -0,0 +1,286 @@
+# Linha de comando do gerenciador financeiro, para scripts e tarefas
+# agendadas (cron, Agendador de Tarefas). Usa o núcleo (orcamento_core) sem
+# abrir a interface e responde sempre em JSON na saída padrão:
+#     {"ok": true, "resultado": ...}   ou   {"ok": false, "erro": "..."}
+# (código de saída 1 em caso de erro). Valores em dinheiro saem em centavos.
+#
+#     python cli_orcamento.py transacao --tipo despesas --descricao Aluguel --valor 1.500,00 --mes 2025-03
+#     python cli_orcamento.py resumo --mes 2025-03
+#     python cli_orcamento.py totais --de 2025-01 --ate 2025-12
+#     python cli_orcamento.py lote lancamentos.jsonl     (ou "-" para ler da entrada padrão)
+#
+# No lote cada linha é um objeto JSON com o comando e os mesmos campos das
+# opções (com _ no lugar de -), por exemplo:
+#     {"comando": "transacao", "tipo": "despesas", "descricao": "Aluguel", "valor": "1.500,00", "mes": "2025-03"}
+# Valores podem ser texto no formato brasileiro ("1.500,00") ou inteiros em
+# centavos (150000). O lote inteiro é aplicado com uma leitura e uma
+# gravação por mês afetado; se uma linha falhar, nada é gravado.
+import sys
+import json
+import argparse
+from datetime import datetime
+import orcamento_core as core
+
+COMANDOS_LOTE = ('transacao', 'investimento', 'resgate', 'parcelada', 'conta-corrente')
+
+class ErroComando(Exception):
+    pass
+
+# 'AAAA-MM' -> (ano, mes); None -> mês atual
+def _mes(texto):
+    if texto is None:
+        agora = datetime.now()
+        return agora.year, agora.month
+    try:
+        ano, mes = (int(parte) for parte in str(texto).split('-'))
+    except ValueError:
+        raise ErroComando(f"Mês inválido: {texto!r} (use AAAA-MM)")
+    if not 1 <= mes <= 12:
+        raise ErroComando(f"Mês inválido: {texto!r} (use AAAA-MM)")
+    return ano, mes
+
+# Texto no formato brasileiro ou inteiro em centavos -> centavos
+def _valor(valor):
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+        raise ErroComando(f"Valor inválido: {valor!r} (use texto como \"1.234,56\" ou inteiro em centavos)")
+    if isinstance(valor, int):
+        return valor
+    try:
+        return core.converter_valor(valor)
+    except ValueError as e:
+        raise ErroComando(str(e))
+
+def _campo(parametros, nome):
+    try:
+        return parametros[nome]
+    except KeyError:
+        raise ErroComando(f"Campo obrigatório ausente: {nome!r}")
+
+# --- Comandos ---
+# Cada um recebe um dicionário com os campos e devolve o resultado (JSON)
+
+# Com 'pular_repetido', um lançamento igual a outro já feito hoje no mês não
+# é adicionado de novo (o resultado é {"repetido": true})
+def comando_transacao(p):
+    ano, mes = _mes(p.get('mes'))
+    tipo, descricao, valor, observacoes = _campo(p, 'tipo'), _campo(p, 'descricao'), _valor(_campo(p, 'valor')), p.get('observacoes') or ''
+    if p.get('pular_repetido') and core.transacao_repetida(tipo, descricao, valor, observacoes, ano, mes):
+        return {'repetido': True}
+    return core.adicionar_transacao(tipo, descricao, valor, observacoes, ano, mes, atualizar_caixas=not p.get('sem_caixa', False))
+
+def comando_investimento(p):
+    ano, mes = _mes(p.get('mes'))
+    return core.adicionar_investimento(_campo(p, 'nome'), _valor(_campo(p, 'valor')), p.get('observacoes') or '',
+                                       ano, mes, atualizar_caixas=not p.get('sem_caixa', False))
+
+def comando_resgate(p):
+    ano, mes = _mes(p.get('mes'))
+    core.resgatar_investimento(_campo(p, 'nome'), _valor(_campo(p, 'valor')), ano, mes)
+    return core.saldos_mes(ano, mes)['fechamento']
+
+def comando_parcelada(p):
+    ano, mes = _mes(_campo(p, 'vencimento'))
+    try:
+        parcelas = int(_campo(p, 'parcelas'))
+    except (TypeError, ValueError):
+        raise ErroComando(f"Número de parcelas inválido: {p['parcelas']!r}")
+    valor_total = _valor(_campo(p, 'valor_total'))
+    core.adicionar_fatura_parcelada(_campo(p, 'cartao'), _campo(p, 'descricao'), valor_total, parcelas, ano, mes)
+    return {'parcelas': core.dividir_parcelas(valor_total, parcelas),
+            'meses': [f"{a}-{m:02d}" for a, m in (core.somar_meses(ano, mes, i) for i in range(parcelas))]}
+
+def comando_conta_corrente(p):
+    ano, mes = _mes(p.get('mes'))
+    core.definir_conta_corrente(_valor(_campo(p, 'valor')), ano, mes)
+    return core.saldos_mes(ano, mes)['fechamento']
+
+def comando_resumo(p):
+    ano, mes = _mes(p.get('mes'))
+    resumo = core.resumo_mes(ano, mes)
+    resumo['mes'] = f"{ano}-{mes:02d}"
+    resumo['despesas_por_categoria'] = core.despesas_por_categoria(ano, mes)
+    return resumo
+
+def comando_relatorio(p):
+    import relatorio
+    inicio = _mes(p.get('inicio'))
+    fim = _mes(p['fim']) if p.get('fim') else inicio
+    try:
+        return relatorio.exportar_relatorios(inicio, fim, p.get('destino'), bool(p.get('combinado')), p.get('processos'))
+    except ValueError as e:
+        raise ErroComando(str(e))
+
+# Totais de cada mês de 'de' a 'ate' (padrão: os 12 meses até o mês atual)
+def comando_totais(p):
+    fim = _mes(p.get('ate'))
+    inicio = _mes(p['de']) if p.get('de') else core.somar_meses(*fim, -11)
+    if inicio > fim:
+        raise ErroComando("O mês inicial deve ser anterior ou igual ao final.")
+    return {f"{ano}-{mes:02d}": totais for (ano, mes), totais in core.totais_meses(inicio, fim).items()}
+
+def comando_reconstruir_resumos(p):
+    return {'meses': core.reconstruir_resumos()}
+
+# Linhas JSON de 'arquivo' aplicadas num único LoteOperacoes
+def comando_lote(p):
+    caminho = p.get('arquivo') or '-'
+    entrada = sys.stdin if caminho == '-' else open(caminho, encoding='utf-8')
+    resultados = []
+    numero = 0
+    try:
+        with core.LoteOperacoes() as lote:
+            for numero, linha in enumerate(entrada, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    parametros = json.loads(linha)
+                    if not isinstance(parametros, dict):
+                        raise ErroComando("Cada linha deve ser um objeto JSON.")
+                    comando = _campo(parametros, 'comando')
+                    if comando not in COMANDOS_LOTE:
+                        raise ErroComando(f"Comando inválido no lote: {comando!r} (use {', '.join(COMANDOS_LOTE)})")
+                    resultados.append(COMANDOS[comando](parametros))
+                except (ErroComando, ValueError) as e:
+                    raise ErroComando(f"Linha {numero}: {e}")
+            meses = sorted(lote.meses)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+    return {'aplicados': len(resultados), 'meses': [f"{a}-{m:02d}" for a, m in meses], 'resultados': resultados}
+
+def comando_importar(p):
+    import importacao
+    regras = importacao.carregar_regras(p.get('regras'))
+    if p.get('previa'):
+        resultado = importacao.pre_visualizar(p['arquivo'], regras, incluir_repetidos=bool(p.get('incluir_repetidos')))
+    else:
+        resultado = importacao.importar(p['arquivo'], regras, atualizar_caixas=not p.get('sem_caixa', False),
+                                        incluir_repetidos=bool(p.get('incluir_repetidos')))
+    resultado['meses'] = {f"{ano}-{mes:02d}": totais for (ano, mes), totais in sorted(resultado['meses'].items())}
+    return resultado
+
+def comando_exportar(p):
+    import exportacao
+    return exportacao.exportar(p['arquivo'], p.get('formato'), completo=bool(p.get('completo')))
+
+def comando_buscar(p):
+    import busca
+    tipos = [p['tipo']] if p.get('tipo') else None
+    valor_minimo = _valor(p['valor_minimo']) if p.get('valor_minimo') is not None else None
+    valor_maximo = _valor(p['valor_maximo']) if p.get('valor_maximo') is not None else None
+    inicio = _mes(p['de']) if p.get('de') else None
+    fim = _mes(p['ate']) if p.get('ate') else None
+    return busca.buscar(p.get('texto') or '', tipos, valor_minimo, valor_maximo, inicio, fim,
+                        limite=p.get('limite') or busca.LIMITE_RESULTADOS)
+
+COMANDOS = {
+    'transacao': comando_transacao,
+    'investimento': comando_investimento,
+    'resgate': comando_resgate,
+    'parcelada': comando_parcelada,
+    'conta-corrente': comando_conta_corrente,
+    'resumo': comando_resumo,
+    'relatorio': comando_relatorio,
+    'totais': comando_totais,
+    'reconstruir-resumos': comando_reconstruir_resumos,
+    'lote': comando_lote,
+    'importar': comando_importar,
+    'exportar': comando_exportar,
+    'buscar': comando_buscar,
+}
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Gerenciador financeiro pela linha de comando (saída em JSON).")
+    parser.add_argument('--dados', default=None, help="pasta dos dados (padrão: ORCAMENTO_DATA_DIR ou ./data)")
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default=None, help="armazenamento (padrão: ORCAMENTO_BACKEND ou json)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('transacao', help="adiciona uma entrada ou despesa")
+    p.add_argument('--tipo', choices=['entradas', 'despesas'], required=True)
+    p.add_argument('--descricao', required=True)
+    p.add_argument('--valor', required=True, help="ex.: 1.234,56")
+    p.add_argument('--observacoes', default='')
+    p.add_argument('--mes', help="AAAA-MM (padrão: mês atual)")
+    p.add_argument('--sem-caixa', action='store_true', help="não movimenta a conta corrente")
+    p.add_argument('--pular-repetido', action='store_true', help="não adiciona se já houver um lançamento igual hoje no mês")
+
+    p = sub.add_parser('investimento', help="adiciona um investimento")
+    p.add_argument('--nome', required=True, choices=core.TIPOS_INVESTIMENTOS)
+    p.add_argument('--valor', required=True)
+    p.add_argument('--observacoes', default='')
+    p.add_argument('--mes')
+    p.add_argument('--sem-caixa', action='store_true', help="não movimenta os caixas")
+
+    p = sub.add_parser('resgate', help="move um valor de um investimento para a conta corrente")
+    p.add_argument('--nome', required=True)
+    p.add_argument('--valor', required=True)
+    p.add_argument('--mes')
+
+    p = sub.add_parser('parcelada', help="registra uma compra parcelada e lança as parcelas")
+    p.add_argument('--cartao', required=True)
+    p.add_argument('--descricao', required=True)
+    p.add_argument('--valor-total', required=True)
+    p.add_argument('--parcelas', required=True, type=int)
+    p.add_argument('--vencimento', required=True, help="mês da primeira parcela (AAAA-MM)")
+
+    p = sub.add_parser('conta-corrente', help="define o saldo da conta corrente")
+    p.add_argument('--valor', required=True)
+    p.add_argument('--mes')
+
+    p = sub.add_parser('resumo', help="totais, caixas e despesas por categoria do mês")
+    p.add_argument('--mes')
+
+    p = sub.add_parser('totais', help="totais de entradas, despesas e investimentos de cada mês do período")
+    p.add_argument('--de', help="primeiro mês (AAAA-MM; padrão: 11 meses antes do último)")
+    p.add_argument('--ate', help="último mês (AAAA-MM; padrão: mês atual)")
+
+    p = sub.add_parser('relatorio', help="gera relatórios em PDF (ver relatorio.py)")
+    p.add_argument('inicio', help="AAAA-MM")
+    p.add_argument('fim', nargs='?', help="AAAA-MM (padrão: o mesmo que o início)")
+    p.add_argument('--combinado', action='store_true')
+    p.add_argument('--processos', type=int)
+    p.add_argument('--destino')
+
+    p = sub.add_parser('lote', help="aplica vários lançamentos de um arquivo JSON lines")
+    p.add_argument('arquivo', nargs='?', default='-', help="arquivo (padrão: entrada padrão)")
+
+    p = sub.add_parser('importar', help="importa um extrato CSV ou OFX (ver importacao.py)")
+    p.add_argument('arquivo')
+    p.add_argument('--regras', help="arquivo de regras de categorias (padrão: regras_importacao.json na pasta de dados)")
+    p.add_argument('--previa', action='store_true', help="só mostra o que seria importado")
+    p.add_argument('--sem-caixa', action='store_true', help="os lançamentos não movimentam a conta corrente")
+    p.add_argument('--incluir-repetidos', action='store_true', help="importa também os lançamentos que o mês já tem")
+
+    p = sub.add_parser('exportar', help="exporta todo o histórico para CSV ou Parquet (ver exportacao.py)")
+    p.add_argument('arquivo', help="arquivo .csv ou .parquet")
+    p.add_argument('--formato', choices=['csv', 'parquet'], help="padrão: pela extensão do arquivo")
+    p.add_argument('--completo', action='store_true', help="relê todos os meses, não só os alterados desde a última exportação")
+
+    p = sub.add_parser('buscar', help="busca lançamentos em todos os meses (ver busca.py)")
+    p.add_argument('texto', nargs='?', default='', help="palavras ou começos de palavras, sem diferenciar acentos")
+    p.add_argument('--tipo', choices=['entradas', 'despesas', 'investimentos', 'cartoes_parcelados'])
+    p.add_argument('--valor-minimo')
+    p.add_argument('--valor-maximo')
+    p.add_argument('--de', help="primeiro mês (AAAA-MM)")
+    p.add_argument('--ate', help="último mês (AAAA-MM)")
+    p.add_argument('--limite', type=int, help="máximo de resultados (padrão: 500)")
+
+    sub.add_parser('reconstruir-resumos', help="regrava todos os meses com seus resumos")
+    return parser
+
+def main(argumentos=None):
+    args = criar_parser().parse_args(argumentos)
+    if args.dados is not None or args.backend is not None:
+        core.configurar(args.dados, args.backend)
+    parametros = {nome: valor for nome, valor in vars(args).items() if nome not in ('dados', 'backend')}
+    try:
+        resultado = COMANDOS[args.comando](parametros)
+        core.gravar_pendentes()
+    except (ErroComando, ValueError) + core.ERROS_GRAVACAO as e:
+        print(json.dumps({'ok': False, 'erro': str(e)}, ensure_ascii=False))
+        return 1
+    print(json.dumps({'ok': True, 'resultado': resultado}, ensure_ascii=False))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# Diário (journal) de operações por mês.
+#
+# Em vez de regravar o mês inteiro a cada lançamento, cada alteração vira uma
+# linha em DATA_DIR/diario_AAAA_MM.jsonl:
+#
+#     {"seq": 7, "quando": "2025-03-10 12:00:00", "ops": [...]}
+#
+# Ao carregar, o mês salvo (o "snapshot") é lido e as linhas do diário com seq
+# maior que dados['diario_seq'] são aplicadas por cima. Quando o snapshot é
+# gravado de novo, as linhas que ele já contém são retiradas do diário
+# (compactação) e guardadas em diario_AAAA_MM.historico.jsonl.
+#
+# Operações (ver aplicar_operacoes):
+#   {'op': 'adicionar', 'lista': 'despesas', 'item': {...}}
+#   {'op': 'remover', 'lista': 'despesas', 'filtro': {'descricao': ..., 'valor': ...}, 'todos': True}
+#   {'op': 'definir_saldo_inicial', 'conta': 'conta_corrente' ou nome do investimento, 'valor': 1000}
+#   {'op': 'somar_caixa', ...} e {'op': 'definir_caixa', ...} só aparecem em
+#   registros antigos, de meses que ainda guardavam os caixas
+#
+# Os valores são em centavos (inteiros). Registros gravados antes disso não
+# têm o campo 'formato' e guardam valores em reais; quem reaplica o diário
+# pode convertê-los (ver o parâmetro 'converter' de Diario.reaplicar).
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+def _corresponde(item, filtro):
+    for campo, valor in filtro.items():
+        if item.get(campo) != valor:
+            return False
+    return True
+
+# Aplica as operações, em ordem, sobre os dados de um mês
+def aplicar_operacoes(dados, operacoes):
+    for operacao in operacoes:
+        tipo = operacao['op']
+        if tipo == 'adicionar':
+            dados[operacao['lista']].append(dict(operacao['item']))
+        elif tipo == 'remover':
+            lista = dados[operacao['lista']]
+            filtro = operacao['filtro']
+            if operacao.get('todos', True):
+                dados[operacao['lista']] = [item for item in lista if not _corresponde(item, filtro)]
+            else:
+                for i, item in enumerate(lista):
+                    if _corresponde(item, filtro):
+                        lista.pop(i)
+                        break
+        elif tipo == 'definir_saldo_inicial':
+            dados.setdefault('saldo_inicial', {})[operacao['conta']] = operacao['valor']
+        elif tipo in ('somar_caixa', 'definir_caixa'):
+            caixas = dados['caixas']
+            conta = operacao['conta']
+            if conta == 'conta_corrente':
+                base = caixas['conta_corrente'] if tipo == 'somar_caixa' else 0
+                caixas['conta_corrente'] = base + operacao['valor']
+            else:
+                base = caixas['investimentos'].get(conta, 0) if tipo == 'somar_caixa' else 0
+                caixas['investimentos'][conta] = base + operacao['valor']
+        else:
+            raise ValueError(f"Operação desconhecida no diário: {tipo}")
+
+class Diario:
+    PADRAO_ARQUIVO = re.compile(r'^diario_(\d{4})_(\d{2})\.jsonl$')
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def caminho(self, ano, mes):
+        return os.path.join(self.diretorio, f'diario_{ano}_{mes:02d}.jsonl')
+
+    def caminho_historico(self, ano, mes):
+        return os.path.join(self.diretorio, f'diario_{ano}_{mes:02d}.historico.jsonl')
+
+    def assinatura(self, ano, mes):
+        try:
+            st = os.stat(self.caminho(ano, mes))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    # (ano, mes) dos meses com diário (o mês pode ainda não ter snapshot)
+    def listar_meses(self):
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return []
+        return sorted((int(encontrado.group(1)), int(encontrado.group(2)))
+                      for encontrado in map(self.PADRAO_ARQUIVO.match, nomes) if encontrado)
+
+    def tamanho(self, ano, mes):
+        try:
+            return os.path.getsize(self.caminho(ano, mes))
+        except OSError:
+            return 0
+
+    # Acrescenta um registro ao fim do diário do mês. Só uma linha é escrita,
+    # independente do tamanho do mês.
+    def anexar(self, ano, mes, seq, operacoes, formato=None):
+        registro = {'seq': seq, 'quando': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'ops': operacoes}
+        if formato is not None:
+            registro['formato'] = formato
+        with open(self.caminho(ano, mes), 'ab+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')  # termina a linha incompleta de uma queda anterior
+            f.write((json.dumps(registro) + '\n').encode('ascii'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def ler_registros(self, ano, mes):
+        registros = []
+        try:
+            with open(self.caminho(ano, mes), 'r') as f:
+                for linha in f:
+                    try:
+                        registros.append(json.loads(linha))
+                    except json.JSONDecodeError:
+                        # Linha incompleta (queda durante a escrita): ignora
+                        continue
+        except FileNotFoundError:
+            pass
+        return registros
+
+    # Aplica sobre 'dados' os registros que o snapshot ainda não contém.
+    # 'converter', se informado, recebe o registro e devolve as operações a
+    # aplicar (para adaptar registros de formatos antigos).
+    def reaplicar(self, dados, ano, mes, converter=None):
+        ultimo_seq = dados.get('diario_seq', 0)
+        for registro in self.ler_registros(ano, mes):
+            if registro['seq'] > ultimo_seq:
+                aplicar_operacoes(dados, converter(registro) if converter else registro['ops'])
+                ultimo_seq = registro['seq']
+                dados['diario_seq'] = ultimo_seq
+        return dados
+
+    # Retira do diário os registros até 'ate_seq' (já gravados no snapshot),
+    # movendo-os para o histórico.
+    def compactar(self, ano, mes, ate_seq):
+        registros = self.ler_registros(ano, mes)
+        if not registros:
+            return
+        compactados = [r for r in registros if r['seq'] <= ate_seq]
+        restantes = [r for r in registros if r['seq'] > ate_seq]
+        if not compactados:
+            return
+        with open(self.caminho_historico(ano, mes), 'a') as f:
+            f.writelines(json.dumps(r) + '\n' for r in compactados)
+            f.flush()
+            os.fsync(f.fileno())
+        if not restantes:
+            os.remove(self.caminho(ano, mes))
+            return
+        fd, caminho_tmp = tempfile.mkstemp(prefix='.tmp_', dir=self.diretorio)
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(json.dumps(r) + '\n' for r in restantes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(caminho_tmp, self.caminho(ano, mes))
@@ -0,0 +1,257 @@
+# Exportação de todo o histórico (entradas, despesas e investimentos de todos
+# os meses) para uma única tabela em CSV ou Parquet, para o contador e para
+# análises em planilhas e notebooks.
+#
+# Os meses são lidos um de cada vez e suas linhas vão direto para o arquivo
+# (geradores): a memória usada não cresce com os anos de histórico. Ao lado
+# do arquivo fica um estado (<arquivo>.estado.json) com a versão de cada mês
+# exportado (core.versao_mes), e a exportação seguinte para o mesmo arquivo
+# só relê os meses novos ou alterados:
+#   CSV      se só há meses novos depois do último exportado, as linhas são
+#            acrescentadas ao fim; senão o arquivo é refeito copiando as
+#            linhas dos meses que não mudaram
+#   Parquet  cada mês é um grupo de linhas (row group); os dos meses que não
+#            mudaram são copiados do arquivo anterior
+#
+# Colunas: id, mes (AAAA-MM), tipo (entradas, despesas ou investimentos),
+# categoria, valor (em centavos), observacoes, data e origem (manual ou
+# extrato). O CSV usa ';' e UTF-8; o Parquet precisa do pyarrow
+# (pip install pyarrow).
+import os
+import csv
+import json
+import tempfile
+from datetime import datetime
+from itertools import groupby
+import orcamento_core as core
+
+COLUNAS = ('id', 'mes', 'tipo', 'categoria', 'valor', 'observacoes', 'data', 'origem')
+TIPOS = ('entradas', 'despesas', 'investimentos')
+FORMATOS = ('csv', 'parquet')
+SEPARADOR_CSV = ';'
+VERSAO_ESTADO = 1
+
+class ExportacaoCancelada(Exception):
+    pass
+
+def _texto_mes(ano, mes):
+    return f"{ano}-{mes:02d}"
+
+# Linhas de um mês, na ordem de COLUNAS
+def linhas_mes(ano, mes):
+    dados = core.carregar_dados(ano, mes, somente_leitura=True)
+    texto = _texto_mes(ano, mes)
+    for tipo in TIPOS:
+        for item in dados[tipo]:
+            yield (item['id'], texto, tipo, item['descricao'], item['valor'], item.get('observacoes', ''),
+                   item.get('data', ''), item.get('origem', core.ORIGEM_MANUAL))
+
+def formato_do_caminho(caminho):
+    extensao = os.path.splitext(caminho)[1].lower().lstrip('.')
+    if extensao not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: {caminho!r} (use .csv ou .parquet)")
+    return extensao
+
+# --- Estado da última exportação ---
+
+def caminho_estado(caminho):
+    return caminho + '.estado.json'
+
+def _assinatura_arquivo(caminho):
+    st = os.stat(caminho)
+    return [st.st_mtime_ns, st.st_size]
+
+# Versão do mês como fica no JSON do estado (tuplas viram listas)
+def _versao(ano, mes):
+    return json.loads(json.dumps(core.versao_mes(ano, mes)))
+
+# Estado da última exportação para 'caminho', ou None se não houver um que
+# corresponda ao arquivo como ele está (apagado, alterado por fora, outro
+# formato ou outras colunas): nesse caso a exportação é completa.
+def _ler_estado(caminho, formato):
+    try:
+        with open(caminho_estado(caminho), 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        if (estado.get('versao') != VERSAO_ESTADO or estado.get('formato') != formato
+                or estado.get('colunas') != list(COLUNAS) or estado.get('arquivo') != _assinatura_arquivo(caminho)):
+            return None
+    except (OSError, ValueError):
+        return None
+    return estado
+
+def _gravar_estado(caminho, formato, versoes, grupos=None):
+    estado = {'versao': VERSAO_ESTADO, 'formato': formato, 'colunas': list(COLUNAS),
+              'arquivo': _assinatura_arquivo(caminho), 'meses': versoes}
+    if grupos is not None:
+        estado['grupos'] = grupos
+    core.gravar_arquivo_atomico(caminho_estado(caminho), json.dumps(estado))
+
+# Arquivo temporário ao lado de 'caminho' que, se 'escrever(caminho_tmp)'
+# terminar sem erro, substitui o definitivo de uma vez
+def _substituir_arquivo(caminho, escrever):
+    fd, caminho_tmp = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.splitext(caminho)[1], dir=os.path.dirname(caminho) or '.')
+    os.close(fd)
+    try:
+        escrever(caminho_tmp)
+        os.replace(caminho_tmp, caminho)
+    except BaseException:
+        try:
+            os.remove(caminho_tmp)
+        except OSError:
+            pass
+        raise
+
+# --- CSV ---
+
+# Linhas do novo arquivo, mês a mês: as dos meses alterados vêm dos dados, as
+# dos demais são copiadas do arquivo anterior (que está em ordem de mês)
+def _linhas_mescladas(leitor_anterior, meses, alterados, passo):
+    grupos = groupby(leitor_anterior, key=lambda linha: linha[1])
+    atual = next(grupos, None)
+    for ano, mes in meses:
+        texto = _texto_mes(ano, mes)
+        if texto in alterados:
+            yield from linhas_mes(ano, mes)
+        else:
+            while atual is not None and atual[0] < texto:
+                atual = next(grupos, None)
+            if atual is not None and atual[0] == texto:
+                yield from atual[1]
+        passo()
+
+def _exportar_csv(caminho, meses, alterados, estado, passo):
+    ultimo_exportado = max(estado['meses'], default='') if estado is not None else None
+    if estado is not None and all(texto > ultimo_exportado for texto in alterados):
+        # Só meses novos no fim: acrescenta. Se algo falhar, o arquivo volta
+        # ao tamanho que tinha.
+        with open(caminho, 'a', newline='', encoding='utf-8') as f:
+            tamanho = f.tell()
+            try:
+                escritor = csv.writer(f, delimiter=SEPARADOR_CSV)
+                for ano, mes in meses:
+                    if _texto_mes(ano, mes) in alterados:
+                        escritor.writerows(linhas_mes(ano, mes))
+                    passo()
+            except BaseException:
+                f.truncate(tamanho)
+                raise
+        return
+
+    def escrever(caminho_tmp):
+        anterior = open(caminho, 'r', newline='', encoding='utf-8-sig') if estado is not None else None
+        try:
+            leitor_anterior = csv.reader(anterior, delimiter=SEPARADOR_CSV) if anterior is not None else iter(())
+            next(leitor_anterior, None)  # cabeçalho
+            # utf-8-sig: o Excel reconhece os acentos
+            with open(caminho_tmp, 'w', newline='', encoding='utf-8-sig') as f:
+                escritor = csv.writer(f, delimiter=SEPARADOR_CSV)
+                escritor.writerow(COLUNAS)
+                escritor.writerows(_linhas_mescladas(leitor_anterior, meses, alterados, passo))
+        finally:
+            if anterior is not None:
+                anterior.close()
+    _substituir_arquivo(caminho, escrever)
+
+# --- Parquet ---
+
+def _esquema(pa):
+    return pa.schema([
+        ('id', pa.string()),
+        ('mes', pa.string()),
+        ('tipo', pa.string()),
+        ('categoria', pa.string()),
+        ('valor', pa.int64()),
+        ('observacoes', pa.string()),
+        ('data', pa.timestamp('ms')),
+        ('origem', pa.string()),
+    ])
+
+# As datas gravadas ('AAAA-MM-DD HH:MM:SS', FORMATO_DATA) são ISO 8601, e
+# fromisoformat é muito mais rápido que strptime. Datas fora do formato ficam
+# vazias.
+def _converter_data(texto):
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        return None
+
+# Tabela com as linhas de um mês, ou None se o mês não tem lançamentos
+def _tabela_mes(pa, esquema, ano, mes):
+    colunas = [list(coluna) for coluna in zip(*linhas_mes(ano, mes))]
+    if not colunas:
+        return None
+    colunas[COLUNAS.index('data')] = [_converter_data(texto) for texto in colunas[COLUNAS.index('data')]]
+    return pa.table(dict(zip(COLUNAS, colunas)), schema=esquema)
+
+def _exportar_parquet(caminho, meses, alterados, estado, passo):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Exportar para Parquet precisa do pyarrow (pip install pyarrow).")
+    esquema = _esquema(pa)
+    grupos_anteriores = {texto: i for i, texto in enumerate(estado['grupos'])} if estado is not None else {}
+    grupos = []
+
+    def escrever(caminho_tmp):
+        anterior = open(caminho, 'rb') if estado is not None else None
+        try:
+            arquivo_anterior = pq.ParquetFile(anterior) if anterior is not None else None
+            with pq.ParquetWriter(caminho_tmp, esquema) as escritor:
+                for ano, mes in meses:
+                    texto = _texto_mes(ano, mes)
+                    if texto not in alterados and texto in grupos_anteriores:
+                        tabela = arquivo_anterior.read_row_group(grupos_anteriores[texto])
+                    else:
+                        tabela = _tabela_mes(pa, esquema, ano, mes)
+                    if tabela is not None and tabela.num_rows:
+                        # Um grupo por mês, para poder copiá-lo na próxima vez
+                        escritor.write_table(tabela, row_group_size=tabela.num_rows)
+                        grupos.append(texto)
+                    passo()
+        finally:
+            if anterior is not None:
+                anterior.close()
+    _substituir_arquivo(caminho, escrever)
+    return grupos
+
+# Exporta o histórico para 'caminho' (formato pela extensão, se não
+# informado). Com completo=True ignora a exportação anterior e relê todos os
+# meses. 'progresso(fração)' é chamado a cada mês; se 'cancelado'
+# (threading.Event) for ligado, levanta ExportacaoCancelada e o arquivo
+# anterior fica como estava. Devolve {'caminho', 'meses', 'meses_relidos'}.
+def exportar(caminho, formato=None, completo=False, progresso=None, cancelado=None):
+    formato = formato or formato_do_caminho(caminho)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: {formato!r} (use csv ou parquet)")
+    # Meses ainda em memória não têm versão para guardar no estado
+    core.gravar_pendentes()
+    meses = core.listar_meses()
+    estado = None if completo else _ler_estado(caminho, formato)
+    anteriores = estado['meses'] if estado is not None else {}
+    # A versão é lida antes do mês: se ele mudar durante a exportação, a
+    # próxima o relê
+    versoes = {_texto_mes(ano, mes): _versao(ano, mes) for ano, mes in meses}
+    alterados = {texto for texto, versao in versoes.items() if versao is None or anteriores.get(texto) != versao}
+    if estado is not None and not alterados and set(anteriores) == set(versoes):
+        return {'caminho': caminho, 'meses': len(meses), 'meses_relidos': 0}
+    if set(anteriores) - set(versoes):
+        # Meses que deixaram de existir: o arquivo é refeito sem eles
+        estado = None
+        alterados = set(versoes)
+
+    feitos = [0]
+    def passo():
+        if cancelado is not None and cancelado.is_set():
+            raise ExportacaoCancelada()
+        feitos[0] += 1
+        if progresso is not None:
+            progresso(feitos[0] / len(meses))
+
+    if formato == 'csv':
+        _exportar_csv(caminho, meses, alterados, estado, passo)
+        _gravar_estado(caminho, formato, versoes)
+    else:
+        grupos = _exportar_parquet(caminho, meses, alterados, estado, passo)
+        _gravar_estado(caminho, formato, versoes, grupos)
+    return {'caminho': caminho, 'meses': len(meses), 'meses_relidos': len(alterados)}
@@ -0,0 +1,64 @@
+# Formatação de valores no padrão brasileiro (1.234,56), usada pela interface e
+# pelo relatório em PDF. Valores em dinheiro chegam em centavos (inteiros),
+# como estão nos dados; percentuais são números comuns.
+#
+# O Python formata no padrão americano (1,234.56) e os separadores são
+# trocados depois, numa só passada (bytes.translate). Para uma coluna inteira
+# use as versões em lote (formatar_moedas, formatar_percentuais): os valores
+# são formatados em uma única string e a troca é feita uma vez para todos.
+from datetime import datetime
+
+_TROCA_SEPARADORES = bytes.maketrans(b',.', b'.,')
+
+def _trocar_separadores(texto):
+    return texto.encode('ascii').translate(_TROCA_SEPARADORES).decode('ascii')
+
+def _formatar_lote(modelo, valores):
+    texto = '\n'.join(map(modelo.format, valores))
+    return _trocar_separadores(texto).split('\n') if texto else []
+
+# 123450 -> '1.234,50'
+def formatar_numero(centavos):
+    return _trocar_separadores(f"{centavos / 100:,.2f}")
+
+# 123450 -> 'R$ 1.234,50'
+def formatar_moeda(centavos):
+    return _trocar_separadores(f"R$ {centavos / 100:,.2f}")
+
+# 12.345 -> '12,35%'
+def formatar_percentual(valor):
+    return _trocar_separadores(f"{valor:,.2f}%")
+
+# Versões em lote: recebem uma sequência de valores e devolvem a lista de textos
+def formatar_moedas(centavos):
+    return _formatar_lote("R$ {:,.2f}", (valor / 100 for valor in centavos))
+
+def formatar_percentuais(valores):
+    return _formatar_lote("{:,.2f}%", valores)
+
+# --- Datas ---
+# As datas dos lançamentos são gravadas como 'AAAA-MM-DD HH:MM:SS'. Esse texto
+# tem largura fixa e já ordena cronologicamente (dá para ordenar e filtrar por
+# período comparando as strings), e para exibir basta recortá-lo, sem
+# strptime. O texto exibido de cada data é guardado para as próximas
+# atualizações.
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+LIMITE_DATAS_FORMATADAS = 100000
+_datas_formatadas = {}  # 'AAAA-MM-DD HH:MM:SS' -> 'DD/MM/AA'
+
+# '2025-03-10 12:00:00' -> '10/03/25'
+def formatar_data(data):
+    texto = _datas_formatadas.get(data)
+    if texto is None:
+        if len(data) == 19 and data[4] == '-' and data[7] == '-' and data[10] == ' ':
+            texto = f"{data[8:10]}/{data[5:7]}/{data[2:4]}"
+        else:
+            # Fora do formato esperado: strptime valida (e levanta ValueError)
+            texto = datetime.strptime(data, FORMATO_DATA).strftime('%d/%m/%y')
+        if len(_datas_formatadas) >= LIMITE_DATAS_FORMATADAS:
+            _datas_formatadas.clear()
+        _datas_formatadas[data] = texto
+    return texto
+
+def formatar_datas(datas):
+    return [formatar_data(data) for data in datas]
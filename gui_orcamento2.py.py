@@ -1,18 +1,22 @@
+import time
+INICIO_PROCESSO = time.perf_counter()
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json
+from tkinter import ttk, messagebox, filedialog
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from collections import Counter
-import calendar
 import sys
+import threading
+import queue
+import math
+import subprocess
+import importlib
+import tempfile
+import orcamento_core as core
+from formatacao import formatar_data, formatar_moeda, formatar_moedas, formatar_numero, formatar_percentual
+from tabelas import sincronizar_treeview, filtrar_e_ordenar
+# matplotlib, reportlab (via relatorio) e numpy (via analise) são importados só
+# quando um gráfico, relatório ou análise é gerado (ver gerar_grafico_orcamento,
+# gerar_relatorio_pdf, atualizar_analises e precarregar_bibliotecas)
 
 # --- Configurações de Design ---
 TEMA = 'clam'
@@ -24,136 +28,40 @@ FONTE_TITULO = ('Helvetica', 14, 'bold')
 # Adicionar a versão do aplicativo
 VERSAO = "4.5.0"
 
-# Lista de despesas predefinidas (CORRIGIDA)
-CATEGORIAS_DESPESAS_PREDEFINIDAS = [
-    'Aluguel',
-    'Financiamento Imobibiario',
-    'Estacionamento',
-    'Fatura de Energia',
-    'Fatura de Água',
-    'Fatura Tv / Internet',
-    'Despesas Reforma',
-    'Contabilidade',
-    'INSS',
-    'Simples Nacional',
-    'Parcelamento 1',
-    'Parcelamento 2',
-    'Despesa Supermercado',
-    'Despesa Padaria',
-    'Despesa Refeição Trabalho',
-    'Despesa Fast Food/Restaurante',
-    'Plano de Saúde Familiar',
-    'Plano de Saúde Contribuição',
-    'Cartão de crédito XP',
-    'Cartão de crédito BVI',
-    'Cartão de crédito Itaú',
-    'Cartão RCHLO',
-    'Cartão credito ML',
-    'Medicamentos',
-    'Pet Shop',
-    'Cabeleireiro',
-    'Dentista',
-    'Diversão Heitor',
-    'pagamento condominio',
-    'outros'
-]
-
-# Nova lista de receitas predefinidas
-CATEGORIAS_ENTRADAS_PREDEFINIDAS = [
-    'Salário',
-    'Aluguel',
-    'Dividendos',
-    'Outros'
-]
+# ORCAMENTO_PRECARREGAR=1: importa matplotlib e reportlab em segundo plano
+# logo depois que a janela aparece, para o primeiro gráfico/relatório não esperar.
+PRECARREGAR_BIBLIOTECAS = os.environ.get('ORCAMENTO_PRECARREGAR', '0') == '1'
+# ORCAMENTO_TEMPOS=1: mostra no terminal quanto demorou cada etapa da abertura
+MOSTRAR_TEMPOS = os.environ.get('ORCAMENTO_TEMPOS', '0') == '1'
+
+# Tempos (em segundos) das etapas da abertura do programa
+tempos_inicializacao = {'imports': time.perf_counter() - INICIO_PROCESSO}
 
 # Variáveis globais para o mês e ano atuais
 MES_ATUAL = datetime.now().month
 ANO_ATUAL = datetime.now().year
 
-# --- Criação do diretório de dados ---
-DATA_DIR = 'data'
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
-
-# Função para obter o nome do arquivo JSON com base no mês e ano
-def get_json_file(ano, mes):
-    return os.path.join(DATA_DIR, f'data_orcamento_{ano}_{mes:02d}.json')
-
-# Função para carregar dados do arquivo JSON
-def carregar_dados(ano, mes):
-    json_file = get_json_file(ano, mes)
-    if os.path.exists(json_file):
-        with open(json_file, 'r') as f:
-            try:
-                data = json.load(f)
-                # Ensure all keys exist
-                if 'entradas' not in data:
-                    data['entradas'] = []
-                if 'despesas' not in data:
-                    data['despesas'] = []
-                if 'investimentos' not in data:
-                    data['investimentos'] = []
-                if 'cartoes_parcelados' not in data:
-                    data['cartoes_parcelados'] = []
-                if 'caixas' not in data:
-                    data['caixas'] = {
-                        'conta_corrente': 0.0,
-                        'investimentos': {
-                            'Ações': 0.0,
-                            'Fundos Imobiliários': 0.0,
-                            'ETF Internacional': 0.0,
-                            'CDB': 0.0,
-                            'Cofrinhos': 0.0,
-                            'Tesouro Direto': 0.0,
-                        }
-                    }
-                # Add 'Tesouro Direto' if it's missing from an old file
-                if 'Tesouro Direto' not in data['caixas']['investimentos']:
-                    data['caixas']['investimentos']['Tesouro Direto'] = 0.0
-                return data
-            except json.JSONDecodeError:
-                return {
-                    'entradas': [],
-                    'despesas': [],
-                    'investimentos': [],
-                    'cartoes_parcelados': [],
-                    'caixas': {
-                        'conta_corrente': 0.0,
-                        'investimentos': {
-                            'Ações': 0.0,
-                            'Fundos Imobiliários': 0.0,
-                            'ETF Internacional': 0.0,
-                            'CDB': 0.0,
-                            'Cofrinhos': 0.0,
-                            'Tesouro Direto': 0.0,
-                        }
-                    }
-                }
-    return {
-        'entradas': [],
-        'despesas': [],
-        'investimentos': [],
-        'cartoes_parcelados': [],
-        'caixas': {
-            'conta_corrente': 0.0,
-            'investimentos': {
-                'Ações': 0.0,
-                'Fundos Imobiliários': 0.0,
-                'ETF Internacional': 0.0,
-                'CDB': 0.0,
-                'Cofrinhos': 0.0,
-                'Tesouro Direto': 0.0,
-            }
-        }
-    }
-
-# Função para salvar dados no arquivo JSON
-def salvar_dados(dados, ano, mes):
-    json_file = get_json_file(ano, mes)
-    with open(json_file, 'w') as f:
-        json.dump(dados, f, indent=4)
-    # Removida a mensagem de sucesso para evitar pop-ups excessivos
-    # messagebox.showinfo("Sucesso", f"Dados do mês {mes:02d}/{ano} salvos com sucesso!")
+BIBLIOTECAS_PRECARREGADAS = ('matplotlib.figure', 'matplotlib.backends.backend_tkagg', 'reportlab.platypus',
+                             'reportlab.lib.styles', 'analise')
+
+# Importa as bibliotecas de gráfico e PDF. Chamado em uma thread separada; os
+# imports seguintes (nas funções que as usam) encontram os módulos já carregados.
+def precarregar_bibliotecas():
+    inicio = time.perf_counter()
+    try:
+        for modulo in BIBLIOTECAS_PRECARREGADAS:
+            importlib.import_module(modulo)
+    except ImportError:
+        # Sem as bibliotecas, o erro aparece quando o botão for usado
+        return
+    tempos_inicializacao['precarga'] = time.perf_counter() - inicio
+    if MOSTRAR_TEMPOS:
+        print(f"[tempo] pré-carga de matplotlib/reportlab/numpy: {tempos_inicializacao['precarga'] * 1000:.0f} ms", file=sys.stderr)
+
+def mostrar_tempos_inicializacao():
+    tempos_inicializacao['total'] = time.perf_counter() - INICIO_PROCESSO
+    for etapa in ('imports', 'janela', 'primeira_atualizacao', 'total'):
+        print(f"[tempo] {etapa}: {tempos_inicializacao[etapa] * 1000:.0f} ms", file=sys.stderr)
 
 # Função para exibir mensagem de erro
 def mostrar_erro(mensagem):
@@ -196,7 +104,7 @@ def formatar_valor(event, entry):
 
 def adicionar_transacao(tipo, descricao_widget, valor_entry, observacoes_entry, ano_combo, mes_combo):
     descricao = descricao_widget.get().strip()
-    valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
+    valor_str = valor_entry.get().strip()
     observacoes = observacoes_entry.get().strip()
     mes_str = mes_combo.get()
     ano_str = ano_combo.get()
@@ -206,25 +114,19 @@ def adicionar_transacao(tipo, descricao_widget, valor_entry, observacoes_entry,
         return
     
     try:
-        valor = float(valor_str)
+        valor = core.converter_valor(valor_str)
         mes = [m[1] for m in meses].index(mes_str) + 1
         ano = int(ano_str)
     except (ValueError, IndexError):
         mostrar_erro("Valores de entrada inválidos.")
         return
 
-    dados = carregar_dados(ano, mes)
-    
-    if tipo == 'entradas':
-        dados['entradas'].append({'descricao': descricao, 'valor': valor, 'observacoes': observacoes, 'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
-        if ano == ANO_ATUAL and mes == MES_ATUAL:
-            dados['caixas']['conta_corrente'] += valor
-    else: # despesas
-        dados['despesas'].append({'descricao': descricao, 'valor': valor, 'observacoes': observacoes, 'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
-        if ano == ANO_ATUAL and mes == MES_ATUAL:
-            dados['caixas']['conta_corrente'] -= valor
-    
-    salvar_dados(dados, ano, mes)
+    if core.transacao_repetida(tipo, descricao, valor, observacoes, ano, mes):
+        tipo_texto = "uma entrada" if tipo == 'entradas' else "uma despesa"
+        if not messagebox.askyesno("Lançamento repetido", f"Já existe {tipo_texto} '{descricao}' de {formatar_moeda(valor)} lançada hoje em {mes:02d}/{ano}.\nAdicionar mesmo assim?"):
+            return
+
+    core.adicionar_transacao(tipo, descricao, valor, observacoes, ano, mes)
     # Removida a mensagem de sucesso para evitar pop-ups excessivos
     # messagebox.showinfo("Sucesso", f"{tipo.capitalize()} adicionada com sucesso!")
     limpar_campos([descricao_widget, valor_entry, observacoes_entry])
@@ -233,7 +135,7 @@ def adicionar_transacao(tipo, descricao_widget, valor_entry, observacoes_entry,
 # Função para adicionar investimentos
 def adicionar_investimento(combo_investimento, valor_entry, observacoes_entry, ano_combo, mes_combo):
     investimento_nome = combo_investimento.get()
-    valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
+    valor_str = valor_entry.get().strip()
     observacoes = observacoes_entry.get().strip()
     mes_str = mes_combo.get()
     ano_str = ano_combo.get()
@@ -243,27 +145,14 @@ def adicionar_investimento(combo_investimento, valor_entry, observacoes_entry, a
         return
 
     try:
-        valor = float(valor_str)
+        valor = core.converter_valor(valor_str)
         mes = [m[1] for m in meses].index(mes_str) + 1
         ano = int(ano_str)
     except (ValueError, IndexError):
         mostrar_erro("Valores de entrada inválidos.")
         return
     
-    dados = carregar_dados(ano, mes)
-    
-    # Adicionar o investimento
-    dados['investimentos'].append({'descricao': investimento_nome, 'valor': valor, 'observacoes': observacoes, 'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
-    
-    # Atualizar caixas
-    if ano == ANO_ATUAL and mes == MES_ATUAL:
-        dados['caixas']['conta_corrente'] -= valor
-        if investimento_nome in dados['caixas']['investimentos']:
-            dados['caixas']['investimentos'][investimento_nome] += valor
-        else:
-            dados['caixas']['investimentos'][investimento_nome] = valor
-
-    salvar_dados(dados, ano, mes)
+    core.adicionar_investimento(investimento_nome, valor, observacoes, ano, mes)
     # Removida a mensagem de sucesso
     # messagebox.showinfo("Sucesso", f"Investimento em {investimento_nome} adicionado com sucesso!")
     limpar_campos([combo_investimento, valor_investimento_entry, observacoes_investimento_entry])
@@ -274,36 +163,35 @@ def resgatar_investimento(combo_investimento, valor_entry):
     global ANO_ATUAL, MES_ATUAL
     
     investimento_nome = combo_investimento.get()
-    valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
+    valor_str = valor_entry.get().strip()
     
     if not investimento_nome or not valor_str:
         mostrar_erro("Por favor, selecione um investimento e insira um valor para resgate.")
         return
     
     try:
-        valor = float(valor_str)
+        valor = core.converter_valor(valor_str)
     except ValueError:
         mostrar_erro("Valor de resgate inválido.")
         return
     
-    dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
+    saldos = core.saldos_mes(ANO_ATUAL, MES_ATUAL)['fechamento']
     
-    if investimento_nome not in dados['caixas']['investimentos']:
+    if investimento_nome not in saldos:
         mostrar_erro(f"O investimento '{investimento_nome}' não existe na sua caixa de investimentos.")
         return
     
-    if dados['caixas']['investimentos'][investimento_nome] < valor:
+    if saldos[investimento_nome] < valor:
         messagebox.showwarning("Aviso", "O valor de resgate é maior do que o saldo total do investimento.")
         
-    resposta = messagebox.askyesno("Confirmar Resgate", f"Tem certeza que deseja resgatar R$ {valor:,.2f} de {investimento_nome}?")
+    resposta = messagebox.askyesno("Confirmar Resgate", f"Tem certeza que deseja resgatar {formatar_moeda(valor)} de {investimento_nome}?")
     if resposta:
-        # Subtrai do caixa de investimentos
-        dados['caixas']['investimentos'][investimento_nome] -= valor
-        
-        # Adiciona ao caixa da conta corrente
-        dados['caixas']['conta_corrente'] += valor
-        
-        salvar_dados(dados, ANO_ATUAL, MES_ATUAL)
+        try:
+            # O aviso de saldo insuficiente já foi mostrado antes da confirmação
+            core.resgatar_investimento(investimento_nome, valor, ANO_ATUAL, MES_ATUAL, acima_do_saldo=True)
+        except ValueError as e:
+            mostrar_erro(str(e))
+            return
         # Removida a mensagem de sucesso
         # messagebox.showinfo("Sucesso", f"Resgate de R$ {valor:,.2f} de {investimento_nome} realizado com sucesso!")
         limpar_campos([combo_investimento_resgate, valor_resgate_entry])
@@ -312,7 +200,7 @@ def resgatar_investimento(combo_investimento, valor_entry):
 # Função para adicionar faturas parceladas
 def adicionar_fatura_parcelada(cartao_combo, valor_entry, parcelas_entry, descricao_entry, mes_vencimento_combo, ano_vencimento_combo):
     cartao = cartao_combo.get()
-    valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
+    valor_str = valor_entry.get().strip()
     parcelas_str = parcelas_entry.get().strip()
     descricao = descricao_entry.get().strip()
     mes_vencimento_str = mes_vencimento_combo.get()
@@ -323,58 +211,17 @@ def adicionar_fatura_parcelada(cartao_combo, valor_entry, parcelas_entry, descri
         return
 
     try:
-        valor_total = float(valor_str)
+        valor_total = core.converter_valor(valor_str)
         num_parcelas = int(parcelas_str)
-        parcela_mensal = valor_total / num_parcelas
         mes_vencimento = [m[1] for m in meses].index(mes_vencimento_str) + 1
         ano_vencimento = int(ano_vencimento_str)
+        core.adicionar_fatura_parcelada(cartao, descricao, valor_total, num_parcelas, ano_vencimento, mes_vencimento)
     except (ValueError, IndexError):
         mostrar_erro("Valores de entrada inválidos.")
         return
-    
-    # Adicionar o item à lista de parcelamentos
-    dados = carregar_dados(ano_vencimento, mes_vencimento)
-    dados['cartoes_parcelados'].append({
-        'cartao': cartao,
-        'descricao': descricao,
-        'valor_total': valor_total,
-        'valor_parcela': parcela_mensal,
-        'num_parcelas': num_parcelas,
-        'parcelas_restantes': num_parcelas,
-        'ano_vencimento': ano_vencimento,
-        'mes_vencimento': mes_vencimento,
-        'data_registro': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    })
-    salvar_dados(dados, ano_vencimento, mes_vencimento)
-
-    # Lançar a primeira parcela como despesa
-    dados_primeira_parcela = carregar_dados(ano_vencimento, mes_vencimento)
-    dados_primeira_parcela['despesas'].append({
-        'descricao': f"{cartao} - Parcela 1/{num_parcelas}: {descricao}",
-        'valor': parcela_mensal,
-        'observacoes': "", # Adicionado campo de observação vazio para a transação gerada
-        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    })
-    dados_primeira_parcela['caixas']['conta_corrente'] -= parcela_mensal
-    salvar_dados(dados_primeira_parcela, ano_vencimento, mes_vencimento)
-
-    # Projetar as parcelas futuras
-    for i in range(1, num_parcelas):
-        mes_futuro = mes_vencimento + i
-        ano_futuro = ano_vencimento
-        if mes_futuro > 12:
-            mes_futuro -= 12
-            ano_futuro += 1
-        
-        dados_futuros = carregar_dados(ano_futuro, mes_futuro)
-        dados_futuros['despesas'].append({
-            'descricao': f"{cartao} - Parcela {i+1}/{num_parcelas}: {descricao}",
-            'valor': parcela_mensal,
-            'observacoes': "", # Adicionado campo de observação vazio para a transação gerada
-            'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
-        dados_futuros['caixas']['conta_corrente'] -= parcela_mensal
-        salvar_dados(dados_futuros, ano_futuro, mes_futuro)
+    except core.ConflitoMeses as e:
+        mostrar_erro(str(e))
+        return
 
     messagebox.showinfo("Sucesso", "Compra parcelada adicionada e projetada com sucesso!")
     limpar_campos([cartao_combo, valor_compra_entry, parcelas_entry, descricao_compra_entry])
@@ -391,43 +238,13 @@ def excluir_transacao(treeview, tipo_dados):
 
     resposta = messagebox.askyesno("Confirmar Exclusão", "Tem certeza de que deseja excluir esta transação?")
     if resposta:
-        item_para_excluir = treeview.item(item_selecionado[0])
-        dados_item = item_para_excluir['values']
-        descricao_excluir = dados_item[0]
-        valor_excluir = float(str(dados_item[1]).replace('R$ ', '').replace('.', '').replace(',', '.'))
-        
-        dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-
-        if tipo_dados == 'entradas':
-            # Filtrar a lista de entradas para remover o item selecionado
-            dados['entradas'] = [item for item in dados['entradas'] if not (item['descricao'] == descricao_excluir and item['valor'] == valor_excluir)]
-            dados['caixas']['conta_corrente'] -= valor_excluir
-        elif tipo_dados == 'despesas':
-            # Filtrar a lista de despesas para remover o item selecionado
-            dados['despesas'] = [item for item in dados['despesas'] if not (item['descricao'] == descricao_excluir and item['valor'] == valor_excluir)]
-            dados['caixas']['conta_corrente'] += valor_excluir
-        elif tipo_dados == 'investimentos':
-            # Encontrar o item exato para remover
-            encontrado = False
-            for i, item in enumerate(dados['investimentos']):
-                # Usar a data para garantir que estamos excluindo a transação correta, caso haja valores e descrições duplicadas.
-                if item['descricao'] == descricao_excluir and item['valor'] == valor_excluir:
-                    dados['investimentos'].pop(i)
-                    
-                    # LINHA CRÍTICA: DEVOLVE O DINHEIRO AO CAIXA DA CONTA CORRENTE
-                    dados['caixas']['conta_corrente'] += valor_excluir
-                    
-                    # Subtrai também do saldo do investimento
-                    if descricao_excluir in dados['caixas']['investimentos']:
-                        dados['caixas']['investimentos'][descricao_excluir] -= valor_excluir
-                    encontrado = True
-                    break
-            
-            if not encontrado:
-                messagebox.showerror("Erro", "Transação de investimento não encontrada.")
-                return
-                
-        salvar_dados(dados, ANO_ATUAL, MES_ATUAL)
+        # O iid da linha é o id do lançamento
+        try:
+            core.excluir_transacao(tipo_dados, item_selecionado[0], ANO_ATUAL, MES_ATUAL)
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
+            return
+
         messagebox.showinfo("Sucesso", "Transação excluída com sucesso!")
         atualizar_tabelas_e_resumo()
 
@@ -441,155 +258,212 @@ def excluir_fatura_parcelada(treeview):
 
     resposta = messagebox.askyesno("Confirmar Exclusão", "Tem certeza de que deseja excluir esta fatura parcelada? As despesas mensais já lançadas não serão removidas.")
     if resposta:
-        item_para_excluir = treeview.item(item_selecionado[0])
-        dados_item = item_para_excluir['values']
-        
-        # Obter a descrição original da fatura
-        cartao = dados_item[0]
-        descricao = dados_item[1]
-        
-        dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-
-        faturas_mantidas = []
-        for fatura in dados['cartoes_parcelados']:
-            if not (fatura['cartao'] == cartao and fatura['descricao'] == descricao):
-                faturas_mantidas.append(fatura)
-        
-        dados['cartoes_parcelados'] = faturas_mantidas
-        
-        salvar_dados(dados, ANO_ATUAL, MES_ATUAL)
+        try:
+            core.excluir_fatura_parcelada(item_selecionado[0], ANO_ATUAL, MES_ATUAL)
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
+            return
         messagebox.showinfo("Sucesso", "Fatura parcelada excluída com sucesso!")
         atualizar_tabela_cartoes()
 
+def linhas_transacoes(itens):
+    linhas = []
+    valores_str = formatar_moedas([item['valor'] for item in itens])
+    for item, valor_str in zip(itens, valores_str):
+        data_formatada = formatar_data(item['data'])
+        linhas.append((item['id'], (item['descricao'], valor_str, item.get('observacoes', ''), data_formatada)))
+    return linhas
+
+# --- Tabelas de lançamentos paginadas ---
+# Meses com milhares de lançamentos (compras de cartão discriminadas) não vão
+# inteiros para o Tk. A lista do mês fica em Python, onde é filtrada e
+# ordenada, e a Treeview recebe só as primeiras TAMANHO_PAGINA linhas; a
+# página seguinte é acrescentada quando a rolagem chega perto do fim. Cada
+# atualização passa por sincronizar_treeview (ver tabelas.py), então só as
+# linhas exibidas que mudaram são tocadas, e só elas são formatadas.
+TAMANHO_PAGINA = 200
+MARGEM_ROLAGEM = 0.1  # fração da tabela antes do fim em que a próxima página é carregada
+COLUNAS_LANCAMENTOS = ('Descrição', 'Valor', 'Observações', 'Data')
+tabelas_paginadas = {}  # str(treeview) -> estado da tabela (ver criar_tabela_lancamentos)
+
+def exibir_pagina(estado):
+    visiveis = estado['visiveis']
+    exibidas = min(estado['exibidas'], len(visiveis))
+    sincronizar_treeview(estado['tree'], linhas_transacoes(visiveis[:exibidas]))
+    if exibidas < len(estado['itens']):
+        estado['rotulo'].config(text=f"Mostrando {exibidas} de {len(visiveis)}" + (f" (filtro sobre {len(estado['itens'])})" if estado['filtro'] else ""))
+    else:
+        estado['rotulo'].config(text="")
+
+# Refaz a lista exibida a partir dos itens do mês, com o filtro e a ordem atuais
+def aplicar_filtro_e_ordem(estado):
+    estado['visiveis'] = filtrar_e_ordenar(estado['itens'], estado['filtro'], estado['coluna'], estado['decrescente'])
+    exibir_pagina(estado)
+
+# Novos itens (lista do cache: não é modificada). Ao trocar de mês a tabela
+# volta para a primeira página.
+def definir_itens_tabela(treeview, itens):
+    estado = tabelas_paginadas[str(treeview)]
+    if estado['mes'] != (ANO_ATUAL, MES_ATUAL):
+        estado['mes'] = (ANO_ATUAL, MES_ATUAL)
+        estado['exibidas'] = TAMANHO_PAGINA
+        treeview.yview_moveto(0)
+    estado['itens'] = itens
+    aplicar_filtro_e_ordem(estado)
+
+def filtrar_tabela(estado, texto):
+    estado['filtro'] = core.normalizar_texto(texto)
+    estado['exibidas'] = TAMANHO_PAGINA
+    aplicar_filtro_e_ordem(estado)
+    estado['tree'].yview_moveto(0)
+
+# Clicar no cabeçalho ordena pela coluna; de novo, inverte a ordem
+def ordenar_tabela(estado, coluna):
+    if estado['coluna'] == coluna:
+        estado['decrescente'] = not estado['decrescente']
+    else:
+        estado['coluna'], estado['decrescente'] = coluna, False
+    for nome in COLUNAS_LANCAMENTOS:
+        seta = (' ▼' if estado['decrescente'] else ' ▲') if nome == coluna else ''
+        estado['tree'].heading(nome, text=nome + seta)
+    aplicar_filtro_e_ordem(estado)
+
+def carregar_proxima_pagina(estado):
+    estado['agendado'] = False
+    if estado['exibidas'] < len(estado['visiveis']):
+        estado['exibidas'] += TAMANHO_PAGINA
+        exibir_pagina(estado)
+
+# yscrollcommand da Treeview: atualiza a barra e, perto do fim, agenda a
+# próxima página (fora do callback de rolagem do Tk)
+def ao_rolar_tabela(estado, barra, primeiro, ultimo):
+    barra.set(primeiro, ultimo)
+    if float(ultimo) >= 1 - MARGEM_ROLAGEM and not estado['agendado'] and estado['exibidas'] < len(estado['visiveis']):
+        estado['agendado'] = True
+        janela.after_idle(carregar_proxima_pagina, estado)
+
+# Filtro, Treeview e barra de rolagem de uma lista de lançamentos dentro de 'frame'
+def criar_tabela_lancamentos(frame):
+    frame_filtro = ttk.Frame(frame)
+    frame_filtro.pack(fill="x", pady=(0, 5))
+    ttk.Label(frame_filtro, text="Filtrar:", font=FONTE_PADRAO).pack(side=tk.LEFT)
+    filtro_var = tk.StringVar()
+    ttk.Entry(frame_filtro, textvariable=filtro_var, width=30).pack(side=tk.LEFT, padx=5)
+    rotulo = ttk.Label(frame_filtro, text="", font=FONTE_PADRAO)
+    rotulo.pack(side=tk.RIGHT)
+
+    frame_tree = ttk.Frame(frame)
+    frame_tree.pack(fill="both", expand=True)
+    treeview = ttk.Treeview(frame_tree, columns=COLUNAS_LANCAMENTOS, show='headings')
+    barra = ttk.Scrollbar(frame_tree, orient="vertical", command=treeview.yview)
+    estado = {'tree': treeview, 'rotulo': rotulo, 'mes': None, 'itens': [], 'visiveis': [], 'exibidas': TAMANHO_PAGINA,
+              'filtro': '', 'coluna': None, 'decrescente': False, 'agendado': False}
+    tabelas_paginadas[str(treeview)] = estado
+    for coluna, largura, ancora in (('Descrição', 200, 'w'), ('Valor', 100, 'e'), ('Observações', 200, 'w'), ('Data', 100, 'e')):
+        treeview.heading(coluna, text=coluna, command=lambda coluna=coluna: ordenar_tabela(estado, coluna))
+        treeview.column(coluna, width=largura, anchor=ancora)
+    treeview.configure(yscrollcommand=lambda primeiro, ultimo: ao_rolar_tabela(estado, barra, primeiro, ultimo))
+    filtro_var.trace_add('write', lambda *args: filtrar_tabela(estado, filtro_var.get()))
+    barra.pack(side="right", fill="y")
+    treeview.pack(fill="both", expand=True)
+    return treeview
+
 # Funções para atualizar a Treeview e totais
 def atualizar_tabelas():
     global ANO_ATUAL, MES_ATUAL
 
-    for i in tree_entradas.get_children():
-        tree_entradas.delete(i)
-    for i in tree_despesas.get_children():
-        tree_despesas.delete(i)
-    for i in tree_investimentos.get_children():
-        tree_investimentos.delete(i)
+    dados = core.carregar_dados(ANO_ATUAL, MES_ATUAL, somente_leitura=True)
     
-    dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    
-    total_entradas = 0
-    for item in dados['entradas']:
-        valor_str = f"R$ {item['valor']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_formatada = datetime.strptime(item['data'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y')
-        tree_entradas.insert('', 'end', values=(item['descricao'], valor_str, item.get('observacoes', ''), data_formatada))
-        total_entradas += item['valor']
-        
-    total_despesas = 0
-    for item in dados['despesas']:
-        valor_str = f"R$ {item['valor']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_formatada = datetime.strptime(item['data'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y')
-        tree_despesas.insert('', 'end', values=(item['descricao'], valor_str, item.get('observacoes', ''), data_formatada))
-        total_despesas += item['valor']
-        
-    total_investimentos = 0
-    for item in dados['investimentos']:
-        valor_str = f"R$ {item['valor']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_formatada = datetime.strptime(item['data'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y')
-        tree_investimentos.insert('', 'end', values=(item['descricao'], valor_str, item.get('observacoes', ''), data_formatada))
-        total_investimentos += item['valor']
+    definir_itens_tabela(tree_entradas, dados['entradas'])
+    definir_itens_tabela(tree_despesas, dados['despesas'])
+    definir_itens_tabela(tree_investimentos, dados['investimentos'])
+
+    total_entradas = sum(item['valor'] for item in dados['entradas'])
+    total_despesas = sum(item['valor'] for item in dados['despesas'])
+    total_investimentos = sum(item['valor'] for item in dados['investimentos'])
 
     # Atualizar totais e porcentagens na aba de visualização
     total_receitas = total_entradas
     
-    lbl_entradas_total.config(text=f"Total: R$ {total_entradas:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
+    lbl_entradas_total.config(text=f"Total: {formatar_moeda(total_entradas)}")
     
-    lbl_despesas_total.config(text=f"Total: R$ {total_despesas:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    lbl_despesas_pct.config(text=f"({(total_despesas/total_receitas)*100:.2f}%)" if total_receitas > 0 else "(0,00%)")
+    lbl_despesas_total.config(text=f"Total: {formatar_moeda(total_despesas)}")
+    lbl_despesas_pct.config(text=f"({formatar_percentual((total_despesas/total_receitas)*100)})" if total_receitas > 0 else "(0,00%)")
 
-    lbl_investimentos_total.config(text=f"Total: R$ {total_investimentos:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    lbl_investimentos_pct.config(text=f"({(total_investimentos/total_receitas)*100:.2f}%)" if total_receitas > 0 else "(0,00%)")
+    lbl_investimentos_total.config(text=f"Total: {formatar_moeda(total_investimentos)}")
+    lbl_investimentos_pct.config(text=f"({formatar_percentual((total_investimentos/total_receitas)*100)})" if total_receitas > 0 else "(0,00%)")
 
 def atualizar_tabela_cartoes():
     global ANO_ATUAL, MES_ATUAL
     
-    for i in tree_cartoes_parcelados.get_children():
-        tree_cartoes_parcelados.delete(i)
+    dados = core.carregar_dados(ANO_ATUAL, MES_ATUAL, somente_leitura=True)
     
-    dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    
-    for item in dados['cartoes_parcelados']:
-        valor_parcela_str = f"R$ {item['valor_parcela']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_registro_formatada = datetime.strptime(item['data_registro'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y')
-        tree_cartoes_parcelados.insert('', 'end', values=(
+    itens = dados['cartoes_parcelados']
+    linhas = []
+    for item, valor_parcela_str in zip(itens, formatar_moedas([item['valor_parcela'] for item in itens])):
+        data_registro_formatada = formatar_data(item['data_registro'])
+        linhas.append((item['id'], (
             item['cartao'],
             item['descricao'],
             valor_parcela_str,
             f"{item['parcelas_restantes']}/{item['num_parcelas']}",
             data_registro_formatada
-        ))
+        )))
+    sincronizar_treeview(tree_cartoes_parcelados, linhas)
         
-# Função auxiliar para pegar dados de investimentos do mês anterior
-def get_investimentos_mes_anterior(ano, mes):
-    mes_anterior = mes - 1
-    ano_anterior = ano
-    if mes_anterior == 0:
-        mes_anterior = 12
-        ano_anterior -= 1
-    
-    dados_anterior = carregar_dados(ano_anterior, mes_anterior)
-    return dados_anterior['caixas']['investimentos']
-
-
 def atualizar_resumo():
     global ANO_ATUAL, MES_ATUAL
 
-    dados_atual = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    dados_anterior_invest = get_investimentos_mes_anterior(ANO_ATUAL, MES_ATUAL)
+    resumo = core.resumo_mes(ANO_ATUAL, MES_ATUAL)
+    dados_anterior_invest = resumo['investimentos_anterior']
     
-    total_entradas = sum(item['valor'] for item in dados_atual['entradas'])
-    total_despesas = sum(item['valor'] for item in dados_atual['despesas'])
-    total_investimentos = sum(item['valor'] for item in dados_atual['investimentos'])
+    total_entradas = resumo['total_entradas']
+    total_despesas = resumo['total_despesas']
+    total_investimentos = resumo['total_investimentos']
 
-    saldo_total = total_entradas - total_despesas
+    saldo_total = resumo['saldo']
 
     # Atualizar variáveis
-    total_entradas_var.set(f"R$ {total_entradas:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    total_despesas_var.set(f"R$ {total_despesas:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    total_investimentos_var.set(f"R$ {total_investimentos:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    saldo_total_var.set(f"R$ {saldo_total:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
+    total_entradas_var.set(formatar_moeda(total_entradas))
+    total_despesas_var.set(formatar_moeda(total_despesas))
+    total_investimentos_var.set(formatar_moeda(total_investimentos))
+    saldo_total_var.set(formatar_moeda(saldo_total))
     
     if total_entradas > 0:
-        pct_investimento = (total_investimentos / total_entradas) * 100
-        pct_investimento_var.set(f"{pct_investimento:,.2f}%".replace('.', '#').replace(',', '.').replace('#', ','))
+        pct_investimento = resumo['pct_investimento']
+        pct_investimento_var.set(formatar_percentual(pct_investimento))
     else:
         pct_investimento_var.set("0,00%")
 
     # Atualizar caixas
-    caixa_cc_valor = dados_atual['caixas']['conta_corrente']
-    caixa_invest_total = sum(dados_atual['caixas']['investimentos'].values())
-    caixa_total = caixa_cc_valor + caixa_invest_total
+    caixa_cc_valor = resumo['conta_corrente']
+    caixa_invest_total = resumo['caixa_investimentos']
+    caixa_total = resumo['caixa_total']
     
-    caixa_cc_var.set(f"R$ {caixa_cc_valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    caixa_invest_var.set(f"R$ {caixa_invest_total:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    caixa_total_var.set(f"R$ {caixa_total:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
+    caixa_cc_inicial_var.set(formatar_moeda(resumo['conta_corrente_inicial']))
+    caixa_cc_var.set(formatar_moeda(caixa_cc_valor))
+    caixa_invest_var.set(formatar_moeda(caixa_invest_total))
+    caixa_total_var.set(formatar_moeda(caixa_total))
     
     # Atualizar lista de investimentos com a nova análise de variação
-    for i in tree_caixa_investimentos.get_children():
-        tree_caixa_investimentos.delete(i)
-    
-    for invest, valor_atual in dados_atual['caixas']['investimentos'].items():
-        valor_anterior = dados_anterior_invest.get(invest, 0.0)
+    linhas = []
+    for invest, valor_atual in resumo['investimentos'].items():
+        valor_anterior = dados_anterior_invest.get(invest, 0)
         
         if valor_anterior > 0:
             variacao_pct = ((valor_atual - valor_anterior) / valor_anterior) * 100
-            variacao_str = f"{variacao_pct:,.2f}%".replace('.', '#').replace(',', '.').replace('#', ',')
+            variacao_str = formatar_percentual(variacao_pct)
         elif valor_atual > 0:
             variacao_str = "+ Inf."
         else:
             variacao_str = "0,00%"
 
-        tree_caixa_investimentos.insert('', 'end', values=(
+        linhas.append((invest, (
             invest, 
-            f"R$ {valor_atual:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','), 
+            formatar_moeda(valor_atual), 
             variacao_str
-        ))
+        )))
+    sincronizar_treeview(tree_caixa_investimentos, linhas)
 
 
 def atualizar_tabelas_e_resumo():
@@ -597,6 +471,7 @@ def atualizar_tabelas_e_resumo():
     atualizar_resumo()
     atualizar_comparativo_despesas()
     atualizar_tabela_cartoes()
+    agendar_grafico()
 
 def forcar_atualizacao():
     atualizar_tabelas_e_resumo()
@@ -618,224 +493,291 @@ def carregar_mes_selecionado(event=None):
         atualizar_tabelas_e_resumo()
         messagebox.showinfo("Sucesso", f"Dados de {mes_str}/{ano} carregados!")
 
-# Função para gerar gráficos
+# --- Gráfico do orçamento ---
+# Um único gráfico, embutido na aba "Gráfico" e criado na primeira vez que é
+# pedido. Quando o mês muda as fatias e os textos da pizza são ajustados no
+# lugar, sem criar outra figura, e o desenho é agendado: vários pedidos
+# seguidos viram um só desenho.
+ATRASO_GRAFICO_MS = 50
+ROTULOS_GRAFICO = ['Receitas', 'Despesas', 'Investimentos']
+CORES_GRAFICO = ['#4CAF50', '#F44336', '#2196F3']
+ANGULO_INICIAL_GRAFICO = 90
+grafico = None            # figura, canvas e elementos da pizza (ver criar_grafico)
+grafico_agendado = None   # id do janela.after do próximo desenho
+
+def criar_grafico():
+    global grafico
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    figura = Figure(figsize=(6, 5))
+    eixo = figura.add_subplot()
+    fatias, rotulos, percentuais = eixo.pie([1] * len(ROTULOS_GRAFICO), labels=ROTULOS_GRAFICO, autopct='%1.1f%%', startangle=ANGULO_INICIAL_GRAFICO, colors=CORES_GRAFICO, wedgeprops={'edgecolor': 'white'})
+    aviso = eixo.text(0, 0, "Sem lançamentos neste mês", ha='center', va='center', visible=False)
+    canvas = FigureCanvasTkAgg(figura, master=aba_grafico)
+    canvas.get_tk_widget().pack(fill="both", expand=True)
+    grafico = {'canvas': canvas, 'eixo': eixo, 'fatias': fatias, 'rotulos': rotulos, 'percentuais': percentuais, 'aviso': aviso}
+
+# Ajusta a pizza para o mês atual (mesma geometria que ax.pie usaria)
+def atualizar_grafico():
+    global ANO_ATUAL, MES_ATUAL, grafico_agendado
+    grafico_agendado = None
+    if grafico is None:
+        return
+    resumo = core.resumo_mes(ANO_ATUAL, MES_ATUAL)
+    valores = [resumo['total_entradas'], resumo['total_despesas'], resumo['total_investimentos']]
+    total = sum(valores)
+    grafico['aviso'].set_visible(total == 0)
+    inicio = ANGULO_INICIAL_GRAFICO
+    for fatia, rotulo, percentual, valor in zip(grafico['fatias'], grafico['rotulos'], grafico['percentuais'], valores):
+        fracao = valor / total if total else 0
+        fim = inicio + fracao * 360
+        fatia.set_theta1(inicio)
+        fatia.set_theta2(fim)
+        meio = math.radians((inicio + fim) / 2)
+        x, y = math.cos(meio), math.sin(meio)
+        rotulo.set_position((1.1 * x, 1.1 * y))
+        rotulo.set_horizontalalignment('left' if x > 0 else 'right')
+        percentual.set_position((0.6 * x, 0.6 * y))
+        percentual.set_text(f"{fracao * 100:.1f}%")
+        for artista in (fatia, rotulo, percentual):
+            artista.set_visible(total != 0)
+        inicio = fim
+    grafico['eixo'].set_title(f'Resumo do Orçamento {combo_mes.get()}/{combo_ano.get()}')
+    grafico['canvas'].draw_idle()
+
+def agendar_grafico():
+    global grafico_agendado
+    if grafico is not None and grafico_agendado is None:
+        grafico_agendado = janela.after(ATRASO_GRAFICO_MS, atualizar_grafico)
+
 def gerar_grafico_orcamento():
-    global ANO_ATUAL, MES_ATUAL
-    dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    
-    total_entradas = sum(item['valor'] for item in dados['entradas'])
-    total_despesas = sum(item['valor'] for item in dados['despesas'])
-    total_investimentos = sum(item['valor'] for item in dados['investimentos'])
+    if grafico is None:
+        criar_grafico()
+    notebook.select(aba_grafico)
+    agendar_grafico()
+
+# --- Relatório em PDF ---
+# Tarefas demoradas (relatórios) rodam numa thread separada com uma janela de
+# progresso e um botão Cancelar; a janela principal continua respondendo. A
+# thread não toca no Tk: ela manda progresso e resultado por uma fila que a
+# janela lê com janela.after. Só uma tarefa roda por vez.
+INTERVALO_ACOMPANHAMENTO_MS = 100
+tarefa_em_andamento = None  # dados da tarefa em curso (ver iniciar_tarefa)
+
+# 'trabalhar(eventos, cancelado)' roda na thread e coloca em 'eventos':
+#   ('progresso', fração de 0 a 1)
+#   ('concluido', (mensagem, caminho a abrir)), ('erro', mensagem) ou ('cancelado', None)
+# 'ao_cancelar', se informado, é chamado (na thread da interface) quando o
+# usuário cancela, além de ligar o evento 'cancelado'.
+def iniciar_tarefa(titulo, texto, trabalhar, ao_cancelar=None):
+    global tarefa_em_andamento
+    cancelado = threading.Event()
+    eventos = queue.Queue()
+
+    dialogo = tk.Toplevel(janela)
+    dialogo.title(titulo)
+    dialogo.resizable(False, False)
+    frame = ttk.Frame(dialogo, padding="10")
+    frame.pack()
+    ttk.Label(frame, text=texto).pack(pady=5)
+    barra = ttk.Progressbar(frame, length=300, maximum=100, mode='determinate')
+    barra.pack(pady=5)
+
+    def cancelar():
+        cancelado.set()
+        botao_cancelar.config(state='disabled')
+        if ao_cancelar is not None:
+            ao_cancelar()
+    botao_cancelar = ttk.Button(frame, text="Cancelar", command=cancelar)
+    botao_cancelar.pack(pady=5)
+    dialogo.protocol("WM_DELETE_WINDOW", cancelar)
+
+    tarefa_em_andamento = {'dialogo': dialogo, 'barra': barra, 'eventos': eventos, 'cancelar': cancelar}
+    threading.Thread(target=trabalhar, args=(eventos, cancelado), daemon=True).start()
+    janela.after(INTERVALO_ACOMPANHAMENTO_MS, acompanhar_tarefa)
+
+def acompanhar_tarefa():
+    global tarefa_em_andamento
+    andamento = tarefa_em_andamento
+    while True:
+        try:
+            tipo, valor = andamento['eventos'].get_nowait()
+        except queue.Empty:
+            break
+        if tipo == 'progresso':
+            andamento['barra']['value'] = valor * 100
+            continue
+        andamento['dialogo'].destroy()
+        tarefa_em_andamento = None
+        if tipo == 'concluido':
+            mensagem, caminho = valor
+            messagebox.showinfo("Sucesso", mensagem)
+            abrir_pdf(caminho)
+        elif tipo == 'erro':
+            messagebox.showerror("Erro", valor)
+        return
+    janela.after(INTERVALO_ACOMPANHAMENTO_MS, acompanhar_tarefa)
 
-    labels = ['Receitas', 'Despesas', 'Investimentos']
-    valores = [total_entradas, total_despesas, total_investimentos]
-    cores = ['#4CAF50', '#F44336', '#2196F3']
-    
-    figura, ax = plt.subplots()
-    ax.pie(valores, labels=labels, autopct='%1.1f%%', startangle=90, colors=cores, wedgeprops={'edgecolor': 'white'})
-    ax.set_title(f'Resumo do Orçamento {combo_mes.get()}/{combo_ano.get()}')
-    plt.show()
+def tarefa_ocupada():
+    if tarefa_em_andamento is not None:
+        tarefa_em_andamento['dialogo'].lift()
+        return True
+    return False
 
-# FUNÇÃO `gerar_relatorio_pdf` ATUALIZADA
+# Os dados do mês são copiados aqui, na thread da interface: trocar de mês ou
+# lançar valores durante a geração não afeta o relatório.
 def gerar_relatorio_pdf():
     global ANO_ATUAL, MES_ATUAL
-    dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    
-    doc = SimpleDocTemplate(os.path.join(DATA_DIR, f"relatorio_orcamento_{ANO_ATUAL}_{MES_ATUAL:02d}.pdf"), pagesize=letter)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=24, alignment=1, spaceAfter=20, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='HeadingStyle', fontSize=14, alignment=0, spaceAfter=10, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='SubheadingStyle', fontSize=12, alignment=0, spaceAfter=8, fontName='Helvetica-Bold'))
+    import relatorio
+    if tarefa_ocupada():
+        return
+    dados = relatorio.dados_relatorio(ANO_ATUAL, MES_ATUAL)
+    caminho = relatorio.caminho_relatorio(ANO_ATUAL, MES_ATUAL)
 
-    story.append(Paragraph(f"Relatório de Orçamento - {combo_mes.get()}/{combo_ano.get()}", styles['TitleStyle']))
-    story.append(Spacer(1, 12))
-    
-    # Adicionar resumo
-    total_entradas = sum(item['valor'] for item in dados['entradas'])
-    total_despesas = sum(item['valor'] for item in dados['despesas'])
-    total_investimentos = sum(item['valor'] for item in dados['investimentos'])
-    total_saidas = total_despesas + total_investimentos
-    saldo_final = total_entradas - total_saidas
-    
-    story.append(Paragraph("Resumo Geral", styles['HeadingStyle']))
-    story.append(Paragraph(f"Total de Entradas: R$ {total_entradas:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')))
-    story.append(Paragraph(f"Total de Saídas: R$ {total_saidas:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')))
-    story.append(Paragraph(f"Saldo Final: R$ {saldo_final:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')))
-    
-    # Adicionar saldos dos caixas
-    caixa_cc_valor = dados['caixas']['conta_corrente']
-    caixa_invest_valor = sum(dados['caixas']['investimentos'].values())
-    caixa_total_valor = caixa_cc_valor + caixa_invest_valor
-    story.append(Spacer(1, 12))
-    story.append(Paragraph("Saldos Atuais dos Caixas:", styles['SubheadingStyle']))
-    story.append(Paragraph(f"Saldo Conta Corrente: R$ {caixa_cc_valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')))
-    story.append(Paragraph(f"Saldo Total de Investimentos: R$ {caixa_invest_valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')))
-    story.append(Paragraph(f"Saldo Total (CC + Investimentos): R$ {caixa_total_valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')))
-    story.append(Spacer(1, 24))
-
-
-    # Tabela de Receitas
-    story.append(Paragraph("Detalhamento das Receitas", styles['HeadingStyle']))
-    data_receitas = [['Descrição', 'Valor (R$)', 'Observações', 'Data']]
-    for item in dados['entradas']:
-        valor_str = f"R$ {item['valor']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_formatada = datetime.strptime(item['data'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y')
-        data_receitas.append([item['descricao'], valor_str, item.get('observacoes', ''), data_formatada])
-    t_receitas = Table(data_receitas, colWidths=[2.5*inch, 1*inch, 2*inch, 1*inch])
-    t_receitas.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    story.append(t_receitas)
-    story.append(Spacer(1, 12))
-
-    # Tabela de Despesas AGRUPADA por categoria
-    story.append(Paragraph("Resumo de Despesas por Categoria", styles['HeadingStyle']))
-    despesas_agrupadas = {}
-    for item in dados['despesas']:
-        descricao = item['descricao']
-        valor = item['valor']
-        despesas_agrupadas[descricao] = despesas_agrupadas.get(descricao, 0) + valor
-
-    data_despesas = [['Categoria', 'Valor Total (R$)']]
-    for categoria, valor in sorted(despesas_agrupadas.items()):
-        valor_str = f"R$ {valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_despesas.append([categoria, valor_str])
-
-    t_despesas = Table(data_despesas, colWidths=[4*inch, 2.5*inch])
-    t_despesas.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    story.append(t_despesas)
-    story.append(Spacer(1, 12))
-
-
-    # Tabela de Investimentos
-    story.append(Paragraph("Detalhamento dos Investimentos", styles['HeadingStyle']))
-    data_investimentos = [['Descrição', 'Valor (R$)', 'Observações', 'Data']]
-    for item in dados['investimentos']:
-        valor_str = f"R$ {item['valor']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-        data_formatada = datetime.strptime(item['data'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y')
-        data_investimentos.append([item['descricao'], valor_str, item.get('observacoes', ''), data_formatada])
-    t_investimentos = Table(data_investimentos, colWidths=[2.5*inch, 1*inch, 2*inch, 1*inch])
-    t_investimentos.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    story.append(t_investimentos)
-    story.append(Spacer(1, 24))
-
-    # Comparativo de Faturas de Cartão de Crédito
-    story.append(Paragraph("Comparativo de Faturas de Cartão de Crédito", styles['HeadingStyle']))
-    meses_comparativos = []
-    for i in range(12):
-        mes_temp = MES_ATUAL - i
-        ano_temp = ANO_ATUAL
-        if mes_temp <= 0:
-            mes_temp += 12
-            ano_temp -= 1
-        meses_comparativos.append((ano_temp, mes_temp))
-    meses_comparativos.reverse()
-
-    cartoes = ['Cartão de crédito Itaú', 'Cartão de crédito BVI', 'Cartão de crédito XP', 'Cartão credito ML', 'Cartão RCHLO']
-    
-    # Criar um dicionário para armazenar os valores mensais de cada cartão
-    valores_mensais = {cartao: [] for cartao in cartoes}
-    
-    # Obter os dados de despesas de todos os meses para os cálculos
-    for ano_comp, mes_comp in meses_comparativos:
-        dados_mes = carregar_dados(ano_comp, mes_comp)
-        for cartao in cartoes:
-            valor_cartao = sum(d['valor'] for d in dados_mes['despesas'] if cartao in d['descricao'])
-            valores_mensais[cartao].append(valor_cartao)
-
-    # Preparar a tabela com cabeçalhos
-    data_cartoes = [['Mês/Ano'] + cartoes]
-
-    # Preencher a tabela com os dados, incluindo variação
-    for i, (ano_comp, mes_comp) in enumerate(meses_comparativos):
-        row = [f"{calendar.month_name[mes_comp].capitalize()}/{ano_comp}"]
-        
-        for cartao in cartoes:
-            valor_atual = valores_mensais[cartao][i]
-            
-            if i > 0:
-                valor_anterior = valores_mensais[cartao][i-1]
-                variacao = valor_atual - valor_anterior
-                if valor_anterior > 0:
-                    pct_variacao = (variacao / valor_anterior) * 100
+    def gerar(eventos, cancelado):
+        try:
+            relatorio.gerar_pdf(dados, caminho, progresso=lambda fracao: eventos.put(('progresso', fracao)), cancelado=cancelado)
+        except relatorio.RelatorioCancelado:
+            eventos.put(('cancelado', None))
+        except Exception as e:
+            eventos.put(('erro', f"Não foi possível gerar o relatório PDF: {e}"))
+        else:
+            eventos.put(('concluido', ("Relatório PDF gerado com sucesso!", caminho)))
+
+    iniciar_tarefa("Gerando Relatório", f"Gerando o relatório de {combo_mes.get()}/{combo_ano.get()}...", gerar)
+
+# Relatórios de vários meses. A exportação roda em outro programa
+# (python relatorio.py ...), que usa vários processos: no Windows cada
+# processo novo reexecuta o script principal, e este aqui abriria uma janela.
+# O programa imprime o caminho de cada PDF pronto, o que serve de progresso.
+def exportar_relatorios_lote():
+    if tarefa_ocupada():
+        return
+
+    dialog = tk.Toplevel(janela)
+    dialog.title("Exportar Relatórios em Lote")
+    dialog.grab_set()
+
+    frame = ttk.Frame(dialog, padding="10")
+    frame.pack()
+
+    ttk.Label(frame, text="De:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5, sticky='w')
+    mes_inicio_combo = ttk.Combobox(frame, values=meses_nomes, state="readonly", width=12)
+    mes_inicio_combo.set(meses_nomes[0])
+    mes_inicio_combo.grid(row=0, column=1, padx=5, pady=5)
+    ano_inicio_combo = ttk.Combobox(frame, values=anos, state="readonly", width=6)
+    ano_inicio_combo.set(str(ANO_ATUAL))
+    ano_inicio_combo.grid(row=0, column=2, padx=5, pady=5)
+
+    ttk.Label(frame, text="Até:", font=FONTE_PADRAO).grid(row=1, column=0, padx=5, pady=5, sticky='w')
+    mes_fim_combo = ttk.Combobox(frame, values=meses_nomes, state="readonly", width=12)
+    mes_fim_combo.set(meses_nomes[-1])
+    mes_fim_combo.grid(row=1, column=1, padx=5, pady=5)
+    ano_fim_combo = ttk.Combobox(frame, values=anos, state="readonly", width=6)
+    ano_fim_combo.set(str(ANO_ATUAL))
+    ano_fim_combo.grid(row=1, column=2, padx=5, pady=5)
+
+    combinado_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(frame, text="Um único PDF com sumário", variable=combinado_var).grid(row=2, column=0, columnspan=3, padx=5, pady=5, sticky='w')
+
+    def exportar():
+        import relatorio
+        inicio = (int(ano_inicio_combo.get()), meses_nomes.index(mes_inicio_combo.get()) + 1)
+        fim = (int(ano_fim_combo.get()), meses_nomes.index(mes_fim_combo.get()) + 1)
+        combinado = combinado_var.get()
+        texto = f"Gerando os relatórios de {mes_inicio_combo.get()}/{inicio[0]} a {mes_fim_combo.get()}/{fim[0]}..."
+        try:
+            total = 1 if combinado else len(relatorio.meses_entre(inicio, fim))
+            # O outro programa lê os dados do disco
+            core.gravar_pendentes()
+        except ValueError as e:
+            mostrar_erro(str(e))
+            return
+        except core.ERROS_GRAVACAO as e:
+            mostrar_erro(f"Não foi possível salvar os dados: {e}")
+            return
+        dialog.destroy()
+
+        destino = os.path.abspath(core.DATA_DIR)
+        comando = [sys.executable, relatorio.__file__, f"{inicio[0]}-{inicio[1]:02d}", f"{fim[0]}-{fim[1]:02d}", '--destino', destino]
+        if combinado:
+            comando.append('--combinado')
+        ambiente = dict(os.environ, ORCAMENTO_DATA_DIR=core.DATA_DIR, ORCAMENTO_BACKEND=core.BACKEND_ARMAZENAMENTO, PYTHONIOENCODING='utf-8')
+        # Os erros vão para um arquivo temporário: com os dois em PIPE o outro
+        # programa pode travar escrevendo no stderr cheio enquanto o stdout é lido
+        erros = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=erros, encoding='utf-8', env=ambiente,
+                                    creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+
+        def acompanhar(eventos, cancelado):
+            prontos = []
+            for linha in processo.stdout:
+                prontos.append(linha.strip())
+                eventos.put(('progresso', len(prontos) / total))
+            processo.wait()
+            with erros:
+                erros.seek(0)
+                erro = erros.read().strip()
+            if processo.returncode == 0 and not prontos:
+                # O processo terminou sem informar nenhum arquivo gerado
+                eventos.put(('erro', "Não foi possível gerar os relatórios: nenhum relatório foi gerado."))
+            elif processo.returncode == 0:
+                if combinado:
+                    eventos.put(('concluido', (f"Relatório PDF gerado em {prontos[0]}.", prontos[0])))
                 else:
-                    pct_variacao = 0 if valor_atual == 0 else 100
-                
-                variacao_str = f"R$ {variacao:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-                pct_variacao_str = f"{pct_variacao:,.2f}%".replace('.', '#').replace(',', '.').replace('#', ',')
-                
-                row.append(f"R$ {valor_atual:,.2f} ({variacao_str}, {pct_variacao_str})".replace('.', '#').replace(',', '.').replace('#', ','))
+                    # A pasta onde os PDFs foram de fato gravados
+                    pasta = os.path.dirname(os.path.abspath(prontos[0]))
+                    eventos.put(('concluido', (f"{len(prontos)} relatórios PDF gerados em {pasta}.", pasta)))
+            elif cancelado.is_set():
+                eventos.put(('cancelado', None))
             else:
-                row.append(f"R$ {valor_atual:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-        
-        data_cartoes.append(row)
+                eventos.put(('erro', f"Não foi possível gerar os relatórios: {erro.splitlines()[-1] if erro else processo.returncode}"))
 
+        iniciar_tarefa("Exportando Relatórios", texto, acompanhar, ao_cancelar=processo.terminate)
 
-    t_cartoes = Table(data_cartoes, colWidths=[1.5*inch, 1*inch, 1*inch, 1*inch, 1*inch, 1*inch])
-    t_cartoes.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    story.append(t_cartoes)
+    ttk.Button(frame, text="Exportar", command=exportar).grid(row=3, column=0, columnspan=3, pady=10)
 
-    doc.build(story)
-    messagebox.showinfo("Sucesso", "Relatório PDF gerado com sucesso!")
-    
-    # --- Código para abrir o PDF automaticamente ---
-    pdf_path = os.path.join(DATA_DIR, f"relatorio_orcamento_{ANO_ATUAL}_{MES_ATUAL:02d}.pdf")
+# Todo o histórico em uma única tabela (CSV ou Parquet). Exportar de novo para
+# o mesmo arquivo só relê os meses alterados desde a última vez.
+def exportar_historico():
+    if tarefa_ocupada():
+        return
+    caminho = filedialog.asksaveasfilename(title="Exportar Histórico", initialdir=core.DATA_DIR, initialfile="historico_orcamento.csv",
+                                           defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")])
+    if not caminho:
+        return
+    import exportacao
+
+    def exportar(eventos, cancelado):
+        try:
+            resultado = exportacao.exportar(caminho, progresso=lambda fracao: eventos.put(('progresso', fracao)), cancelado=cancelado)
+        except exportacao.ExportacaoCancelada:
+            eventos.put(('cancelado', None))
+        except Exception as e:
+            eventos.put(('erro', f"Não foi possível exportar o histórico: {e}"))
+        else:
+            eventos.put(('concluido', (f"Histórico de {resultado['meses']} mês(es) exportado para {caminho} ({resultado['meses_relidos']} mês(es) relido(s)).",
+                                       os.path.dirname(caminho))))
+
+    iniciar_tarefa("Exportando Histórico", f"Exportando o histórico para {os.path.basename(caminho)}...", exportar)
+
+# Abre o PDF (ou a pasta) no visualizador padrão do sistema
+def abrir_pdf(pdf_path):
     try:
         if sys.platform == 'win32':
             os.startfile(pdf_path)
         elif sys.platform == 'darwin': # macOS
-            os.system(f"open {pdf_path}")
+            subprocess.run(['open', pdf_path], check=True)
         else: # linux
-            os.system(f"xdg-open {pdf_path}")
+            subprocess.run(['xdg-open', pdf_path], check=True)
     except Exception as e:
         messagebox.showerror("Erro ao abrir PDF", f"Não foi possível abrir o arquivo PDF: {e}")
 
 def atualizar_comparativo_despesas():
     global ANO_ATUAL, MES_ATUAL
     
-    for item in tree_comparativo.get_children():
-        tree_comparativo.delete(item)
-
-    # Obter dados do mês atual
-    dados_atual = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    despesas_atual_dict = {item['descricao']: sum(d['valor'] for d in dados_atual['despesas'] if d['descricao'] == item['descricao']) for item in dados_atual['despesas']}
-    
-    # Obter dados do mês anterior
-    mes_anterior = MES_ATUAL - 1
-    ano_anterior = ANO_ATUAL
-    if mes_anterior == 0:
-        mes_anterior = 12
-        ano_anterior -= 1
-    
-    dados_anterior = carregar_dados(ano_anterior, mes_anterior)
-    despesas_anterior_dict = {item['descricao']: sum(d['valor'] for d in dados_anterior['despesas'] if d['descricao'] == item['descricao']) for item in dados_anterior['despesas']}
-
-    todas_categorias = set(despesas_atual_dict.keys()) | set(despesas_anterior_dict.keys())
-
-    for categoria in sorted(list(todas_categorias)):
-        valor_atual = despesas_atual_dict.get(categoria, 0)
-        valor_anterior = despesas_anterior_dict.get(categoria, 0)
-        
+    linhas = []
+    for categoria, valor_atual, valor_anterior in core.comparativo_despesas(ANO_ATUAL, MES_ATUAL):
         variacao = valor_atual - valor_anterior
         
         if valor_anterior > 0:
@@ -845,16 +787,57 @@ def atualizar_comparativo_despesas():
 
         # Formatar a variação
         if variacao > 0:
-            variacao_str = f"+ R$ {variacao:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-            pct_variacao_str = f"+{pct_variacao:,.2f}%".replace('.', '#').replace(',', '.').replace('#', ',')
+            variacao_str = f"+ {formatar_moeda(variacao)}"
+            pct_variacao_str = f"+{formatar_percentual(pct_variacao)}"
         elif variacao < 0:
-            variacao_str = f"R$ {variacao:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-            pct_variacao_str = f"{pct_variacao:,.2f}%".replace('.', '#').replace(',', '.').replace('#', ',')
+            variacao_str = formatar_moeda(variacao)
+            pct_variacao_str = formatar_percentual(pct_variacao)
         else:
             variacao_str = "R$ 0,00"
             pct_variacao_str = "0,00%"
 
-        tree_comparativo.insert('', 'end', values=(categoria, f"R$ {valor_atual:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','), variacao_str, pct_variacao_str))
+        linhas.append((categoria, (categoria, formatar_moeda(valor_atual), variacao_str, pct_variacao_str)))
+    sincronizar_treeview(tree_comparativo, linhas)
+
+# Aba de análises: calculada só quando o botão é usado, sobre o intervalo
+# escolhido (pode ser de vários anos)
+def atualizar_analises():
+    import analise
+    try:
+        inicio = (int(ano_inicio_analise_combo.get()), meses_nomes.index(mes_inicio_analise_combo.get()) + 1)
+        fim = (int(ano_fim_analise_combo.get()), meses_nomes.index(mes_fim_analise_combo.get()) + 1)
+        janela_media = int(janela_media_combo.get())
+        resultado = analise.analisar(inicio, fim, janela=janela_media)
+    except ValueError as e:
+        messagebox.showerror("Erro", str(e))
+        return
+
+    # NaN (valor != valor) marca meses sem dados para comparar
+    def moeda_ou_traco(centavos):
+        return "-" if centavos != centavos else formatar_moeda(round(centavos))
+
+    def percentual_ou_traco(valor):
+        return "-" if valor != valor else formatar_percentual(valor)
+
+    entradas_str = formatar_moedas(resultado['entradas'].tolist())
+    despesas_str = formatar_moedas(resultado['despesas'].tolist())
+    investimentos_str = formatar_moedas(resultado['investimentos'].tolist())
+    linhas = []
+    for i, (ano, mes) in enumerate(resultado['meses']):
+        linhas.append((f"{ano}-{mes:02d}", (
+            f"{mes:02d}/{ano}", entradas_str[i], despesas_str[i], investimentos_str[i],
+            moeda_ou_traco(resultado['media_despesas'][i]),
+            moeda_ou_traco(resultado['variacao_anual_despesas'][i]),
+            percentual_ou_traco(resultado['variacao_anual_despesas_pct'][i]),
+            percentual_ou_traco(resultado['taxa_poupanca'][i]),
+        )))
+    sincronizar_treeview(tree_analise_mensal, linhas)
+
+    linhas = []
+    for categoria, atual, anterior, pct in resultado['categorias']:
+        pct_str = "-" if pct is None else formatar_percentual(pct)
+        linhas.append((categoria, (categoria, formatar_moeda(atual), formatar_moeda(anterior), pct_str)))
+    sincronizar_treeview(tree_analise_categorias, linhas)
 
 # Função para definir o caixa inicial da conta corrente
 def set_caixa_inicial():
@@ -873,11 +856,8 @@ def set_caixa_inicial():
     
     def salvar_valor(event=None):
         try:
-            valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
-            valor = float(valor_str)
-            dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-            dados['caixas']['conta_corrente'] = valor
-            salvar_dados(dados, ANO_ATUAL, MES_ATUAL)
+            valor = core.converter_valor(valor_entry.get())
+            core.definir_conta_corrente(valor, ANO_ATUAL, MES_ATUAL)
             atualizar_resumo()
             dialog.destroy()
         except ValueError:
@@ -902,29 +882,18 @@ def alterar_valor_investimento(tipo_investimento):
     valor_entry.pack(pady=5)
     valor_entry.bind("<KeyRelease>", lambda event: formatar_valor(event, valor_entry))
 
-    dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-    valor_atual = dados['caixas']['investimentos'].get(tipo_investimento, 0.0)
-    valor_entry.insert(0, f"{valor_atual:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
+    valor_atual = core.saldos_mes(ANO_ATUAL, MES_ATUAL)['fechamento'].get(tipo_investimento, 0)
+    valor_entry.insert(0, formatar_numero(valor_atual))
 
 
     def salvar_alteracao():
         try:
-            valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
-            novo_valor = float(valor_str)
-
-            dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-            
-            # Ajustar o saldo da conta corrente
-            diferenca = novo_valor - dados['caixas']['investimentos'][tipo_investimento]
-            dados['caixas']['conta_corrente'] -= diferenca
-            
-            # Alterar o valor do investimento
-            dados['caixas']['investimentos'][tipo_investimento] = novo_valor
-            
-            salvar_dados(dados, ANO_ATUAL, MES_ATUAL)
+            novo_valor = core.converter_valor(valor_entry.get())
+            # A diferença sai (ou volta) da conta corrente
+            core.alterar_saldo_investimento(tipo_investimento, novo_valor, ANO_ATUAL, MES_ATUAL)
             atualizar_tabelas_e_resumo()
             dialog.destroy()
-            messagebox.showinfo("Sucesso", f"Saldo de '{tipo_investimento}' alterado para R$ {novo_valor:,.2f}.")
+            messagebox.showinfo("Sucesso", f"Saldo de '{tipo_investimento}' alterado para {formatar_moeda(novo_valor)}.")
         except ValueError:
             messagebox.showerror("Erro", "Valor inválido. Por favor, insira um número.")
     
@@ -948,31 +917,23 @@ def abrir_dialogo_excluir_investimento(tipo_investimento):
 
     def salvar_exclusao():
         try:
-            valor_str = valor_entry.get().strip().replace('.', '').replace(',', '.')
-            valor_excluir = float(valor_str)
+            valor_excluir = core.converter_valor(valor_entry.get())
 
             if valor_excluir <= 0:
                 messagebox.showerror("Erro", "O valor a ser excluído deve ser maior que zero.")
                 return
 
-            dados = carregar_dados(ANO_ATUAL, MES_ATUAL)
-            
-            saldo_atual = dados['caixas']['investimentos'].get(tipo_investimento, 0.0)
+            saldo_atual = core.saldos_mes(ANO_ATUAL, MES_ATUAL)['fechamento'].get(tipo_investimento, 0)
             if valor_excluir > saldo_atual:
                 resposta_aviso = messagebox.askyesno("Aviso", "O valor de exclusão é maior do que o saldo total do investimento. Continuar?")
                 if not resposta_aviso:
                     return
 
-            # Subtrai do caixa de investimentos
-            dados['caixas']['investimentos'][tipo_investimento] -= valor_excluir
-            
-            # Adiciona ao caixa da conta corrente
-            dados['caixas']['conta_corrente'] += valor_excluir
-            
-            salvar_dados(dados, ANO_ATUAL, MES_ATUAL)
+            # Subtrai do caixa de investimentos e devolve à conta corrente
+            core.resgatar_investimento(tipo_investimento, valor_excluir, ANO_ATUAL, MES_ATUAL, acima_do_saldo=True)
             atualizar_tabelas_e_resumo()
             dialog.destroy()
-            messagebox.showinfo("Sucesso", f"R$ {valor_excluir:,.2f} excluído de '{tipo_investimento}' e devolvido à Conta Corrente.")
+            messagebox.showinfo("Sucesso", f"{formatar_moeda(valor_excluir)} excluído de '{tipo_investimento}' e devolvido à Conta Corrente.")
         except ValueError:
             messagebox.showerror("Erro", "Valor inválido. Por favor, insira um número.")
     
@@ -993,11 +954,158 @@ def show_context_menu(event):
     menu.add_command(label="Excluir Valor", command=lambda: abrir_dialogo_excluir_investimento(tipo_investimento))
     menu.post(event.x_root, event.y_root)
 
+# --- Importação de extratos ---
+# O extrato é lido em fluxo duas vezes: uma para a prévia e outra, depois da
+# confirmação, para importar (cada mês afetado é gravado uma única vez). Como
+# nos lançamentos manuais, os lançamentos movimentam a conta corrente.
+def importar_extrato():
+    import importacao
+    caminho = filedialog.askopenfilename(title="Importar Extrato", filetypes=[("Extratos (CSV, OFX)", "*.csv *.ofx *.qfx"), ("Todos os arquivos", "*.*")])
+    if not caminho:
+        return
+    try:
+        regras = importacao.carregar_regras()
+        previa = importacao.pre_visualizar(caminho, regras)
+    except (ValueError, OSError) as e:
+        mostrar_erro(f"Não foi possível ler o extrato: {e}")
+        return
+    if previa['total'] == 0:
+        if previa['repetidos']:
+            messagebox.showinfo("Importar Extrato", f"Os {previa['repetidos']} lançamento(s) do extrato já foram importados.")
+        else:
+            messagebox.showwarning("Aviso", "Nenhum lançamento encontrado no extrato.")
+        return
+
+    dialog = tk.Toplevel(janela)
+    dialog.title("Prévia da Importação")
+    dialog.grab_set()
+
+    frame = ttk.Frame(dialog, padding="10")
+    frame.pack(fill="both", expand=True)
+
+    texto = f"{previa['total']} lançamento(s) a importar de {os.path.basename(caminho)}."
+    if previa['repetidos']:
+        texto += f" {previa['repetidos']} já existe(m) e não será(ão) importado(s)."
+    if previa['total'] + previa['repetidos'] > len(previa['amostra']):
+        texto += f" Mostrando os primeiros {len(previa['amostra'])}."
+    ttk.Label(frame, text=texto, font=FONTE_PADRAO).pack(anchor='w', pady=5)
+
+    tree_previa = ttk.Treeview(frame, columns=('Linha', 'Data', 'Extrato', 'Tipo', 'Categoria', 'Valor', 'Situação'), show='headings', height=12)
+    for coluna, largura, ancora in (('Linha', 60, 'e'), ('Data', 80, 'center'), ('Extrato', 280, 'w'), ('Tipo', 80, 'w'), ('Categoria', 200, 'w'), ('Valor', 120, 'e'), ('Situação', 90, 'w')):
+        tree_previa.heading(coluna, text=coluna)
+        tree_previa.column(coluna, width=largura, anchor=ancora)
+    valores_str = formatar_moedas([item[5] for item in previa['amostra']])
+    tree_previa.tag_configure('repetido', foreground='gray')
+    for (linha, data, original, tipo, categoria, _, repetido), valor_str in zip(previa['amostra'], valores_str):
+        tree_previa.insert('', 'end', values=(linha, formatar_data(data), original, 'Entrada' if tipo == 'entradas' else 'Despesa', categoria, valor_str, 'Repetido' if repetido else ''),
+                           tags=('repetido',) if repetido else ())
+    tree_previa.pack(fill="both", expand=True)
+
+    ttk.Label(frame, text="Por mês:", font=FONTE_PADRAO).pack(anchor='w', pady=5)
+    tree_meses_previa = ttk.Treeview(frame, columns=('Mês', 'Lançamentos', 'Entradas', 'Despesas'), show='headings', height=min(len(previa['meses']), 6))
+    for coluna, largura, ancora in (('Mês', 100, 'center'), ('Lançamentos', 100, 'e'), ('Entradas', 150, 'e'), ('Despesas', 150, 'e')):
+        tree_meses_previa.heading(coluna, text=coluna)
+        tree_meses_previa.column(coluna, width=largura, anchor=ancora)
+    for (ano, mes), totais in sorted(previa['meses'].items()):
+        tree_meses_previa.insert('', 'end', values=(f"{mes:02d}/{ano}", totais['quantidade'], formatar_moeda(totais['entradas']), formatar_moeda(totais['despesas'])))
+    tree_meses_previa.pack(fill="x")
+
+    if previa['quantidade_ignoradas']:
+        linhas_ignoradas = '\n'.join(f"Linha {linha}: {motivo}" for linha, motivo in previa['ignoradas'][:5])
+        ttk.Label(frame, text=f"{previa['quantidade_ignoradas']} linha(s) não serão importadas:\n{linhas_ignoradas}", font=FONTE_PADRAO).pack(anchor='w', pady=5)
+
+    def confirmar():
+        global ANO_ATUAL, MES_ATUAL
+        try:
+            resultado = importacao.importar(caminho, regras)
+        except (ValueError, OSError, core.ConflitoMeses) as e:
+            mostrar_erro(f"Não foi possível importar o extrato: {e}")
+            return
+        dialog.destroy()
+        atualizar_tabelas_e_resumo()
+        mensagem = f"{resultado['total']} lançamento(s) importado(s) em {len(resultado['meses'])} mês(es)."
+        if resultado['repetidos']:
+            mensagem += f"\n{resultado['repetidos']} repetido(s) não foram importados."
+        messagebox.showinfo("Sucesso", mensagem)
+
+    frame_botoes = ttk.Frame(frame)
+    frame_botoes.pack(pady=10)
+    ttk.Button(frame_botoes, text="Importar", command=confirmar).pack(side=tk.LEFT, padx=5)
+    ttk.Button(frame_botoes, text="Cancelar", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+
 # Função para pedir confirmação ao fechar o programa
 def on_closing():
     if messagebox.askyesno("Sair", "Tem certeza que deseja fechar o programa?"):
+        try:
+            core.gravar_pendentes()
+        except core.ERROS_GRAVACAO as e:
+            if not messagebox.askyesno("Erro ao salvar", f"Não foi possível salvar os dados: {e}\n\nFechar mesmo assim?"):
+                return
+        if tarefa_em_andamento is not None:
+            tarefa_em_andamento['cancelar']()
         janela.destroy()
 
+# --- Busca em todos os meses ---
+# A aba "Busca" procura lançamentos em todos os meses pelo índice de busca.py.
+# A busca é refeita enquanto se digita, um pouco depois da última tecla, e um
+# clique duplo em um resultado abre o mês dele na aba de visualização.
+ATRASO_BUSCA_MS = 200
+TIPOS_BUSCA = {'Todos': None, 'Entradas': ('entradas',), 'Despesas': ('despesas',),
+               'Investimentos': ('investimentos',), 'Faturas Parceladas': ('cartoes_parcelados',)}
+NOMES_TIPOS = {'entradas': 'Entrada', 'despesas': 'Despesa', 'investimentos': 'Investimento', 'cartoes_parcelados': 'Fatura Parcelada'}
+busca_agendada = None  # id do janela.after da próxima busca
+meses_resultados_busca = {}  # linha da tabela -> (ano, mes)
+
+def agendar_busca(event=None):
+    global busca_agendada
+    if busca_agendada is not None:
+        janela.after_cancel(busca_agendada)
+    busca_agendada = janela.after(ATRASO_BUSCA_MS, executar_busca)
+
+# (ano, mes) escolhido nos combos, ou None se algum estiver em branco
+def mes_do_filtro(combo_mes_filtro, combo_ano_filtro):
+    if not combo_mes_filtro.get() or not combo_ano_filtro.get():
+        return None
+    return int(combo_ano_filtro.get()), meses_nomes.index(combo_mes_filtro.get()) + 1
+
+def executar_busca():
+    global busca_agendada
+    import busca
+    busca_agendada = None
+    try:
+        valores = [core.converter_valor(entry.get()) if entry.get().strip() else None
+                   for entry in (valor_minimo_busca_entry, valor_maximo_busca_entry)]
+    except ValueError:
+        rotulo_busca.config(text="Valor mínimo ou máximo inválido.")
+        return
+    resultado = busca.buscar(texto_busca_var.get(), TIPOS_BUSCA[tipo_busca_combo.get()], valores[0], valores[1],
+                             mes_do_filtro(mes_inicio_busca_combo, ano_inicio_busca_combo),
+                             mes_do_filtro(mes_fim_busca_combo, ano_fim_busca_combo))
+    encontrados = resultado['resultados']
+    meses_resultados_busca.clear()
+    linhas = []
+    for item, valor_str in zip(encontrados, formatar_moedas([item['valor'] for item in encontrados])):
+        chave = f"{item['ano']}-{item['mes']:02d}-{item['id']}"
+        meses_resultados_busca[chave] = (item['ano'], item['mes'])
+        linhas.append((chave, (f"{item['mes']:02d}/{item['ano']}", formatar_data(item['data']) if item['data'] else '',
+                               NOMES_TIPOS[item['tipo']], item['descricao'], valor_str, item['observacoes'], item['cartao'] or '')))
+    sincronizar_treeview(tree_busca, linhas)
+    texto = f"{resultado['total']} lançamento(s), total {formatar_moeda(resultado['soma'])}"
+    if resultado['total'] > len(encontrados):
+        texto += f" (mostrando os {len(encontrados)} mais recentes)"
+    rotulo_busca.config(text=texto)
+
+def abrir_mes_da_busca(event):
+    global ANO_ATUAL, MES_ATUAL
+    linha = tree_busca.identify_row(event.y)
+    if linha not in meses_resultados_busca:
+        return
+    ANO_ATUAL, MES_ATUAL = meses_resultados_busca[linha]
+    combo_mes.set(meses[MES_ATUAL-1][1])
+    combo_ano.set(str(ANO_ATUAL))
+    atualizar_tabelas_e_resumo()
+    notebook.select(aba_visualizacao)
+
 # Função para adicionar scrollbar a uma aba
 def add_scrollbar(frame):
     canvas = tk.Canvas(frame)
@@ -1023,6 +1131,7 @@ def add_scrollbar(frame):
     return scrollable_frame
 
 # --- Criação da Janela Principal ---
+inicio_janela = time.perf_counter()
 janela = tk.Tk()
 janela.title(f"Gerenciador Financeiro - Versão {VERSAO}")
 janela.state('zoomed')
@@ -1056,7 +1165,7 @@ frame_entradas = ttk.LabelFrame(scrollable_cadastro, text="Adicionar Entradas",
 frame_entradas.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 
 ttk.Label(frame_entradas, text="Descrição:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5)
-descricao_entrada_entry = ttk.Combobox(frame_entradas, values=CATEGORIAS_ENTRADAS_PREDEFINIDAS, state="readonly", width=38)
+descricao_entrada_entry = ttk.Combobox(frame_entradas, values=core.CATEGORIAS_ENTRADAS_PREDEFINIDAS, state="readonly", width=38)
 descricao_entrada_entry.grid(row=0, column=1, padx=5, pady=5)
 
 ttk.Label(frame_entradas, text="Valor (R$):", font=FONTE_PADRAO).grid(row=1, column=0, padx=5, pady=5)
@@ -1088,7 +1197,7 @@ frame_despesas = ttk.LabelFrame(scrollable_cadastro, text="Adicionar Despesas",
 frame_despesas.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
 ttk.Label(frame_despesas, text="Descrição:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5)
-descricao_despesa_entry = ttk.Combobox(frame_despesas, values=CATEGORIAS_DESPESAS_PREDEFINIDAS, state="readonly", width=38)
+descricao_despesa_entry = ttk.Combobox(frame_despesas, values=core.CATEGORIAS_DESPESAS_PREDEFINIDAS, state="readonly", width=38)
 descricao_despesa_entry.grid(row=0, column=1, padx=5, pady=5)
 
 ttk.Label(frame_despesas, text="Valor (R$):", font=FONTE_PADRAO).grid(row=1, column=0, padx=5, pady=5)
@@ -1118,7 +1227,7 @@ ttk.Button(frame_despesas, text="Adicionar Despesa", command=lambda: adicionar_t
 frame_investimentos = ttk.LabelFrame(scrollable_cadastro, text="Adicionar Investimento", padding="10")
 frame_investimentos.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
 
-tipos_investimentos = ['Ações', 'Fundos Imobiliários', 'ETF Internacional', 'CDB', 'Cofrinhos', 'Tesouro Direto']
+tipos_investimentos = core.TIPOS_INVESTIMENTOS
 ttk.Label(frame_investimentos, text="Tipo de Investimento:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5)
 combo_investimento = ttk.Combobox(frame_investimentos, values=tipos_investimentos, state="readonly", width=30)
 combo_investimento.grid(row=0, column=1, padx=5, pady=5)
@@ -1164,7 +1273,7 @@ ttk.Button(frame_resgate, text="Resgatar Investimento", command=lambda: resgatar
 frame_faturas = ttk.LabelFrame(scrollable_cadastro, text="Adicionar Fatura Parcelada", padding="10")
 frame_faturas.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
 
-faturas = ['Cartão de crédito Itaú', 'Cartão de crédito BVI', 'Cartão de crédito XP', 'Cartão credito ML', 'Cartão RCHLO']
+faturas = core.CARTOES
 ttk.Label(frame_faturas, text="Cartão:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5)
 cartao_combo = ttk.Combobox(frame_faturas, values=faturas, state="readonly", width=30)
 cartao_combo.grid(row=0, column=1, padx=5, pady=5)
@@ -1193,6 +1302,13 @@ ano_vencimento_combo.grid(row=2, column=2, padx=5, pady=5)
 
 ttk.Button(frame_faturas, text="Adicionar Fatura", command=lambda: adicionar_fatura_parcelada(cartao_combo, valor_compra_entry, parcelas_entry, descricao_compra_entry, mes_vencimento_combo, ano_vencimento_combo)).grid(row=3, column=0, columnspan=4, pady=10)
 
+# Frame para importação de extratos
+frame_importacao = ttk.LabelFrame(scrollable_cadastro, text="Importar Extrato Bancário", padding="10")
+frame_importacao.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
+
+ttk.Label(frame_importacao, text="Arquivos CSV ou OFX. As categorias seguem as regras de regras_importacao.json na pasta de dados.", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5, sticky='w')
+ttk.Button(frame_importacao, text="Selecionar Extrato...", command=importar_extrato).grid(row=0, column=1, padx=5, pady=5)
+
 
 # --- Aba de Visualização ---
 aba_visualizacao = ttk.Frame(notebook)
@@ -1223,6 +1339,12 @@ btn_refresh.pack(side=tk.LEFT, padx=10)
 btn_pdf = ttk.Button(frame_periodo, text="Gerar Relatório PDF", command=gerar_relatorio_pdf)
 btn_pdf.pack(side=tk.LEFT, padx=10)
 
+btn_pdf_lote = ttk.Button(frame_periodo, text="Exportar Relatórios em Lote", command=exportar_relatorios_lote)
+btn_pdf_lote.pack(side=tk.LEFT, padx=10)
+
+btn_exportar_historico = ttk.Button(frame_periodo, text="Exportar Histórico", command=exportar_historico)
+btn_exportar_historico.pack(side=tk.LEFT, padx=10)
+
 btn_chart = ttk.Button(frame_periodo, text="Gerar Gráfico", command=gerar_grafico_orcamento)
 btn_chart.pack(side=tk.LEFT, padx=10)
 
@@ -1234,16 +1356,7 @@ btn_caixa_inicial.pack(side=tk.LEFT, padx=10)
 frame_tabela_entradas = ttk.LabelFrame(scrollable_visualizacao, text="Entradas", padding="10")
 frame_tabela_entradas.pack(pady=5, padx=10, fill="both", expand=True)
 
-tree_entradas = ttk.Treeview(frame_tabela_entradas, columns=('Descrição', 'Valor', 'Observações', 'Data'), show='headings')
-tree_entradas.heading('Descrição', text='Descrição')
-tree_entradas.heading('Valor', text='Valor')
-tree_entradas.heading('Observações', text='Observações')
-tree_entradas.heading('Data', text='Data')
-tree_entradas.column('Descrição', width=200, anchor='w')
-tree_entradas.column('Valor', width=100, anchor='e')
-tree_entradas.column('Observações', width=200, anchor='w')
-tree_entradas.column('Data', width=100, anchor='e')
-tree_entradas.pack(fill="both", expand=True)
+tree_entradas = criar_tabela_lancamentos(frame_tabela_entradas)
 
 ttk.Label(frame_tabela_entradas, text="Total: R$ 0,00", font=FONTE_PADRAO).pack(anchor='e', pady=5)
 lbl_entradas_total = ttk.Label(frame_tabela_entradas, text="Total: R$ 0,00", font=FONTE_PADRAO)
@@ -1256,16 +1369,7 @@ btn_excluir_entrada.pack(pady=5, padx=5, side='right')
 frame_tabela_despesas = ttk.LabelFrame(scrollable_visualizacao, text="Despesas", padding="10")
 frame_tabela_despesas.pack(pady=5, padx=10, fill="both", expand=True)
 
-tree_despesas = ttk.Treeview(frame_tabela_despesas, columns=('Descrição', 'Valor', 'Observações', 'Data'), show='headings')
-tree_despesas.heading('Descrição', text='Descrição')
-tree_despesas.heading('Valor', text='Valor')
-tree_despesas.heading('Observações', text='Observações')
-tree_despesas.heading('Data', text='Data')
-tree_despesas.column('Descrição', width=200, anchor='w')
-tree_despesas.column('Valor', width=100, anchor='e')
-tree_despesas.column('Observações', width=200, anchor='w')
-tree_despesas.column('Data', width=100, anchor='e')
-tree_despesas.pack(fill="both", expand=True)
+tree_despesas = criar_tabela_lancamentos(frame_tabela_despesas)
 
 lbl_despesas_total = ttk.Label(frame_tabela_despesas, text="Total: R$ 0,00", font=FONTE_PADRAO)
 lbl_despesas_pct = ttk.Label(frame_tabela_despesas, text="(0,00%)", font=FONTE_PADRAO)
@@ -1278,16 +1382,7 @@ btn_excluir_despesa.pack(pady=5, padx=5, side='right')
 frame_tabela_investimentos = ttk.LabelFrame(scrollable_visualizacao, text="Investimentos", padding="10")
 frame_tabela_investimentos.pack(pady=5, padx=10, fill="both", expand=True)
 
-tree_investimentos = ttk.Treeview(frame_tabela_investimentos, columns=('Descrição', 'Valor', 'Observações', 'Data'), show='headings')
-tree_investimentos.heading('Descrição', text='Descrição')
-tree_investimentos.heading('Valor', text='Valor')
-tree_investimentos.heading('Observações', text='Observações')
-tree_investimentos.heading('Data', text='Data')
-tree_investimentos.column('Descrição', width=200, anchor='w')
-tree_investimentos.column('Valor', width=100, anchor='e')
-tree_investimentos.column('Observações', width=200, anchor='w')
-tree_investimentos.column('Data', width=100, anchor='e')
-tree_investimentos.pack(fill="both", expand=True)
+tree_investimentos = criar_tabela_lancamentos(frame_tabela_investimentos)
 
 lbl_investimentos_total = ttk.Label(frame_tabela_investimentos, text="Total: R$ 0,00", font=FONTE_PADRAO)
 lbl_investimentos_pct = ttk.Label(frame_tabela_investimentos, text="(0,00%)", font=FONTE_PADRAO)
@@ -1332,18 +1427,22 @@ ttk.Label(frame_resumo_geral, textvariable=pct_investimento_var, font=FONTE_TITU
 frame_caixas = ttk.LabelFrame(scrollable_resumo, text="Saldos das Contas", padding="10")
 frame_caixas.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
+caixa_cc_inicial_var = tk.StringVar(value="R$ 0,00")
 caixa_cc_var = tk.StringVar(value="R$ 0,00")
 caixa_invest_var = tk.StringVar(value="R$ 0,00")
 caixa_total_var = tk.StringVar(value="R$ 0,00")
 
-ttk.Label(frame_caixas, text="Saldo Conta Corrente:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
-ttk.Label(frame_caixas, textvariable=caixa_cc_var, font=FONTE_TITULO).grid(row=0, column=1, sticky="e", padx=5, pady=2)
+ttk.Label(frame_caixas, text="Saldo Inicial Conta Corrente:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
+ttk.Label(frame_caixas, textvariable=caixa_cc_inicial_var, font=FONTE_TITULO).grid(row=0, column=1, sticky="e", padx=5, pady=2)
+
+ttk.Label(frame_caixas, text="Saldo Conta Corrente:").grid(row=1, column=0, sticky="w", padx=5, pady=2)
+ttk.Label(frame_caixas, textvariable=caixa_cc_var, font=FONTE_TITULO).grid(row=1, column=1, sticky="e", padx=5, pady=2)
 
-ttk.Label(frame_caixas, text="Saldo Total de Investimentos:").grid(row=1, column=0, sticky="w", padx=5, pady=2)
-ttk.Label(frame_caixas, textvariable=caixa_invest_var, font=FONTE_TITULO).grid(row=1, column=1, sticky="e", padx=5, pady=2)
+ttk.Label(frame_caixas, text="Saldo Total de Investimentos:").grid(row=2, column=0, sticky="w", padx=5, pady=2)
+ttk.Label(frame_caixas, textvariable=caixa_invest_var, font=FONTE_TITULO).grid(row=2, column=1, sticky="e", padx=5, pady=2)
 
-ttk.Label(frame_caixas, text="Saldo Total (CC + Investimentos):").grid(row=2, column=0, sticky="w", padx=5, pady=2)
-ttk.Label(frame_caixas, textvariable=caixa_total_var, font=FONTE_TITULO).grid(row=2, column=1, sticky="e", padx=5, pady=2)
+ttk.Label(frame_caixas, text="Saldo Total (CC + Investimentos):").grid(row=3, column=0, sticky="w", padx=5, pady=2)
+ttk.Label(frame_caixas, textvariable=caixa_total_var, font=FONTE_TITULO).grid(row=3, column=1, sticky="e", padx=5, pady=2)
 
 
 # Treeview do caixa de investimentos detalhado
@@ -1362,6 +1461,12 @@ tree_caixa_investimentos.pack(fill="both", expand=True)
 # Ligar o evento de clique do botão direito
 tree_caixa_investimentos.bind("<Button-3>", show_context_menu)
 
+# --- Aba do Gráfico ---
+# O gráfico em si é criado por criar_grafico, na primeira vez que for pedido
+aba_grafico = ttk.Frame(notebook)
+notebook.add(aba_grafico, text="Gráfico")
+notebook.bind("<<NotebookTabChanged>>", lambda event: gerar_grafico_orcamento() if grafico is None and notebook.select() == str(aba_grafico) else None)
+
 # --- Aba de Comparativos ---
 aba_comparativos = ttk.Frame(notebook)
 notebook.add(aba_comparativos, text="Comparativos")
@@ -1382,6 +1487,69 @@ tree_comparativo.column('Variação', width=150, anchor='e')
 tree_comparativo.column('% Variação', width=100, anchor='e')
 tree_comparativo.pack(fill="both", expand=True)
 
+# --- Aba de Análises ---
+aba_analises = ttk.Frame(notebook)
+notebook.add(aba_analises, text="Análises")
+scrollable_analises = add_scrollbar(aba_analises)
+
+frame_filtro_analises = ttk.LabelFrame(scrollable_analises, text="Período", padding="10")
+frame_filtro_analises.pack(pady=10, padx=10, fill="x")
+
+ttk.Label(frame_filtro_analises, text="De:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5)
+mes_inicio_analise_combo = ttk.Combobox(frame_filtro_analises, values=meses_nomes, state="readonly", width=12)
+mes_inicio_analise_combo.set(meses[MES_ATUAL-1][1])
+mes_inicio_analise_combo.grid(row=0, column=1, padx=5, pady=5)
+ano_inicio_analise_combo = ttk.Combobox(frame_filtro_analises, values=anos, state="readonly", width=6)
+ano_inicio_analise_combo.set(str(ANO_ATUAL - 1))
+ano_inicio_analise_combo.grid(row=0, column=2, padx=5, pady=5)
+
+ttk.Label(frame_filtro_analises, text="Até:", font=FONTE_PADRAO).grid(row=0, column=3, padx=5, pady=5)
+mes_fim_analise_combo = ttk.Combobox(frame_filtro_analises, values=meses_nomes, state="readonly", width=12)
+mes_fim_analise_combo.set(meses[MES_ATUAL-1][1])
+mes_fim_analise_combo.grid(row=0, column=4, padx=5, pady=5)
+ano_fim_analise_combo = ttk.Combobox(frame_filtro_analises, values=anos, state="readonly", width=6)
+ano_fim_analise_combo.set(str(ANO_ATUAL))
+ano_fim_analise_combo.grid(row=0, column=5, padx=5, pady=5)
+
+ttk.Label(frame_filtro_analises, text="Média móvel (meses):", font=FONTE_PADRAO).grid(row=0, column=6, padx=5, pady=5)
+janela_media_combo = ttk.Combobox(frame_filtro_analises, values=['3', '6', '12'], state="readonly", width=4)
+janela_media_combo.set('3')
+janela_media_combo.grid(row=0, column=7, padx=5, pady=5)
+
+ttk.Button(frame_filtro_analises, text="Calcular", command=atualizar_analises).grid(row=0, column=8, padx=5, pady=5)
+
+frame_analise_mensal = ttk.LabelFrame(scrollable_analises, text="Evolução Mensal", padding="10")
+frame_analise_mensal.pack(pady=10, padx=10, fill="both", expand=True)
+
+colunas_analise_mensal = ('Mês', 'Entradas', 'Despesas', 'Investimentos', 'Média Móvel', 'Variação Anual', '% Variação Anual', 'Taxa de Poupança')
+tree_analise_mensal = ttk.Treeview(frame_analise_mensal, columns=colunas_analise_mensal, show='headings', height=15)
+tree_analise_mensal.heading('Mês', text='Mês')
+tree_analise_mensal.heading('Entradas', text='Entradas')
+tree_analise_mensal.heading('Despesas', text='Despesas')
+tree_analise_mensal.heading('Investimentos', text='Investimentos')
+tree_analise_mensal.heading('Média Móvel', text='Média Móvel (Despesas)')
+tree_analise_mensal.heading('Variação Anual', text='Despesas vs. Ano Anterior')
+tree_analise_mensal.heading('% Variação Anual', text='% vs. Ano Anterior')
+tree_analise_mensal.heading('Taxa de Poupança', text='Taxa de Poupança')
+tree_analise_mensal.column('Mês', width=80, anchor='center')
+for coluna in colunas_analise_mensal[1:]:
+    tree_analise_mensal.column(coluna, width=140, anchor='e')
+tree_analise_mensal.pack(fill="both", expand=True)
+
+frame_analise_categorias = ttk.LabelFrame(scrollable_analises, text="Crescimento por Categoria (Últimos 12 Meses vs. 12 Anteriores)", padding="10")
+frame_analise_categorias.pack(pady=10, padx=10, fill="both", expand=True)
+
+tree_analise_categorias = ttk.Treeview(frame_analise_categorias, columns=('Categoria', 'Últimos 12', 'Anteriores 12', 'Crescimento'), show='headings')
+tree_analise_categorias.heading('Categoria', text='Categoria')
+tree_analise_categorias.heading('Últimos 12', text='Últimos 12 Meses')
+tree_analise_categorias.heading('Anteriores 12', text='12 Meses Anteriores')
+tree_analise_categorias.heading('Crescimento', text='Crescimento')
+tree_analise_categorias.column('Categoria', width=250, anchor='w')
+tree_analise_categorias.column('Últimos 12', width=150, anchor='e')
+tree_analise_categorias.column('Anteriores 12', width=150, anchor='e')
+tree_analise_categorias.column('Crescimento', width=100, anchor='e')
+tree_analise_categorias.pack(fill="both", expand=True)
+
 # --- Aba de Parcelamentos ---
 aba_parcelamentos = ttk.Frame(notebook)
 notebook.add(aba_parcelamentos, text="Faturas Parceladas")
@@ -1401,11 +1569,86 @@ tree_cartoes_parcelados.pack(fill="both", expand=True)
 btn_excluir_parcelada = ttk.Button(frame_tabela_parcelamentos, text="Excluir Fatura Parcelada", command=lambda: excluir_fatura_parcelada(tree_cartoes_parcelados))
 btn_excluir_parcelada.pack(pady=5, padx=5, side='right')
 
+# --- Aba de Busca ---
+aba_busca = ttk.Frame(notebook)
+notebook.add(aba_busca, text="Busca")
+
+frame_filtro_busca = ttk.LabelFrame(aba_busca, text="Buscar em Todos os Meses", padding="10")
+frame_filtro_busca.pack(pady=10, padx=10, fill="x")
+
+ttk.Label(frame_filtro_busca, text="Texto:", font=FONTE_PADRAO).grid(row=0, column=0, padx=5, pady=5, sticky='w')
+texto_busca_var = tk.StringVar()
+texto_busca_entry = ttk.Entry(frame_filtro_busca, textvariable=texto_busca_var, width=40)
+texto_busca_entry.grid(row=0, column=1, columnspan=3, padx=5, pady=5, sticky='we')
+texto_busca_var.trace_add('write', lambda *args: agendar_busca())
+
+ttk.Label(frame_filtro_busca, text="Tipo:", font=FONTE_PADRAO).grid(row=0, column=4, padx=5, pady=5)
+tipo_busca_combo = ttk.Combobox(frame_filtro_busca, values=list(TIPOS_BUSCA), state="readonly", width=18)
+tipo_busca_combo.set('Todos')
+tipo_busca_combo.grid(row=0, column=5, padx=5, pady=5)
+
+ttk.Label(frame_filtro_busca, text="Valor de:", font=FONTE_PADRAO).grid(row=1, column=0, padx=5, pady=5, sticky='w')
+valor_minimo_busca_entry = ttk.Entry(frame_filtro_busca, width=12)
+valor_minimo_busca_entry.grid(row=1, column=1, padx=5, pady=5)
+ttk.Label(frame_filtro_busca, text="até:", font=FONTE_PADRAO).grid(row=1, column=2, padx=5, pady=5)
+valor_maximo_busca_entry = ttk.Entry(frame_filtro_busca, width=12)
+valor_maximo_busca_entry.grid(row=1, column=3, padx=5, pady=5)
+
+# Meses em branco: sem limite
+ttk.Label(frame_filtro_busca, text="Mês de:", font=FONTE_PADRAO).grid(row=2, column=0, padx=5, pady=5, sticky='w')
+mes_inicio_busca_combo = ttk.Combobox(frame_filtro_busca, values=[''] + meses_nomes, state="readonly", width=12)
+mes_inicio_busca_combo.grid(row=2, column=1, padx=5, pady=5)
+ano_inicio_busca_combo = ttk.Combobox(frame_filtro_busca, values=[''] + anos, state="readonly", width=6)
+ano_inicio_busca_combo.grid(row=2, column=2, padx=5, pady=5)
+ttk.Label(frame_filtro_busca, text="até:", font=FONTE_PADRAO).grid(row=2, column=3, padx=5, pady=5)
+mes_fim_busca_combo = ttk.Combobox(frame_filtro_busca, values=[''] + meses_nomes, state="readonly", width=12)
+mes_fim_busca_combo.grid(row=2, column=4, padx=5, pady=5)
+ano_fim_busca_combo = ttk.Combobox(frame_filtro_busca, values=[''] + anos, state="readonly", width=6)
+ano_fim_busca_combo.grid(row=2, column=5, padx=5, pady=5)
+
+for widget in (valor_minimo_busca_entry, valor_maximo_busca_entry):
+    widget.bind("<KeyRelease>", agendar_busca)
+for widget in (tipo_busca_combo, mes_inicio_busca_combo, ano_inicio_busca_combo, mes_fim_busca_combo, ano_fim_busca_combo):
+    widget.bind("<<ComboboxSelected>>", agendar_busca)
+
+ttk.Button(frame_filtro_busca, text="Buscar", command=executar_busca).grid(row=2, column=6, padx=5, pady=5)
+
+frame_resultados_busca = ttk.LabelFrame(aba_busca, text="Resultados (clique duplo abre o mês)", padding="10")
+frame_resultados_busca.pack(pady=10, padx=10, fill="both", expand=True)
+
+rotulo_busca = ttk.Label(frame_resultados_busca, text="", font=FONTE_PADRAO)
+rotulo_busca.pack(anchor='w', pady=(0, 5))
+
+frame_tree_busca = ttk.Frame(frame_resultados_busca)
+frame_tree_busca.pack(fill="both", expand=True)
+colunas_busca = ('Mês', 'Data', 'Tipo', 'Descrição', 'Valor', 'Observações', 'Cartão')
+tree_busca = ttk.Treeview(frame_tree_busca, columns=colunas_busca, show='headings')
+for coluna, largura, ancora in (('Mês', 80, 'center'), ('Data', 80, 'center'), ('Tipo', 110, 'w'), ('Descrição', 200, 'w'),
+                                ('Valor', 100, 'e'), ('Observações', 200, 'w'), ('Cartão', 160, 'w')):
+    tree_busca.heading(coluna, text=coluna)
+    tree_busca.column(coluna, width=largura, anchor=ancora)
+barra_busca = ttk.Scrollbar(frame_tree_busca, orient="vertical", command=tree_busca.yview)
+tree_busca.configure(yscrollcommand=barra_busca.set)
+barra_busca.pack(side="right", fill="y")
+tree_busca.pack(fill="both", expand=True)
+tree_busca.bind("<Double-1>", abrir_mes_da_busca)
+# Ao abrir a aba a busca é refeita (o índice acompanha os meses alterados)
+notebook.bind("<<NotebookTabChanged>>", lambda event: executar_busca() if notebook.select() == str(aba_busca) else None, add='+')
+
 
 # --- Inicialização ---
+tempos_inicializacao['janela'] = time.perf_counter() - inicio_janela
+inicio_atualizacao = time.perf_counter()
 atualizar_tabelas_e_resumo()
+tempos_inicializacao['primeira_atualizacao'] = time.perf_counter() - inicio_atualizacao
 
 # Rodapé
 ttk.Label(janela, text="Criado por Gustavo Januzi Agosto 2025", font=('Helvetica', 9)).pack(side=tk.BOTTOM, pady=5)
 
+# Depois que a janela for desenhada
+if MOSTRAR_TEMPOS:
+    janela.after_idle(mostrar_tempos_inicializacao)
+if PRECARREGAR_BIBLIOTECAS:
+    janela.after(500, lambda: threading.Thread(target=precarregar_bibliotecas, daemon=True).start())
+
 janela.mainloop()
\ No newline at end of file
@@ -0,0 +1,357 @@
+# Importação de extratos bancários (CSV e OFX).
+#
+# O arquivo é lido em fluxo, uma linha (ou transação OFX) por vez, então
+# extratos com dezenas de milhares de linhas não são carregados inteiros na
+# memória. Cada lançamento do extrato é classificado em uma das categorias
+# predefinidas por regras (ver REGRAS_PADRAO e carregar_regras), vai para o
+# mês da sua data e vira uma entrada (valor positivo) ou despesa (valor
+# negativo). A descrição original do extrato fica nas observações.
+#
+# Lançamentos que o mês já tem (mesma impressão: dia, valor, descrição e
+# observações, ver core.impressao_lancamento) são marcados como repetidos e,
+# por padrão, não são importados de novo: importar duas vezes o mesmo extrato,
+# ou extratos com períodos sobrepostos, não duplica as despesas.
+#
+# pre_visualizar() mostra o que seria importado sem gravar nada; importar()
+# aplica tudo num único core.LoteOperacoes: cada mês afetado é gravado uma
+# vez só, ao final, e se algo falhar no meio nada é gravado.
+import os
+import re
+import csv
+import json
+import codecs
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import orcamento_core as core
+
+# Regras aplicadas em ordem; vale a primeira cujo texto aparece na descrição
+# do extrato (sem diferenciar maiúsculas nem acentos). 'tipo' restringe a
+# regra a entradas ou despesas. Sem regra, a categoria é 'outros' / 'Outros'.
+REGRAS_PADRAO = [
+    {'contem': 'ALUGUEL', 'categoria': 'Aluguel'},
+    {'contem': 'CONDOMINIO', 'categoria': 'pagamento condominio', 'tipo': 'despesas'},
+    {'contem': 'ESTACIONAMENTO', 'categoria': 'Estacionamento', 'tipo': 'despesas'},
+    {'contem': 'ENERGIA', 'categoria': 'Fatura de Energia', 'tipo': 'despesas'},
+    {'contem': 'SANEAMENTO', 'categoria': 'Fatura de Água', 'tipo': 'despesas'},
+    {'contem': 'INTERNET', 'categoria': 'Fatura Tv / Internet', 'tipo': 'despesas'},
+    {'contem': 'INSS', 'categoria': 'INSS', 'tipo': 'despesas'},
+    {'contem': 'SIMPLES NACIONAL', 'categoria': 'Simples Nacional', 'tipo': 'despesas'},
+    {'contem': 'SUPERMERCADO', 'categoria': 'Despesa Supermercado', 'tipo': 'despesas'},
+    {'contem': 'PADARIA', 'categoria': 'Despesa Padaria', 'tipo': 'despesas'},
+    {'contem': 'RESTAURANTE', 'categoria': 'Despesa Fast Food/Restaurante', 'tipo': 'despesas'},
+    {'contem': 'IFOOD', 'categoria': 'Despesa Fast Food/Restaurante', 'tipo': 'despesas'},
+    {'contem': 'FARMACIA', 'categoria': 'Medicamentos', 'tipo': 'despesas'},
+    {'contem': 'DROGARIA', 'categoria': 'Medicamentos', 'tipo': 'despesas'},
+    {'contem': 'PET SHOP', 'categoria': 'Pet Shop', 'tipo': 'despesas'},
+    {'contem': 'ODONTO', 'categoria': 'Dentista', 'tipo': 'despesas'},
+    {'contem': 'SALARIO', 'categoria': 'Salário', 'tipo': 'entradas'},
+    {'contem': 'DIVIDENDO', 'categoria': 'Dividendos', 'tipo': 'entradas'},
+]
+CATEGORIA_PADRAO = {'despesas': 'outros', 'entradas': 'Outros'}
+CATEGORIAS = {'despesas': core.CATEGORIAS_DESPESAS_PREDEFINIDAS, 'entradas': core.CATEGORIAS_ENTRADAS_PREDEFINIDAS}
+
+# Nomes de coluna reconhecidos no cabeçalho do CSV (já normalizados)
+COLUNAS_CSV = {
+    'data': ('DATA', 'DATE', 'DT'),
+    'descricao': ('DESCRICAO', 'HISTORICO', 'LANCAMENTO', 'DESCRIPTION', 'MEMO'),
+    'valor': ('VALOR', 'AMOUNT', 'VALUE', 'QUANTIA'),
+}
+FORMATOS_DATA_CSV = ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y')
+TAMANHO_BLOCO = 64 * 1024
+LIMITE_PREVIA = 100
+
+def caminho_regras():
+    return os.path.join(core.DATA_DIR, 'regras_importacao.json')
+
+# Regras do arquivo regras_importacao.json da pasta de dados (mesma forma
+# de REGRAS_PADRAO), ou as padrão se ele não existir. Levanta ValueError
+# se alguma regra usar uma categoria que não existe.
+def carregar_regras(caminho=None):
+    caminho = caminho or caminho_regras()
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            regras = json.load(f)
+    except FileNotFoundError:
+        regras = REGRAS_PADRAO
+    return preparar_regras(regras)
+
+# [(texto normalizado, tipo, categoria)]. Uma regra sem 'tipo' vale para os
+# tipos que têm a categoria.
+def preparar_regras(regras):
+    preparadas = []
+    for regra in regras:
+        if regra.get('tipo') not in (None, 'despesas', 'entradas'):
+            raise ValueError(f"Tipo inválido na regra {regra!r}: use 'despesas' ou 'entradas'.")
+        tipos = [tipo for tipo in ([regra['tipo']] if regra.get('tipo') else CATEGORIAS) if regra['categoria'] in CATEGORIAS[tipo]]
+        if not tipos:
+            raise ValueError(f"Categoria desconhecida na regra {regra!r}.")
+        for tipo in tipos:
+            preparadas.append((core.normalizar_texto(regra['contem']), tipo, regra['categoria']))
+    return preparadas
+
+# (tipo, categoria) do lançamento do extrato
+def classificar(lancamento, regras):
+    tipo = 'entradas' if lancamento['valor'] > 0 else 'despesas'
+    descricao = core.normalizar_texto(lancamento['descricao_original'])
+    for trecho, tipo_regra, categoria in regras:
+        if tipo_regra == tipo and trecho in descricao:
+            return tipo, categoria
+    return tipo, CATEGORIA_PADRAO[tipo]
+
+# --- Leitura dos arquivos ---
+# Os leitores produzem, em ordem, um dicionário por lançamento:
+#   {'linha': n, 'data': 'AAAA-MM-DD 00:00:00', 'descricao_original': ..., 'valor': centavos com sinal}
+# ou {'linha': n, 'erro': motivo} para linhas que não puderam ser lidas.
+
+# UTF-8 se o começo do arquivo for UTF-8 válido, senão Latin-1 (comum em
+# extratos de bancos brasileiros). Como só o começo é conferido, os arquivos
+# UTF-8 são abertos com errors=ERROS_UTF8: um byte inválido mais adiante é
+# lido como Latin-1 em vez de interromper a leitura.
+ERROS_UTF8 = 'importacao-latin1'
+
+def _bytes_latin1(erro):
+    if not isinstance(erro, UnicodeDecodeError):
+        raise erro
+    return erro.object[erro.start:erro.end].decode('latin-1'), erro.end
+
+codecs.register_error(ERROS_UTF8, _bytes_latin1)
+
+def _abrir_extrato(caminho, **opcoes):
+    codificacao = _codificacao(caminho)
+    erros = ERROS_UTF8 if codificacao.startswith('utf-8') else 'strict'
+    return open(caminho, 'r', encoding=codificacao, errors=erros, **opcoes)
+
+def _codificacao(caminho):
+    with open(caminho, 'rb') as f:
+        inicio = f.read(TAMANHO_BLOCO)
+    try:
+        inicio.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if e.start < len(inicio) - 4:  # não é só um caractere cortado no fim do bloco
+            return 'latin-1'
+    return 'utf-8-sig'
+
+# '1.234,56', '1,234.56', '-1234.56', 'R$ 10,00', '1.234' -> centavos. O
+# separador decimal é o último que aparece ('.' ou ','); o outro é de milhar.
+# Um separador só, seguido de exatamente três dígitos e com parte inteira
+# diferente de zero ('1.234'), ou repetido ('1.234.567'), é de milhar; '0.005'
+# e ',500' são decimais. No OFX não há separador de milhar (so_decimal=True):
+# '-1.500' é -1,50.
+def _converter_valor(texto, so_decimal=False):
+    texto = texto.replace('R$', '').replace(' ', '').strip()
+    posicao = max(texto.rfind('.'), texto.rfind(','))
+    if posicao >= 0:
+        separador = texto[posicao]
+        outro = ',' if separador == '.' else '.'
+        fracao = texto[posicao + 1:]
+        inteiro = texto[:posicao].lstrip('+-').strip('0')
+        if outro not in texto and (texto.count(separador) > 1 or (len(fracao) == 3 and inteiro and not so_decimal)):
+            texto = texto.replace(separador, '')
+        else:
+            texto = texto[:posicao].replace(outro, '') + '.' + fracao
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {texto!r}")
+    if not valor.is_finite():
+        raise ValueError(f"Valor inválido: {texto!r}")
+    return int((valor * 100).to_integral_value(ROUND_HALF_UP))
+
+# As datas se repetem muito num extrato: a conversão de cada texto é guardada
+LIMITE_DATAS_CONVERTIDAS = 10000
+_datas_convertidas = {}  # '10/03/2025' -> '2025-03-10 00:00:00'
+
+def _converter_data_csv(texto):
+    convertida = _datas_convertidas.get(texto)
+    if convertida is not None:
+        return convertida
+    for formato in FORMATOS_DATA_CSV:
+        try:
+            convertida = datetime.strptime(texto.strip(), formato).strftime('%Y-%m-%d 00:00:00')
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Data inválida: {texto.strip()!r}")
+    if len(_datas_convertidas) >= LIMITE_DATAS_CONVERTIDAS:
+        _datas_convertidas.clear()
+    _datas_convertidas[texto] = convertida
+    return convertida
+
+def _colunas_cabecalho(cabecalho):
+    colunas = {}
+    for indice, nome in enumerate(cabecalho):
+        nome = core.normalizar_texto(nome)
+        for campo, nomes in COLUNAS_CSV.items():
+            if campo not in colunas and any(nome.startswith(n) for n in nomes):
+                colunas[campo] = indice
+    faltando = [campo for campo in COLUNAS_CSV if campo not in colunas]
+    if faltando:
+        raise ValueError(f"Colunas não encontradas no cabeçalho do CSV: {', '.join(faltando)}")
+    return colunas
+
+def ler_csv(caminho):
+    with _abrir_extrato(caminho, newline='') as f:
+        amostra = f.read(TAMANHO_BLOCO)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(f, dialeto)
+        colunas = None
+        for numero, linha in enumerate(leitor, 1):
+            if not any(campo.strip() for campo in linha):
+                continue
+            if colunas is None:
+                colunas = _colunas_cabecalho(linha)
+                continue
+            try:
+                valor = _converter_valor(linha[colunas['valor']])
+                data = _converter_data_csv(linha[colunas['data']])
+                descricao = linha[colunas['descricao']].strip()
+            except (ValueError, IndexError) as e:
+                yield {'linha': numero, 'erro': str(e) or "Linha incompleta"}
+                continue
+            yield {'linha': numero, 'data': data, 'descricao_original': descricao, 'valor': valor}
+
+# OFX (SGML ou XML): lido em blocos; só as marcações dentro de <STMTTRN>
+# interessam. No SGML as marcações de valor não têm fechamento, então o valor
+# vai até a próxima '<'.
+_MARCACAO_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+def ler_ofx(caminho):
+    with _abrir_extrato(caminho) as f:
+        resto = ''
+        transacao = None
+        numero = 0
+        while True:
+            bloco = f.read(TAMANHO_BLOCO)
+            texto = resto + bloco
+            # A última marcação pode estar cortada: fica para o próximo bloco
+            corte = texto.rfind('<') if bloco else len(texto)
+            resto = texto[corte:] if bloco else ''
+            for fechamento, nome, valor in _MARCACAO_OFX.findall(texto[:corte]):
+                nome = nome.upper()
+                if nome == 'STMTTRN':
+                    if fechamento and transacao is not None:
+                        numero += 1
+                        yield _lancamento_ofx(numero, transacao)
+                        transacao = None
+                    elif not fechamento:
+                        transacao = {}
+                elif transacao is not None and not fechamento:
+                    transacao[nome] = valor.strip()
+            if not bloco:
+                return
+
+def _lancamento_ofx(numero, transacao):
+    try:
+        data = datetime.strptime(transacao.get('DTPOSTED', '')[:8], '%Y%m%d').strftime('%Y-%m-%d 00:00:00')
+        valor = _converter_valor(transacao.get('TRNAMT', ''), so_decimal=True)
+    except ValueError as e:
+        return {'linha': numero, 'erro': str(e)}
+    descricao = transacao.get('MEMO') or transacao.get('NAME') or ''
+    return {'linha': numero, 'data': data, 'descricao_original': descricao, 'valor': valor}
+
+def ler_extrato(caminho):
+    if os.path.splitext(caminho)[1].lower() in ('.ofx', '.qfx'):
+        return ler_ofx(caminho)
+    return ler_csv(caminho)
+
+# Linhas não importadas: guarda a contagem e só as primeiras LIMITE_PREVIA
+def _ignorar(ignoradas, linha, motivo):
+    ignoradas['quantidade'] += 1
+    if len(ignoradas['linhas']) < LIMITE_PREVIA:
+        ignoradas['linhas'].append((linha, motivo))
+
+# Lançamentos classificados: (lancamento, tipo, categoria, (ano, mes)).
+# Linhas com erro ou valor zero vão para 'ignoradas'.
+def _classificados(caminho, regras, ignoradas):
+    for lancamento in ler_extrato(caminho):
+        if 'erro' in lancamento:
+            _ignorar(ignoradas, lancamento['linha'], lancamento['erro'])
+            continue
+        if lancamento['valor'] == 0:
+            _ignorar(ignoradas, lancamento['linha'], "Valor zero")
+            continue
+        tipo, categoria = classificar(lancamento, regras)
+        data = lancamento['data']
+        yield lancamento, tipo, categoria, (int(data[:4]), int(data[5:7]))
+
+# Função que diz se um lançamento do extrato já existe no mês. A n-ésima
+# ocorrência de uma impressão no extrato é repetida se o mês já tinha, antes
+# da importação, pelo menos n lançamentos com ela: dois cafés de mesmo valor
+# no mesmo dia continuam sendo dois lançamentos na primeira importação.
+def _verificador_repetidos():
+    existentes = {}  # impressão -> quantos o mês tinha antes da importação
+    vistas = {}      # impressão -> ocorrências no extrato até agora
+    def repetido(lancamento, tipo, categoria, ano, mes):
+        impressao = core.impressao_lancamento(tipo, categoria, abs(lancamento['valor']), lancamento['descricao_original'],
+                                              lancamento['data'], core.ORIGEM_EXTRATO)
+        if impressao not in existentes:
+            # Consultado antes de o extrato acrescentar qualquer lançamento
+            # com esta impressão
+            existentes[impressao] = core.impressoes_mes(ano, mes).get(impressao, 0)
+        vistas[impressao] = vistas.get(impressao, 0) + 1
+        return vistas[impressao] <= existentes[impressao]
+    return repetido
+
+def _somar_ao_mes(meses, ano_mes, tipo, valor):
+    resumo = meses.setdefault(ano_mes, {'quantidade': 0, 'entradas': 0, 'despesas': 0})
+    resumo['quantidade'] += 1
+    resumo[tipo] += valor
+
+# O que seria importado, sem gravar nada. Devolve
+#   'amostra': os primeiros 'limite' lançamentos
+#              [(linha, data, descrição do extrato, tipo, categoria, valor, repetido)]
+#   'meses': {(ano, mes): {'quantidade', 'entradas', 'despesas'}}
+#   'total': quantos lançamentos seriam importados (sem os repetidos, a
+#            menos que 'incluir_repetidos')
+#   'repetidos': quantos lançamentos já existem nos meses
+#   'ignoradas': as primeiras linhas não importadas [(linha, motivo)]
+#   'quantidade_ignoradas': quantas linhas não seriam importadas
+def pre_visualizar(caminho, regras=None, limite=LIMITE_PREVIA, incluir_repetidos=False):
+    regras = regras if regras is not None else carregar_regras()
+    ignoradas = {'quantidade': 0, 'linhas': []}
+    repetido = _verificador_repetidos()
+    amostra = []
+    meses = {}
+    total = repetidos = 0
+    for lancamento, tipo, categoria, (ano, mes) in _classificados(caminho, regras, ignoradas):
+        valor = abs(lancamento['valor'])
+        e_repetido = repetido(lancamento, tipo, categoria, ano, mes)
+        if len(amostra) < limite:
+            amostra.append((lancamento['linha'], lancamento['data'], lancamento['descricao_original'], tipo, categoria, valor, e_repetido))
+        if e_repetido:
+            repetidos += 1
+            if not incluir_repetidos:
+                continue
+        total += 1
+        _somar_ao_mes(meses, (ano, mes), tipo, valor)
+    return {'amostra': amostra, 'meses': meses, 'total': total, 'repetidos': repetidos,
+            'ignoradas': ignoradas['linhas'], 'quantidade_ignoradas': ignoradas['quantidade']}
+
+# Importa o extrato. Os lançamentos movimentam a conta corrente, como os
+# feitos pela interface; com atualizar_caixas=False só entram nas listas do
+# mês. Lançamentos repetidos só são importados com 'incluir_repetidos'. Devolve o mesmo resumo de pre_visualizar, sem a amostra.
+def importar(caminho, regras=None, atualizar_caixas=True, incluir_repetidos=False):
+    regras = regras if regras is not None else carregar_regras()
+    ignoradas = {'quantidade': 0, 'linhas': []}
+    repetido = _verificador_repetidos()
+    meses = {}
+    total = repetidos = 0
+    with core.LoteOperacoes():
+        for lancamento, tipo, categoria, (ano, mes) in _classificados(caminho, regras, ignoradas):
+            valor = abs(lancamento['valor'])
+            if repetido(lancamento, tipo, categoria, ano, mes):
+                repetidos += 1
+                if not incluir_repetidos:
+                    continue
+            core.adicionar_transacao(tipo, categoria, valor, lancamento['descricao_original'], ano, mes,
+                                     atualizar_caixas=atualizar_caixas,
+                                     data=lancamento['data'], origem=core.ORIGEM_EXTRATO)
+            total += 1
+            _somar_ao_mes(meses, (ano, mes), tipo, valor)
+    return {'meses': meses, 'total': total, 'repetidos': repetidos,
+            'ignoradas': ignoradas['linhas'], 'quantidade_ignoradas': ignoradas['quantidade']}
@@ -0,0 +1,1290 @@
+# Núcleo do gerenciador financeiro, sem interface gráfica.
+#
+# Tudo o que mexe nos dados do orçamento fica aqui: leitura e gravação dos
+# meses, lançamentos, investimentos, compras parceladas, resumos e
+# comparativos. As funções recebem valores comuns (strings, números, ano e
+# mês) e não dependem de Tk, matplotlib ou reportlab, então este módulo pode
+# ser importado por scripts, testes e ferramentas de linha de comando.
+# A interface (gui_orcamento2.py.py) é só uma camada por cima dele.
+import json
+import math
+import hashlib
+import unicodedata
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import atexit
+import uuid
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from collections import OrderedDict
+from diario import Diario, aplicar_operacoes
+from formatacao import FORMATO_DATA, formatar_moeda
+from agregacao import agrupar, agrupar_meses, chave_cartao
+
+# Lista de despesas predefinidas (CORRIGIDA)
+CATEGORIAS_DESPESAS_PREDEFINIDAS = [
+    'Aluguel',
+    'Financiamento Imobibiario',
+    'Estacionamento',
+    'Fatura de Energia',
+    'Fatura de Água',
+    'Fatura Tv / Internet',
+    'Despesas Reforma',
+    'Contabilidade',
+    'INSS',
+    'Simples Nacional',
+    'Parcelamento 1',
+    'Parcelamento 2',
+    'Despesa Supermercado',
+    'Despesa Padaria',
+    'Despesa Refeição Trabalho',
+    'Despesa Fast Food/Restaurante',
+    'Plano de Saúde Familiar',
+    'Plano de Saúde Contribuição',
+    'Cartão de crédito XP',
+    'Cartão de crédito BVI',
+    'Cartão de crédito Itaú',
+    'Cartão RCHLO',
+    'Cartão credito ML',
+    'Medicamentos',
+    'Pet Shop',
+    'Cabeleireiro',
+    'Dentista',
+    'Diversão Heitor',
+    'pagamento condominio',
+    'outros'
+]
+
+# Nova lista de receitas predefinidas
+CATEGORIAS_ENTRADAS_PREDEFINIDAS = [
+    'Salário',
+    'Aluguel',
+    'Dividendos',
+    'Outros'
+]
+
+# Tipos de investimento com saldo próprio nos caixas
+TIPOS_INVESTIMENTOS = ['Ações', 'Fundos Imobiliários', 'ETF Internacional', 'CDB', 'Cofrinhos', 'Tesouro Direto']
+
+# Cartões de crédito usados nas compras parceladas e no comparativo de faturas
+CARTOES = ['Cartão de crédito Itaú', 'Cartão de crédito BVI', 'Cartão de crédito XP', 'Cartão credito ML', 'Cartão RCHLO']
+
+# --- Criação do diretório de dados ---
+DATA_DIR = os.environ.get('ORCAMENTO_DATA_DIR', 'data')
+if not os.path.exists(DATA_DIR):
+    os.makedirs(DATA_DIR)
+
+# Função para obter o nome do arquivo JSON com base no mês e ano
+def get_json_file(ano, mes):
+    return os.path.join(DATA_DIR, f'data_orcamento_{ano}_{mes:02d}.json')
+
+# Versão do formato dos dados de um mês (chave 'formato'). Na versão 2 todos os
+# valores em dinheiro (valor, valor_total, valor_parcela e os caixas) são
+# inteiros em centavos; meses sem 'formato' guardam reais em float e são
+# convertidos ao serem lidos (ver migrar_para_centavos). Na versão 3 o mês não
+# guarda mais os caixas: os saldos saem dos lançamentos (ver Saldos das
+# contas) e o mês só guarda os saldos iniciais informados ('saldo_inicial') e
+# as transferências entre contas ('movimentos'); ver migrar_saldos.
+FORMATO_CENTAVOS = 2
+FORMATO_DADOS = 3
+
+# Conta corrente; as demais contas são os tipos de investimento
+CONTA_CORRENTE = 'conta_corrente'
+
+# Estrutura padrão de um mês sem lançamentos
+def criar_dados_vazios():
+    return {
+        'formato': FORMATO_DADOS,
+        'entradas': [],
+        'despesas': [],
+        'investimentos': [],
+        'cartoes_parcelados': [],
+        'movimentos': [],
+        'saldo_inicial': {},
+    }
+
+# Listas de lançamentos de um mês. Cada lançamento tem um 'id' próprio, que
+# não muda e não se repete, usado para encontrá-lo (e excluí-lo) com exatidão
+# mesmo quando há lançamentos iguais.
+LISTAS_LANCAMENTOS = ('entradas', 'despesas', 'investimentos', 'cartoes_parcelados', 'movimentos')
+
+def novo_id():
+    return uuid.uuid4().hex
+
+# Dá um id aos lançamentos que ainda não têm (meses gravados antes dos ids).
+# Devolve True se algum lançamento foi alterado.
+def atribuir_ids(dados):
+    alterou = False
+    for lista in LISTAS_LANCAMENTOS:
+        for item in dados[lista]:
+            if 'id' not in item:
+                item['id'] = novo_id()
+                alterou = True
+    return alterou
+
+# Garante que todas as chaves existam (arquivos antigos podem não ter todas)
+def normalizar_dados(data):
+    if 'entradas' not in data:
+        data['entradas'] = []
+    if 'despesas' not in data:
+        data['despesas'] = []
+    if 'investimentos' not in data:
+        data['investimentos'] = []
+    if 'cartoes_parcelados' not in data:
+        data['cartoes_parcelados'] = []
+    if 'movimentos' not in data:
+        data['movimentos'] = []
+    if data.get('formato', 1) >= FORMATO_DADOS:
+        if 'saldo_inicial' not in data:
+            data['saldo_inicial'] = {}
+    elif 'caixas' not in data:
+        # Meses antigos guardavam os caixas (convertidos por migrar_saldos)
+        data['caixas'] = {'conta_corrente': 0, 'investimentos': {}}
+    return data
+
+# --- Valores em centavos ---
+# Campos em dinheiro de cada tipo de lançamento
+CAMPOS_VALOR = ('valor', 'valor_total', 'valor_parcela')
+
+# Reais (float) -> centavos (int), arredondando meio centavo para longe do
+# zero (o mesmo que o ROUND do SQLite, usado nas consultas do banco)
+def reais_para_centavos(valor):
+    centavos = math.floor(abs(valor) * 100 + 0.5)
+    return -centavos if valor < 0 else centavos
+
+def _item_em_centavos(item):
+    for campo in CAMPOS_VALOR:
+        if campo in item:
+            item[campo] = reais_para_centavos(item[campo])
+    return item
+
+# Converte um mês gravado em reais para centavos. Devolve True se converteu.
+def migrar_para_centavos(dados):
+    if dados.get('formato', 1) >= FORMATO_CENTAVOS:
+        return False
+    for lista in LISTAS_LANCAMENTOS:
+        for item in dados[lista]:
+            _item_em_centavos(item)
+    caixas = dados['caixas']
+    caixas['conta_corrente'] = reais_para_centavos(caixas['conta_corrente'])
+    caixas['investimentos'] = {nome: reais_para_centavos(valor) for nome, valor in caixas['investimentos'].items()}
+    dados['formato'] = FORMATO_CENTAVOS
+    return True
+
+# Converte um mês que guardava os caixas para o formato 3. O saldo guardado de
+# cada conta vira o saldo inicial do mês (saldo guardado menos o movimento do
+# mês), e o fechamento do mês continua o mesmo de antes. Contas com saldo
+# guardado zerado (nunca movimentadas naquele mês) ficam sem saldo inicial e
+# continuam do mês anterior. Deve ser chamada depois do diário reaplicado.
+# Devolve True se converteu.
+def migrar_saldos(dados):
+    if 'caixas' not in dados:
+        return False
+    caixas = dados.pop('caixas')
+    guardados = dict(caixas['investimentos'], **{CONTA_CORRENTE: caixas['conta_corrente']})
+    movimento = calcular_fluxo(dados)['movimento']
+    dados['saldo_inicial'] = {conta: valor - movimento.get(conta, 0)
+                              for conta, valor in guardados.items() if valor != 0}
+    dados['formato'] = FORMATO_DADOS
+    return True
+
+# Operações de um registro do diário, em centavos. Registros anteriores aos
+# centavos não têm 'formato' e têm os valores em reais.
+def _operacoes_em_centavos(registro):
+    if registro.get('formato', 1) >= FORMATO_CENTAVOS:
+        return registro['ops']
+    operacoes = []
+    for operacao in registro['ops']:
+        operacao = dict(operacao)
+        if 'item' in operacao:
+            operacao['item'] = _item_em_centavos(dict(operacao['item']))
+        if 'filtro' in operacao:
+            operacao['filtro'] = _item_em_centavos(dict(operacao['filtro']))
+        if 'valor' in operacao:
+            operacao['valor'] = reais_para_centavos(operacao['valor'])
+        operacoes.append(operacao)
+    return operacoes
+
+# --- Armazenamento ---
+# carregar_dados/salvar_dados não acessam o disco diretamente: usam um
+# "armazenamento", que sabe ler e gravar meses. O padrão é um arquivo JSON por
+# mês em DATA_DIR; com ORCAMENTO_BACKEND=sqlite os dados ficam em um banco
+# SQLite (ver armazenamento_sqlite.py). Todo armazenamento oferece:
+#   assinatura(ano, mes)  -> valor que muda sempre que o mês muda (para o cache)
+#   ler_mes(ano, mes)     -> dados do mês ou None se o mês não existir
+#   gravar_meses(meses, resumos)
+#                         -> grava {(ano, mes): dados} e o resumo de cada mês
+#                            ({(ano, mes): resumo}) de forma tudo-ou-nada
+#   ler_resumo(ano, mes)  -> resumo gravado junto com o mês, ou None se não
+#                            existir ou se o mês mudou depois dele
+#   listar_meses()        -> lista ordenada de (ano, mes) existentes
+# e pode oferecer as consultas entre meses (ver Consultas entre meses):
+#   totais_meses(inicio, fim), fluxos_meses(inicio, fim)
+BACKEND_ARMAZENAMENTO = os.environ.get('ORCAMENTO_BACKEND', 'json')
+
+# Escreve o texto em um arquivo temporário ao lado do definitivo e devolve o
+# caminho do temporário. A troca pelo definitivo é feita depois com
+# os.replace, que é atômico: quem lê vê o arquivo antigo inteiro ou o novo
+# inteiro, nunca metade.
+def _escrever_temporario(caminho, texto):
+    diretorio = os.path.dirname(caminho) or '.'
+    fd, caminho_tmp = tempfile.mkstemp(prefix='.tmp_', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        _remover_silenciosamente(caminho_tmp)
+        raise
+    return caminho_tmp
+
+def _remover_silenciosamente(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+def gravar_arquivo_atomico(caminho, texto):
+    os.replace(_escrever_temporario(caminho, texto), caminho)
+
+# Cada arquivo é trocado de forma atômica, mas a troca de vários arquivos
+# não: se o programa cair no meio da fase 2 de gravar_meses, alguns meses
+# estão novos e outros não. Por isso, antes da fase 2, a lista de trocas
+# (temporário -> definitivo) é gravada em ARQUIVO_TROCAS; ao abrir a pasta,
+# uma lista que ficou para trás é concluída (os temporários que ainda existem
+# são trocados), e o lote inteiro passa a valer.
+ARQUIVO_TROCAS = 'gravacao_em_andamento.json'
+
+class ArmazenamentoJSON:
+    PADRAO_ARQUIVO = re.compile(r'^data_orcamento_(\d{4})_(\d{2})\.json$')
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._concluir_trocas()
+
+    def _concluir_trocas(self):
+        caminho_trocas = os.path.join(self.diretorio, ARQUIVO_TROCAS)
+        try:
+            with open(caminho_trocas, 'r') as f:
+                trocas = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError):
+            # Lista incompleta: a fase 2 nem tinha começado
+            _remover_silenciosamente(caminho_trocas)
+            return
+        for temporario, definitivo in trocas:
+            try:
+                os.replace(os.path.join(self.diretorio, temporario), os.path.join(self.diretorio, definitivo))
+            except FileNotFoundError:
+                pass  # já trocado antes da queda
+        _remover_silenciosamente(caminho_trocas)
+
+    def caminho(self, ano, mes):
+        return os.path.join(self.diretorio, f'data_orcamento_{ano}_{mes:02d}.json')
+
+    def caminho_resumo(self, ano, mes):
+        return os.path.join(self.diretorio, f'resumo_orcamento_{ano}_{mes:02d}.json')
+
+    def assinatura(self, ano, mes):
+        try:
+            st = os.stat(self.caminho(ano, mes))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def ler_mes(self, ano, mes):
+        json_file = self.caminho(ano, mes)
+        if not os.path.exists(json_file):
+            return None
+        with open(json_file, 'r') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                pass
+        # Arquivo corrompido: guarda uma cópia antes que a próxima gravação
+        # o substitua por um mês vazio
+        os.replace(json_file, json_file + '.corrompido')
+        return None
+
+    def gravar_meses(self, meses_dados, resumos=None):
+        # Fase 1: escreve todos os temporários. Se algum falhar, nenhum arquivo
+        # definitivo foi tocado.
+        temporarios = []
+        try:
+            for (ano, mes), dados in meses_dados.items():
+                json_file = self.caminho(ano, mes)
+                caminho_tmp = _escrever_temporario(json_file, json.dumps(dados, indent=4))
+                temporarios.append((caminho_tmp, json_file))
+                if resumos and (ano, mes) in resumos:
+                    # os.replace mantém o mtime do temporário, então esta já é
+                    # a assinatura que o mês terá depois da troca
+                    st = os.stat(caminho_tmp)
+                    resumo = dict(resumos[(ano, mes)], assinatura=[st.st_mtime_ns, st.st_size])
+                    caminho_resumo = self.caminho_resumo(ano, mes)
+                    temporarios.append((_escrever_temporario(caminho_resumo, json.dumps(resumo)), caminho_resumo))
+        except BaseException:
+            for caminho_tmp, _ in temporarios:
+                _remover_silenciosamente(caminho_tmp)
+            raise
+        # Fase 2: troca todos os arquivos, com a lista das trocas gravada antes
+        # para que uma queda no meio seja concluída na próxima abertura
+        caminho_trocas = os.path.join(self.diretorio, ARQUIVO_TROCAS)
+        if len(meses_dados) > 1:
+            try:
+                gravar_arquivo_atomico(caminho_trocas, json.dumps(
+                    [[os.path.basename(caminho_tmp), os.path.basename(json_file)] for caminho_tmp, json_file in temporarios]))
+            except BaseException:
+                for caminho_tmp, _ in temporarios:
+                    _remover_silenciosamente(caminho_tmp)
+                raise
+        for caminho_tmp, json_file in temporarios:
+            os.replace(caminho_tmp, json_file)
+        if len(meses_dados) > 1:
+            _remover_silenciosamente(caminho_trocas)
+
+    def ler_resumo(self, ano, mes):
+        try:
+            with open(self.caminho_resumo(ano, mes), 'r') as f:
+                resumo = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        assinatura = self.assinatura(ano, mes)
+        if assinatura is None or resumo.get('assinatura') != list(assinatura):
+            return None
+        return resumo
+
+    def listar_meses(self):
+        meses_existentes = []
+        for nome in os.listdir(self.diretorio):
+            encontrado = self.PADRAO_ARQUIVO.match(nome)
+            if encontrado:
+                meses_existentes.append((int(encontrado.group(1)), int(encontrado.group(2))))
+        return sorted(meses_existentes)
+
+def criar_armazenamento(backend):
+    if backend == 'sqlite':
+        from armazenamento_sqlite import ArmazenamentoSQLite
+        return ArmazenamentoSQLite(os.path.join(DATA_DIR, 'orcamento.db'))
+    return ArmazenamentoJSON(DATA_DIR)
+
+armazenamento = criar_armazenamento(BACKEND_ARMAZENAMENTO)
+
+# --- Diário de operações ---
+# Com ORCAMENTO_DIARIO=1 cada lançamento é acrescentado ao diário do mês
+# (diario.py) em vez de regravar o mês inteiro. O mês só é regravado, e o
+# diário compactado, quando o diário passa de LIMITE_DIARIO_BYTES. Diários
+# existentes são sempre aplicados ao carregar, mesmo com o modo desligado.
+DIARIO_ATIVO = os.environ.get('ORCAMENTO_DIARIO', '0') == '1'
+LIMITE_DIARIO_BYTES = 64 * 1024
+diario = Diario(DATA_DIR)
+
+# Troca o diretório de dados e/ou o armazenamento (usado por scripts e pela
+# linha de comando). O que estiver pendente é gravado antes da troca.
+def configurar(diretorio_dados=None, backend=None):
+    global DATA_DIR, BACKEND_ARMAZENAMENTO, armazenamento, diario
+    gravar_pendentes()
+    with _lock_persistencia:
+        if diretorio_dados is not None:
+            DATA_DIR = diretorio_dados
+        if backend is not None:
+            BACKEND_ARMAZENAMENTO = backend
+        os.makedirs(DATA_DIR, exist_ok=True)
+        if hasattr(armazenamento, 'fechar'):
+            armazenamento.fechar()
+        armazenamento = criar_armazenamento(BACKEND_ARMAZENAMENTO)
+        diario = Diario(DATA_DIR)
+        _cache_meses.clear()
+        _mes_alterado()
+
+def _assinatura_mes(ano, mes):
+    return (armazenamento.assinatura(ano, mes), diario.assinatura(ano, mes))
+
+# --- Cache de meses em memória ---
+# Cada atualização da interface lê o mesmo mês várias vezes. O cache guarda
+# o conteúdo já processado de cada (ano, mes) junto com a assinatura do
+# armazenamento e do diário (mtime/tamanho dos arquivos, no caso do JSON); se
+# o mês mudar fora do programa a entrada é descartada e relida.
+CACHE_MAX_MESES = 24
+_cache_meses = OrderedDict()  # (ano, mes) -> (assinatura, dados)
+
+# Cópia dos dados de um mês. Os itens das listas são dicionários simples
+# (só strings e números), então basta copiar um nível abaixo das listas.
+def copiar_dados(dados):
+    copia = {}
+    for chave, valor in dados.items():
+        if isinstance(valor, list):
+            copia[chave] = [dict(item) if isinstance(item, dict) else item for item in valor]
+        elif isinstance(valor, dict):
+            copia[chave] = copiar_dados(valor)
+        else:
+            copia[chave] = valor
+    return copia
+
+def _guardar_no_cache(ano, mes, assinatura, dados):
+    chave = (ano, mes)
+    _cache_meses[chave] = (assinatura, dados)
+    _cache_meses.move_to_end(chave)
+    while len(_cache_meses) > CACHE_MAX_MESES:
+        _cache_meses.popitem(last=False)
+
+def invalidar_cache(ano=None, mes=None):
+    with _lock_persistencia:
+        if ano is None or mes is None:
+            _cache_meses.clear()
+            _mes_alterado()
+        else:
+            _cache_meses.pop((ano, mes), None)
+            _mes_alterado(ano, mes)
+
+# Função para carregar dados do arquivo JSON
+# Por padrão devolve uma cópia própria do chamador, que pode alterá-la à
+# vontade. Com somente_leitura=True devolve o objeto do cache (mais rápido),
+# e o chamador NÃO deve modificá-lo.
+def carregar_dados(ano, mes, somente_leitura=False):
+    chave = (ano, mes)
+    lote = _lote_atual()
+    if lote is not None and chave in lote.meses:
+        dados = lote.meses[chave]
+        return dados if somente_leitura else copiar_dados(dados)
+    with _lock_persistencia:
+        # Alterações ainda não gravadas em disco têm prioridade sobre o arquivo
+        dados = _meses_pendentes.get(chave)
+        if dados is None:
+            assinatura = _assinatura_mes(ano, mes)
+            entrada = _cache_meses.get(chave)
+            if entrada is not None and entrada[0] == assinatura:
+                _cache_meses.move_to_end(chave)
+                dados = entrada[1]
+            else:
+                if entrada is not None:
+                    # O mês mudou fora do programa: os saldos a partir dele também
+                    _mes_alterado(ano, mes)
+                dados = armazenamento.ler_mes(ano, mes)
+                dados = normalizar_dados(dados) if dados is not None else criar_dados_vazios()
+                convertido = migrar_para_centavos(dados)
+                diario.reaplicar(dados, ano, mes, converter=_operacoes_em_centavos)
+                convertido = migrar_saldos(dados) or convertido
+                convertido = atribuir_ids(dados) or convertido
+                if convertido:
+                    # Os ids novos precisam estar no disco antes que alguma
+                    # operação do diário se refira a eles
+                    _gravar_mes_agora(ano, mes, dados)
+                else:
+                    _guardar_no_cache(ano, mes, _assinatura_mes(ano, mes), dados)
+    if somente_leitura:
+        return dados
+    return copiar_dados(dados)
+
+# Grava na hora um mês (e seu resumo), sem passar pela gravação em segundo
+# plano. Usado para meses convertidos ao serem lidos (ids novos, valores em
+# centavos) e para reconstruir os resumos. Se a gravação falhar, o mês fica
+# pendente como qualquer outra alteração.
+def _gravar_mes_agora(ano, mes, dados):
+    try:
+        armazenamento.gravar_meses({(ano, mes): dados}, {(ano, mes): calcular_resumo(dados)})
+        if 'diario_seq' in dados:
+            diario.compactar(ano, mes, dados['diario_seq'])
+    except ERROS_GRAVACAO as e:
+        print(f"Erro ao gravar dados: {e}", file=sys.stderr)
+        _meses_pendentes[(ano, mes)] = dados
+        _guardar_no_cache(ano, mes, None, dados)
+        _agendar_gravacao()
+        return
+    _guardar_no_cache(ano, mes, _assinatura_mes(ano, mes), dados)
+
+# Converte (e grava) todos os meses existentes que ainda estão em um formato
+# antigo. Devolve quantos meses foram lidos.
+def migrar_meses():
+    meses = armazenamento.listar_meses()
+    for ano, mes in meses:
+        carregar_dados(ano, mes, somente_leitura=True)
+    gravar_pendentes()
+    return len(meses)
+
+# (ano, mes) de todos os meses existentes, inclusive os que só estão em memória
+# ou no diário
+def listar_meses():
+    with _lock_persistencia:
+        return sorted(set(armazenamento.listar_meses()) | set(diario.listar_meses()) | set(_meses_pendentes))
+
+# Valor que muda sempre que o mês é regravado, para quem guarda cálculos
+# feitos sobre ele fora deste módulo. Meses com alterações ainda não gravadas
+# devolvem None (não há versão estável para comparar).
+def versao_mes(ano, mes):
+    with _lock_persistencia:
+        if (ano, mes) in _meses_pendentes:
+            return None
+        return _assinatura_mes(ano, mes)
+
+# Funções chamadas como funcao(ano, mes) sempre que um mês muda por este
+# módulo (ou quando se percebe que mudou por fora), e como funcao(None, None)
+# quando qualquer mês pode ter mudado (invalidar_cache(), configurar()). São
+# chamadas com o lock da persistência: devem só anotar o mês e voltar.
+_ouvintes_alteracao = []
+
+# Quantas vezes cada mês mudou (ver _mes_alterado). TransacaoMeses e
+# LoteOperacoes guardam o número de quando leram cada mês para perceber, ao
+# gravar, se outra thread alterou o mês nesse meio tempo.
+_alteracoes_meses = {}  # (ano, mes) -> contador
+
+# Um mês lido por TransacaoMeses ou LoteOperacoes foi alterado por outra
+# thread antes do fim do bloco. Nada do bloco é gravado: gravá-lo apagaria a
+# outra alteração.
+class ConflitoMeses(Exception):
+    pass
+
+def _conferir_conflitos(contadores):
+    alterados = sorted(chave for chave, contador in contadores.items() if _alteracoes_meses.get(chave, 0) != contador)
+    if alterados:
+        meses = ', '.join(f"{mes:02d}/{ano}" for ano, mes in alterados)
+        raise ConflitoMeses(f"Mês(es) alterado(s) enquanto a operação estava em andamento: {meses}. Nada foi gravado; tente de novo.")
+
+def ao_alterar_mes(funcao):
+    with _lock_persistencia:
+        _ouvintes_alteracao.append(funcao)
+
+def _mes_alterado(ano=None, mes=None):
+    if ano is not None:
+        _alteracoes_meses[(ano, mes)] = _alteracoes_meses.get((ano, mes), 0) + 1
+    _invalidar_saldos(ano, mes)
+    for funcao in _ouvintes_alteracao:
+        funcao(ano, mes)
+
+# Valores calculados a partir dos dados de um mês (índice por id, resumo),
+# guardados enquanto o mês não muda: cada alteração gera um novo objeto de
+# dados no cache, então basta comparar a identidade do objeto.
+def _derivado_do_mes(memoria, chave, dados, calcular):
+    entrada = memoria.get(chave)
+    if entrada is not None and entrada[0] is dados:
+        memoria.move_to_end(chave)
+        return entrada[1]
+    valor = calcular(dados)
+    memoria[chave] = (dados, valor)
+    memoria.move_to_end(chave)
+    while len(memoria) > CACHE_MAX_MESES:
+        memoria.popitem(last=False)
+    return valor
+
+# Índice dos lançamentos de um mês por id: {id: (lista, item)}
+_indices_ids = OrderedDict()  # (ano, mes) -> (dados, indice)
+
+def _calcular_indice(dados):
+    return {item['id']: (lista, item) for lista in LISTAS_LANCAMENTOS for item in dados[lista]}
+
+def indice_ids(ano, mes):
+    with _lock_persistencia:
+        dados = carregar_dados(ano, mes, somente_leitura=True)
+        return _derivado_do_mes(_indices_ids, (ano, mes), dados, _calcular_indice)
+
+# Devolve (lista, item) do lançamento com esse id, ou None. O item é o do
+# cache: não deve ser modificado.
+def buscar_lancamento(ano, mes, id_lancamento):
+    return indice_ids(ano, mes).get(id_lancamento)
+
+# --- Persistência em segundo plano ---
+# salvar_dados não escreve mais no disco na hora: o mês fica marcado como
+# pendente e uma thread grava tudo de uma vez ATRASO_GRAVACAO_SEGUNDOS depois.
+# Vários lançamentos seguidos viram uma única gravação por mês.
+ATRASO_GRAVACAO_SEGUNDOS = 1.0
+ERROS_GRAVACAO = (OSError, sqlite3.Error)
+_lock_persistencia = threading.RLock()  # protege o cache e os pendentes
+_lock_gravacao = threading.Lock()       # só uma gravação em disco por vez
+_meses_pendentes = {}  # (ano, mes) -> dados ainda não gravados
+_timer_gravacao = None
+
+def _agendar_gravacao():
+    global _timer_gravacao
+    if _timer_gravacao is None:
+        _timer_gravacao = threading.Timer(ATRASO_GRAVACAO_SEGUNDOS, _gravar_em_segundo_plano)
+        _timer_gravacao.daemon = True
+        _timer_gravacao.start()
+
+def _gravar_em_segundo_plano():
+    global _timer_gravacao
+    with _lock_persistencia:
+        _timer_gravacao = None
+    try:
+        _gravar_pendentes()
+    except ERROS_GRAVACAO as e:
+        # Os meses continuam pendentes e serão gravados na próxima tentativa
+        print(f"Erro ao gravar dados: {e}", file=sys.stderr)
+
+def _gravar_pendentes():
+    with _lock_gravacao:
+        with _lock_persistencia:
+            pendentes = dict(_meses_pendentes)
+        if not pendentes:
+            return
+        # Se a gravação falhar, todos os meses continuam pendentes
+        armazenamento.gravar_meses(pendentes, {chave: calcular_resumo(dados) for chave, dados in pendentes.items()})
+        with _lock_persistencia:
+            for (ano, mes), dados in pendentes.items():
+                # O snapshot gravado já contém o diário até diario_seq
+                if 'diario_seq' in dados:
+                    diario.compactar(ano, mes, dados['diario_seq'])
+                # Só limpa se ninguém alterou o mês enquanto gravávamos
+                if _meses_pendentes.get((ano, mes)) is dados:
+                    del _meses_pendentes[(ano, mes)]
+                    _guardar_no_cache(ano, mes, _assinatura_mes(ano, mes), dados)
+
+# Grava imediatamente tudo o que estiver pendente (usado ao fechar o programa).
+# Levanta um dos ERROS_GRAVACAO se alguma gravação falhar.
+def gravar_pendentes():
+    global _timer_gravacao
+    with _lock_persistencia:
+        if _timer_gravacao is not None:
+            _timer_gravacao.cancel()
+            _timer_gravacao = None
+    _gravar_pendentes()
+
+# Marca vários meses como pendentes de uma só vez: ou todos entram na próxima
+# gravação, ou nenhum (ver TransacaoMeses).
+def salvar_varios_meses(meses_dados):
+    copias = {chave: copiar_dados(dados) for chave, dados in meses_dados.items()}
+    lote = _lote_atual()
+    if lote is not None:
+        for (ano, mes), copia in copias.items():
+            lote.substituir(ano, mes, copia)
+        return
+    with _lock_persistencia:
+        alterou = False
+        for (ano, mes), copia in copias.items():
+            atual = _meses_pendentes.get((ano, mes))
+            if atual is None:
+                entrada = _cache_meses.get((ano, mes))
+                atual = entrada[1] if entrada is not None else None
+            if atual == copia:
+                continue  # nada mudou, não há o que gravar
+            _meses_pendentes[(ano, mes)] = copia
+            _guardar_no_cache(ano, mes, None, copia)
+            _mes_alterado(ano, mes)
+            alterou = True
+        if alterou:
+            _agendar_gravacao()
+
+# Função para salvar dados no arquivo JSON
+def salvar_dados(dados, ano, mes):
+    salvar_varios_meses({(ano, mes): dados})
+    # Removida a mensagem de sucesso para evitar pop-ups excessivos
+    # messagebox.showinfo("Sucesso", f"Dados do mês {mes:02d}/{ano} salvos com sucesso!")
+
+# Transação envolvendo vários meses. Cada mês é carregado uma única vez,
+# todas as alterações são feitas em memória e, ao sair do bloco 'with' sem
+# erro, os meses são salvos juntos. Se ocorrer uma exceção dentro do bloco
+# nada é salvo. Se outra thread alterar um dos meses depois de ele ser
+# carregado, a saída do bloco levanta ConflitoMeses e nada é salvo.
+#
+#     with TransacaoMeses() as transacao:
+#         dados = transacao.mes(2025, 3)
+#         dados['despesas'].append(...)
+class TransacaoMeses:
+    def __init__(self):
+        self.meses = {}
+        self.contadores = {}  # (ano, mes) -> _alteracoes_meses de quando o mês foi carregado
+
+    def mes(self, ano, mes):
+        chave = (ano, mes)
+        if chave not in self.meses:
+            with _lock_persistencia:
+                self.meses[chave] = carregar_dados(ano, mes)
+                self.contadores[chave] = _alteracoes_meses.get(chave, 0)
+        return self.meses[chave]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        if tipo_erro is None:
+            with _lock_persistencia:
+                _conferir_conflitos(self.contadores)
+                salvar_varios_meses(self.meses)
+        return False
+
+atexit.register(gravar_pendentes)
+
+# Lote de lançamentos. Dentro do bloco 'with' (na mesma thread) os
+# lançamentos não são persistidos um a um: cada mês é lido uma única vez, as
+# operações são aplicadas sobre ele em memória e, ao sair do bloco sem erro,
+# cada mês alterado é salvo uma vez (no modo diário, um único registro com
+# todas as operações do mês). Se ocorrer uma exceção dentro do bloco nada é
+# salvo. Como em TransacaoMeses, se outra thread alterar um dos meses do lote
+# durante o bloco, a saída levanta ConflitoMeses e nada do lote é salvo.
+#
+#     with LoteOperacoes():
+#         for descricao, valor in extrato:
+#             adicionar_transacao('despesas', descricao, valor, '', 2025, 3)
+_lote_da_thread = threading.local()
+
+def _lote_atual():
+    return getattr(_lote_da_thread, 'lote', None)
+
+class LoteOperacoes:
+    def __init__(self):
+        self.meses = {}            # (ano, mes) -> dados com as alterações do lote
+        self.operacoes = {}        # (ano, mes) -> operações registradas no mês (modo diário)
+        self.substituidos = set()  # meses salvos inteiros (não cabem em um registro do diário)
+        self.contadores = {}       # (ano, mes) -> _alteracoes_meses de quando o mês foi carregado
+
+    def mes(self, ano, mes):
+        chave = (ano, mes)
+        if chave not in self.meses:
+            with _lock_persistencia:
+                self.meses[chave] = carregar_dados(ano, mes)
+                self.contadores[chave] = _alteracoes_meses.get(chave, 0)
+        return self.meses[chave]
+
+    def registrar(self, ano, mes, operacoes):
+        chave = (ano, mes)
+        aplicar_operacoes(self.mes(ano, mes), operacoes)
+        if DIARIO_ATIVO:
+            # As operações só são necessárias para o registro do diário
+            self.operacoes.setdefault(chave, []).extend(operacoes)
+        # Os dados mudaram no mesmo objeto: índice e resumo guardados não valem mais
+        with _lock_persistencia:
+            _indices_ids.pop(chave, None)
+            _resumos_calculados.pop(chave, None)
+            entrada = _impressoes_calculadas.get(chave)
+            if entrada is not None and entrada[0] is self.meses[chave]:
+                # Conferências de repetidos seguidas no lote não recalculam o mês todo
+                if not _somar_impressoes(entrada[1], operacoes):
+                    del _impressoes_calculadas[chave]
+
+    def substituir(self, ano, mes, dados):
+        chave = (ano, mes)
+        with _lock_persistencia:
+            self.contadores.setdefault(chave, _alteracoes_meses.get(chave, 0))
+        self.meses[chave] = dados
+        self.substituidos.add(chave)
+
+    def __enter__(self):
+        if _lote_atual() is not None:
+            raise RuntimeError("Já existe um lote aberto nesta thread.")
+        _lote_da_thread.lote = self
+        return self
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        _lote_da_thread.lote = None
+        if tipo_erro is None:
+            with _lock_persistencia:
+                _conferir_conflitos(self.contadores)
+                if DIARIO_ATIVO:
+                    for (ano, mes), operacoes in self.operacoes.items():
+                        if (ano, mes) not in self.substituidos:
+                            _anexar_ao_diario(ano, mes, self.meses[(ano, mes)], operacoes)
+                    salvar_varios_meses({chave: self.meses[chave] for chave in self.substituidos})
+                else:
+                    salvar_varios_meses(self.meses)
+        return False
+
+# Acrescenta ao diário as operações já aplicadas em 'dados'
+def _anexar_ao_diario(ano, mes, dados, operacoes):
+    chave = (ano, mes)
+    _mes_alterado(ano, mes)
+    dados['diario_seq'] = dados.get('diario_seq', 0) + 1
+    diario.anexar(ano, mes, dados['diario_seq'], operacoes, formato=FORMATO_DADOS)
+    if chave in _meses_pendentes or diario.tamanho(ano, mes) > LIMITE_DIARIO_BYTES:
+        # Regrava o snapshot; a gravação compacta o diário
+        _meses_pendentes[chave] = dados
+        _guardar_no_cache(ano, mes, None, dados)
+        _agendar_gravacao()
+    else:
+        _guardar_no_cache(ano, mes, _assinatura_mes(ano, mes), dados)
+
+# Aplica ao mês as operações de um lançamento (ver diario.py para o formato)
+# e persiste: no modo diário acrescenta um registro ao diário do mês, senão
+# salva o mês inteiro como antes. Dentro de um LoteOperacoes só aplica; a
+# gravação fica para o fim do lote.
+def registrar_operacoes(ano, mes, operacoes):
+    lote = _lote_atual()
+    if lote is not None:
+        lote.registrar(ano, mes, operacoes)
+        return
+    with _lock_persistencia:
+        dados = carregar_dados(ano, mes)
+        aplicar_operacoes(dados, operacoes)
+        if not DIARIO_ATIVO:
+            salvar_dados(dados, ano, mes)
+            return
+        _anexar_ao_diario(ano, mes, dados, operacoes)
+
+# --- Consultas entre meses ---
+# Totais e fluxos de todos os meses de um intervalo, de uma vez. O
+# armazenamento SQLite responde direto no banco, com uma consulta agregada
+# para o intervalo inteiro. Os meses que o banco ainda não tem como estão
+# (alterações pendentes, registros no diário, lote aberto, formato antigo) e
+# os do armazenamento JSON saem dos resumos (resumo_mensal).
+
+def _consultar_meses(inicio, fim, consulta, do_resumo):
+    lote = _lote_atual()
+    with _lock_persistencia:
+        meses = set(listar_meses()) | (set(lote.meses) if lote is not None else set())
+        meses = sorted(chave for chave in meses if inicio <= chave <= fim)
+        resultado = {}
+        consultar = getattr(armazenamento, consulta, None)
+        if consultar is not None and meses:
+            fora_do_banco = set(_meses_pendentes) | set(diario.listar_meses()) | (set(lote.meses) if lote is not None else set())
+            for chave, valor in consultar(meses[0], meses[-1]).items():
+                if chave not in fora_do_banco:
+                    resultado[chave] = valor
+        for chave in meses:
+            if chave not in resultado:
+                resultado[chave] = do_resumo(resumo_mensal(*chave))
+        return resultado
+
+# Total de entradas, despesas e investimentos de cada mês existente de
+# 'inicio' a 'fim' ((ano, mes), inclusive):
+# {(ano, mes): {'entradas', 'despesas', 'investimentos'}}
+def totais_meses(inicio, fim):
+    return _consultar_meses(inicio, fim, 'totais_meses', lambda resumo: dict(resumo['totais']))
+
+# Fluxo (ver calcular_fluxo) de cada mês existente de 'inicio' a 'fim'
+# ((ano, mes), inclusive): {(ano, mes): fluxo}. Os fluxos não devem ser
+# modificados por quem chama.
+def fluxos_meses(inicio, fim):
+    return _consultar_meses(inicio, fim, 'fluxos_meses', lambda resumo: resumo['fluxo'])
+
+# --- Meses ---
+
+# Mês anterior a (ano, mes)
+def mes_anterior(ano, mes):
+    if mes == 1:
+        return ano - 1, 12
+    return ano, mes - 1
+
+# (ano, mes) deslocado de 'quantidade' meses (pode ser negativo)
+def somar_meses(ano, mes, quantidade):
+    indice = ano * 12 + (mes - 1) + quantidade
+    return indice // 12, indice % 12 + 1
+
+# Os 'quantidade' meses terminados em (ano, mes), do mais antigo ao mais recente
+def meses_ate(ano, mes, quantidade):
+    return [somar_meses(ano, mes, -i) for i in range(quantidade - 1, -1, -1)]
+
+# Texto digitado no padrão brasileiro ('1.234,56') -> centavos (123456).
+# Levanta ValueError se o texto não for um número.
+def converter_valor(texto):
+    try:
+        valor = Decimal(texto.strip().replace('.', '').replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {texto!r}")
+    if not valor.is_finite():
+        raise ValueError(f"Valor inválido: {texto!r}")
+    return int((valor * 100).to_integral_value(ROUND_HALF_UP))
+
+def _agora():
+    return datetime.now().strftime(FORMATO_DATA)
+
+# --- Lançamentos ---
+# Todos os valores são inteiros em centavos.
+# atualizar_caixas indica se o lançamento também movimenta os saldos das
+# contas; os que não movimentam ficam marcados com 'sem_caixa'.
+
+# Adiciona uma entrada ou despesa (tipo 'entradas' ou 'despesas'). 'data'
+# ('AAAA-MM-DD HH:MM:SS') é a do lançamento; por padrão, agora. 'origem'
+# marca lançamentos que não foram digitados (ORIGEM_EXTRATO).
+def adicionar_transacao(tipo, descricao, valor, observacoes, ano, mes, atualizar_caixas=True, data=None, origem=None):
+    if tipo not in ('entradas', 'despesas'):
+        raise ValueError(f"Tipo de transação inválido: {tipo}")
+    item = {'id': novo_id(), 'descricao': descricao, 'valor': valor, 'observacoes': observacoes, 'data': data or _agora()}
+    if origem is not None and origem != ORIGEM_MANUAL:
+        item['origem'] = origem
+    if not atualizar_caixas:
+        item['sem_caixa'] = True
+    registrar_operacoes(ano, mes, [{'op': 'adicionar', 'lista': tipo, 'item': item}])
+    return item
+
+def adicionar_investimento(investimento_nome, valor, observacoes, ano, mes, atualizar_caixas=True):
+    item = {'id': novo_id(), 'descricao': investimento_nome, 'valor': valor, 'observacoes': observacoes, 'data': _agora()}
+    if not atualizar_caixas:
+        item['sem_caixa'] = True
+    registrar_operacoes(ano, mes, [{'op': 'adicionar', 'lista': 'investimentos', 'item': item}])
+    return item
+
+# Transferência de 'valor' da conta 'de' para a conta 'para' no mês
+def _adicionar_movimento(descricao, de, para, valor, ano, mes):
+    item = {'id': novo_id(), 'descricao': descricao, 'de': de, 'para': para, 'valor': valor, 'data': _agora()}
+    registrar_operacoes(ano, mes, [{'op': 'adicionar', 'lista': 'movimentos', 'item': item}])
+    return item
+
+# Move 'valor' do caixa do investimento para a conta corrente. Um resgate
+# maior que o saldo do investimento no fim do mês é recusado; a interface
+# pede confirmação ao usuário e passa acima_do_saldo=True.
+def resgatar_investimento(investimento_nome, valor, ano, mes, acima_do_saldo=False):
+    if investimento_nome not in TIPOS_INVESTIMENTOS:
+        raise ValueError(f"Investimento inválido: {investimento_nome!r} (use {', '.join(TIPOS_INVESTIMENTOS)})")
+    if valor <= 0:
+        raise ValueError("O valor do resgate deve ser maior que zero.")
+    saldo = saldos_mes(ano, mes)['fechamento'].get(investimento_nome, 0)
+    if valor > saldo and not acima_do_saldo:
+        raise ValueError(f"O valor de resgate ({formatar_moeda(valor)}) é maior do que o saldo de {investimento_nome} ({formatar_moeda(saldo)}).")
+    return _adicionar_movimento(f"Resgate {investimento_nome}", investimento_nome, CONTA_CORRENTE, valor, ano, mes)
+
+# Valor de cada parcela, em centavos. Os centavos que sobram da divisão vão
+# para as primeiras parcelas, então a soma das parcelas é exatamente o total.
+def dividir_parcelas(valor_total, num_parcelas):
+    base, resto = divmod(valor_total, num_parcelas)
+    return [base + 1 if i < resto else base for i in range(num_parcelas)]
+
+# Registra a compra parcelada no mês de vencimento e lança uma despesa por
+# parcela, do mês de vencimento em diante, tudo em uma única transação.
+def adicionar_fatura_parcelada(cartao, descricao, valor_total, num_parcelas, ano_vencimento, mes_vencimento):
+    if num_parcelas <= 0:
+        raise ValueError("O número de parcelas deve ser maior que zero.")
+    parcelas = dividir_parcelas(valor_total, num_parcelas)
+    data_registro = _agora()
+    with TransacaoMeses() as transacao:
+        # Adicionar o item à lista de parcelamentos
+        dados = transacao.mes(ano_vencimento, mes_vencimento)
+        dados['cartoes_parcelados'].append({
+            'id': novo_id(),
+            'cartao': cartao,
+            'descricao': descricao,
+            'valor_total': valor_total,
+            'valor_parcela': parcelas[0],
+            'num_parcelas': num_parcelas,
+            'parcelas_restantes': num_parcelas,
+            'ano_vencimento': ano_vencimento,
+            'mes_vencimento': mes_vencimento,
+            'data_registro': data_registro
+        })
+
+        # Lançar a primeira parcela como despesa e projetar as parcelas futuras
+        for i in range(num_parcelas):
+            ano_futuro, mes_futuro = somar_meses(ano_vencimento, mes_vencimento, i)
+            dados_mes = transacao.mes(ano_futuro, mes_futuro)
+            dados_mes['despesas'].append({
+                'id': novo_id(),
+                'descricao': f"{cartao} - Parcela {i+1}/{num_parcelas}: {descricao}",
+                'valor': parcelas[i],
+                'observacoes': "", # Adicionado campo de observação vazio para a transação gerada
+                'data': data_registro
+            })
+
+# Exclui o lançamento com esse id; os saldos deixam de contá-lo a partir do mês
+def excluir_transacao(tipo, id_lancamento, ano, mes):
+    if tipo not in ('entradas', 'despesas', 'investimentos'):
+        raise ValueError(f"Tipo de transação inválido: {tipo}")
+    encontrado = buscar_lancamento(ano, mes, id_lancamento)
+    if encontrado is None or encontrado[0] != tipo:
+        raise ValueError("Transação não encontrada.")
+    registrar_operacoes(ano, mes, [{'op': 'remover', 'lista': tipo, 'filtro': {'id': id_lancamento}, 'todos': False}])
+    return encontrado[1]
+
+# Remove o registro da compra parcelada (as despesas já lançadas continuam)
+def excluir_fatura_parcelada(id_lancamento, ano, mes):
+    encontrado = buscar_lancamento(ano, mes, id_lancamento)
+    if encontrado is None or encontrado[0] != 'cartoes_parcelados':
+        raise ValueError("Fatura parcelada não encontrada.")
+    registrar_operacoes(ano, mes, [
+        {'op': 'remover', 'lista': 'cartoes_parcelados', 'filtro': {'id': id_lancamento}, 'todos': False},
+    ])
+    return encontrado[1]
+
+# Define o saldo atual da conta corrente no mês: guarda como saldo inicial do
+# mês o valor menos o que o mês já movimentou, e daí em diante os meses
+# seguintes partem dele
+def definir_conta_corrente(valor, ano, mes):
+    movimento = resumo_mensal(ano, mes)['fluxo']['movimento'].get(CONTA_CORRENTE, 0)
+    registrar_operacoes(ano, mes, [{'op': 'definir_saldo_inicial', 'conta': CONTA_CORRENTE, 'valor': valor - movimento}])
+
+# Define o saldo de um investimento; a diferença sai (ou volta) da conta corrente
+def alterar_saldo_investimento(investimento_nome, novo_valor, ano, mes):
+    diferenca = novo_valor - saldos_mes(ano, mes)['fechamento'].get(investimento_nome, 0)
+    if diferenca > 0:
+        _adicionar_movimento(f"Ajuste {investimento_nome}", CONTA_CORRENTE, investimento_nome, diferenca, ano, mes)
+    elif diferenca < 0:
+        _adicionar_movimento(f"Ajuste {investimento_nome}", investimento_nome, CONTA_CORRENTE, -diferenca, ano, mes)
+
+# --- Lançamentos repetidos ---
+# A impressão de uma entrada ou despesa junta o tipo, o dia, o valor, a
+# descrição e as observações normalizadas (sem acentos, maiúsculas e espaços
+# extras) e a origem. Dois lançamentos com a mesma impressão no mesmo mês
+# provavelmente são o mesmo: extrato importado de novo, botão clicado duas
+# vezes. As impressões de cada mês ({impressão: quantidade}) são calculadas
+# na primeira conferência e guardadas enquanto o mês não muda (não fazem parte
+# do resumo gravado, que fica pequeno); conferências seguidas, como as de uma
+# importação, não refazem as contas.
+ORIGEM_MANUAL = 'manual'
+ORIGEM_EXTRATO = 'extrato'
+
+# 'Café  padaria ' -> 'CAFE PADARIA'
+def normalizar_texto(texto):
+    texto = unicodedata.normalize('NFKD', texto)
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).upper().split())
+
+def impressao_lancamento(tipo, descricao, valor, observacoes, data, origem=None):
+    if origem == ORIGEM_EXTRATO:
+        # A descrição do extrato (nas observações) já identifica o lançamento;
+        # a categoria vem das regras, que podem mudar entre uma importação e outra
+        descricao = ''
+    texto = '|'.join((tipo, data[:10], str(valor), normalizar_texto(descricao), normalizar_texto(observacoes or ''), origem or ORIGEM_MANUAL))
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+
+def _impressao_item(tipo, item):
+    return impressao_lancamento(tipo, item['descricao'], item['valor'], item.get('observacoes'), item.get('data', ''), item.get('origem'))
+
+def _calcular_impressoes(dados):
+    impressoes = {}
+    for tipo in ('entradas', 'despesas'):
+        for item in dados[tipo]:
+            impressao = _impressao_item(tipo, item)
+            impressoes[impressao] = impressoes.get(impressao, 0) + 1
+    return impressoes
+
+# Acrescenta às impressões os lançamentos adicionados pelas operações.
+# Devolve False se alguma operação removeu lançamentos (é preciso recalcular).
+def _somar_impressoes(impressoes, operacoes):
+    for operacao in operacoes:
+        if operacao['op'] == 'remover':
+            return False
+        if operacao['op'] == 'adicionar' and operacao['lista'] in ('entradas', 'despesas'):
+            impressao = _impressao_item(operacao['lista'], operacao['item'])
+            impressoes[impressao] = impressoes.get(impressao, 0) + 1
+    return True
+
+_impressoes_calculadas = OrderedDict()  # (ano, mes) -> (dados, impressões)
+
+# Impressões dos lançamentos do mês (não devem ser modificadas por quem chama)
+def impressoes_mes(ano, mes):
+    chave = (ano, mes)
+    lote = _lote_atual()
+    with _lock_persistencia:
+        if lote is not None and chave in lote.meses:
+            dados = lote.meses[chave]
+        else:
+            dados = carregar_dados(ano, mes, somente_leitura=True)
+        return _derivado_do_mes(_impressoes_calculadas, chave, dados, _calcular_impressoes)
+
+# Quantos lançamentos do mês são iguais a este (0 = nenhum)
+def transacao_repetida(tipo, descricao, valor, observacoes, ano, mes, data=None, origem=None):
+    impressao = impressao_lancamento(tipo, descricao, valor, observacoes, data or _agora(), origem)
+    return impressoes_mes(ano, mes).get(impressao, 0)
+
+# --- Resumo de cada mês ---
+# Totais por tipo, despesas por categoria e por cartão e o fluxo do mês.
+# O resumo é gravado junto com o mês (na mesma gravação tudo-ou-nada), e
+# relatórios e comparativos entre meses leem só ele, sem carregar o mês
+# inteiro. Meses gravados antes dos resumos (ou alterados por fora) caem no
+# cálculo a partir dos dados; reconstruir_resumos() grava todos de novo.
+_resumos_calculados = OrderedDict()  # (ano, mes) -> (dados, resumo)
+
+def calcular_resumo(dados):
+    despesas = dados['despesas']
+    return {
+        'diario_seq': dados.get('diario_seq', 0),
+        'totais': {lista: sum(item['valor'] for item in dados[lista]) for lista in ('entradas', 'despesas', 'investimentos')},
+        'despesas_por_categoria': agrupar(despesas, 'descricao'),
+        'despesas_por_cartao': agrupar(despesas, chave_cartao(CARTOES)),
+        'fluxo': calcular_fluxo(dados),
+    }
+
+# Quanto o mês movimenta cada conta ('movimento': {conta: total}) e os saldos
+# iniciais informados no mês. Entradas somam à conta corrente, despesas
+# subtraem, investimentos passam da conta corrente para o investimento e os
+# movimentos passam de 'de' para 'para'. Lançamentos com 'sem_caixa' não contam.
+def calcular_fluxo(dados):
+    movimento = {}
+    def somar(conta, valor):
+        movimento[conta] = movimento.get(conta, 0) + valor
+    for item in dados['entradas']:
+        if not item.get('sem_caixa'):
+            somar(CONTA_CORRENTE, item['valor'])
+    for item in dados['despesas']:
+        if not item.get('sem_caixa'):
+            somar(CONTA_CORRENTE, -item['valor'])
+    for item in dados['investimentos']:
+        if not item.get('sem_caixa'):
+            somar(CONTA_CORRENTE, -item['valor'])
+            somar(item['descricao'], item['valor'])
+    for item in dados['movimentos']:
+        somar(item['de'], -item['valor'])
+        somar(item['para'], item['valor'])
+    return {'movimento': movimento, 'saldo_inicial': dict(dados.get('saldo_inicial', {}))}
+
+# O resumo gravado não inclui operações do diário posteriores a ele
+def _resumo_em_dia(ano, mes, resumo):
+    if diario.assinatura(ano, mes) is None:
+        return True
+    return all(registro['seq'] <= resumo['diario_seq'] for registro in diario.ler_registros(ano, mes))
+
+# Resumo do mês (não deve ser modificado por quem chama). Meses com
+# alterações em memória usam os dados; os demais, o resumo gravado.
+def resumo_mensal(ano, mes):
+    chave = (ano, mes)
+    lote = _lote_atual()
+    with _lock_persistencia:
+        dados = lote.meses.get(chave) if lote is not None else None
+        if dados is None:
+            dados = _meses_pendentes.get(chave)
+        if dados is None:
+            entrada = _cache_meses.get(chave)
+            if entrada is not None and entrada[0] == _assinatura_mes(ano, mes):
+                dados = entrada[1]
+        if dados is None:
+            resumo = armazenamento.ler_resumo(ano, mes)
+            # Resumos gravados antes do fluxo são refeitos a partir dos dados
+            if resumo is not None and 'fluxo' in resumo and _resumo_em_dia(ano, mes, resumo):
+                return resumo
+            dados = carregar_dados(ano, mes, somente_leitura=True)
+        return _derivado_do_mes(_resumos_calculados, chave, dados, calcular_resumo)
+
+# Regrava todos os meses com seus resumos. Devolve quantos meses foram gravados.
+def reconstruir_resumos():
+    gravar_pendentes()
+    meses = armazenamento.listar_meses()
+    with _lock_persistencia:
+        for ano, mes in meses:
+            _gravar_mes_agora(ano, mes, carregar_dados(ano, mes, somente_leitura=True))
+    return len(meses)
+
+# --- Saldos das contas ---
+# Os saldos de abertura e de fechamento de cada conta em cada mês saem dos
+# lançamentos: a abertura é o fechamento do mês anterior (ou o saldo inicial
+# informado no mês, se houver) e o fechamento é a abertura mais o movimento do
+# mês (ver calcular_fluxo). O livro guarda os saldos já calculados, mês a mês,
+# desde o primeiro mês existente; consultar um mês já calculado não lê nada.
+# Quando um mês M muda, só os saldos de M em diante são descartados e
+# recalculados na próxima consulta. Alterações feitas por fora do programa só
+# são percebidas quando o mês é relido (ou com invalidar_cache()).
+_livro_saldos = {'inicio': None, 'saldos': []}  # saldos: [(abertura, fechamento)] a partir do mês 'inicio'
+
+def _indice_mes(ano, mes):
+    return ano * 12 + mes - 1
+
+def _saldos_zerados():
+    return dict({nome: 0 for nome in TIPOS_INVESTIMENTOS}, **{CONTA_CORRENTE: 0})
+
+# Descarta os saldos de (ano, mes) em diante (todos, sem argumentos)
+def _invalidar_saldos(ano=None, mes=None):
+    with _lock_persistencia:
+        inicio = _livro_saldos['inicio']
+        if inicio is None:
+            return
+        if ano is None or _indice_mes(ano, mes) < inicio:
+            _livro_saldos['inicio'] = None
+            _livro_saldos['saldos'] = []
+        else:
+            del _livro_saldos['saldos'][_indice_mes(ano, mes) - inicio:]
+
+# Saldos de todas as contas no mês: {'abertura': {conta: valor},
+# 'fechamento': {conta: valor}} (não devem ser modificados por quem chama)
+def saldos_mes(ano, mes):
+    indice = _indice_mes(ano, mes)
+    lote = _lote_atual()
+    with _lock_persistencia:
+        if _livro_saldos['inicio'] is None:
+            meses = listar_meses()
+            if meses:
+                _livro_saldos['inicio'] = _indice_mes(*meses[0])
+        inicio = _livro_saldos['inicio']
+        if lote is not None and lote.meses:
+            # Um lote aberto enxerga as próprias alterações, que não entram no
+            # livro: a partir do primeiro mês do lote os saldos são só dele
+            primeiro = min(_indice_mes(*chave) for chave in lote.meses)
+            if inicio is None or primeiro < inicio:
+                inicio = primeiro
+            saldos = _livro_saldos['saldos'][:max(primeiro - inicio, 0)]
+        else:
+            saldos = _livro_saldos['saldos']
+        if inicio is None or indice < inicio:
+            zerados = _saldos_zerados()
+            return {'abertura': zerados, 'fechamento': zerados}
+        fluxos = None
+        while len(saldos) <= indice - inicio:
+            chave = divmod(inicio + len(saldos), 12)
+            chave = (chave[0], chave[1] + 1)
+            if fluxos is None:
+                # Os fluxos de todos os meses que faltam, numa consulta só
+                fluxos = fluxos_meses(chave, (ano, mes))
+            abertura = dict(saldos[-1][1]) if saldos else _saldos_zerados()
+            fechamento = abertura
+            fluxo = fluxos.get(chave)
+            if fluxo is not None:
+                abertura.update(fluxo['saldo_inicial'])
+                fechamento = dict(abertura)
+                for conta, valor in fluxo['movimento'].items():
+                    fechamento[conta] = fechamento.get(conta, 0) + valor
+            saldos.append((abertura, fechamento))
+        abertura, fechamento = saldos[indice - inicio]
+        return {'abertura': abertura, 'fechamento': fechamento}
+
+def _saldos_investimentos(saldos):
+    return {conta: valor for conta, valor in saldos.items() if conta != CONTA_CORRENTE}
+
+# --- Resumos e comparativos ---
+
+def get_investimentos_mes_anterior(ano, mes):
+    return _saldos_investimentos(saldos_mes(*mes_anterior(ano, mes))['fechamento'])
+
+# Totais e saldos de um mês. 'investimentos' e 'investimentos_anterior' são os
+# saldos por tipo de investimento no fim do mês e no fim do mês anterior;
+# 'conta_corrente_inicial' é o saldo da conta corrente no começo do mês.
+def resumo_mes(ano, mes):
+    resumo = resumo_mensal(ano, mes)
+    saldos = saldos_mes(ano, mes)
+    total_entradas = resumo['totais']['entradas']
+    total_despesas = resumo['totais']['despesas']
+    total_investimentos = resumo['totais']['investimentos']
+    conta_corrente = saldos['fechamento'][CONTA_CORRENTE]
+    investimentos = _saldos_investimentos(saldos['fechamento'])
+    caixa_investimentos = sum(investimentos.values())
+    return {
+        'total_entradas': total_entradas,
+        'total_despesas': total_despesas,
+        'total_investimentos': total_investimentos,
+        'saldo': total_entradas - total_despesas,
+        'pct_investimento': (total_investimentos / total_entradas) * 100 if total_entradas > 0 else 0.0,
+        'conta_corrente_inicial': saldos['abertura'][CONTA_CORRENTE],
+        'conta_corrente': conta_corrente,
+        'caixa_investimentos': caixa_investimentos,
+        'caixa_total': conta_corrente + caixa_investimentos,
+        'investimentos': investimentos,
+        'investimentos_anterior': get_investimentos_mes_anterior(ano, mes),
+    }
+
+# Total das despesas do mês por categoria (descrição): {categoria: total}
+def despesas_por_categoria(ano, mes):
+    return resumo_mensal(ano, mes)['despesas_por_categoria']
+
+# Despesas por categoria no mês e no mês anterior.
+# Devolve [(categoria, valor_atual, valor_anterior)] ordenado por categoria.
+def comparativo_despesas(ano, mes):
+    despesas_atual_dict = despesas_por_categoria(ano, mes)
+    despesas_anterior_dict = despesas_por_categoria(*mes_anterior(ano, mes))
+
+    todas_categorias = set(despesas_atual_dict.keys()) | set(despesas_anterior_dict.keys())
+    return [(categoria, despesas_atual_dict.get(categoria, 0), despesas_anterior_dict.get(categoria, 0))
+            for categoria in sorted(todas_categorias)]
+
+# Total gasto em cada cartão nos 'quantidade' meses terminados em (ano, mes).
+# Devolve (meses, {cartao: [valor por mês]}), com os meses do mais antigo ao
+# mais recente.
+def comparativo_cartoes(ano, mes, cartoes=CARTOES, quantidade=12):
+    meses_comparativos = meses_ate(ano, mes, quantidade)
+    valores_mensais = {}
+    if all(cartao in CARTOES for cartao in cartoes):
+        # Os resumos dos meses já têm o total de cada cartão
+        resumos = [resumo_mensal(a, m)['despesas_por_cartao'] for a, m in meses_comparativos]
+        for cartao in cartoes:
+            valores_mensais[cartao] = [resumo.get(cartao, 0) for resumo in resumos]
+        return meses_comparativos, valores_mensais
+    # Uma passada pelas despesas de cada mês soma todos os cartões
+    meses_dados = {(a, m): carregar_dados(a, m, somente_leitura=True) for a, m in meses_comparativos}
+    totais_meses = agrupar_meses(meses_dados, 'despesas', chave_cartao(cartoes))
+    for cartao in cartoes:
+        valores_mensais[cartao] = [totais_meses[chave].get(cartao, 0) for chave in meses_comparativos]
+    return meses_comparativos, valores_mensais
+
+if __name__ == '__main__':
+    # python orcamento_core.py reconstruir-resumos
+    if sys.argv[1:] == ['reconstruir-resumos']:
+        print(f"{reconstruir_resumos()} mês(es) regravado(s) com resumo em {DATA_DIR}")
+    else:
+        print("uso: python orcamento_core.py reconstruir-resumos", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,349 @@
+# Relatório mensal em PDF, sem interface gráfica.
+#
+# A geração tem duas etapas:
+#   dados_relatorio(ano, mes)  copia do núcleo tudo o que o relatório usa
+#                              (rápido; chamado por quem tem os dados)
+#   gerar_pdf(dados, caminho)  monta e grava o PDF só a partir dessa cópia
+# gerar_pdf não consulta o núcleo, então pode rodar em outra thread (ou
+# processo) enquanto o usuário continua lançando e trocando de mês: o
+# relatório sai com os dados do momento em que foi pedido.
+#
+# exportar_relatorios gera os relatórios de um intervalo de meses de uma vez,
+# um PDF por mês (em paralelo, um processo por núcleo) ou um único PDF com
+# sumário. Também pode ser usado pela linha de comando:
+#     python relatorio.py 2025-01 2025-12 [--combinado] [--processos N] [--destino DIR]
+import os
+import argparse
+import calendar
+import tempfile
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import orcamento_core as core
+from formatacao import formatar_data, formatar_moeda, formatar_moedas, formatar_percentual
+
+NOMES_MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+
+class RelatorioCancelado(Exception):
+    pass
+
+def caminho_relatorio(ano, mes):
+    return os.path.join(core.DATA_DIR, f"relatorio_orcamento_{ano}_{mes:02d}.pdf")
+
+# Cópia independente dos dados do relatório (só listas, dicionários, strings
+# e números: pode ser enviada para outro processo). 'comparativo' é o
+# resultado de core.comparativo_cartoes para o mês, se já tiver sido calculado.
+def dados_relatorio(ano, mes, comparativo=None):
+    dados = core.carregar_dados(ano, mes)
+    resumo = core.resumo_mes(ano, mes)
+    meses_cartoes, valores_cartoes = comparativo or core.comparativo_cartoes(ano, mes, core.CARTOES)
+    return {
+        'ano': ano,
+        'mes': mes,
+        'entradas': dados['entradas'],
+        'investimentos': dados['investimentos'],
+        'total_entradas': resumo['total_entradas'],
+        'total_despesas': resumo['total_despesas'],
+        'total_investimentos': resumo['total_investimentos'],
+        'conta_corrente': resumo['conta_corrente'],
+        'caixa_investimentos': resumo['caixa_investimentos'],
+        'caixa_total': resumo['caixa_total'],
+        'despesas_por_categoria': dict(core.despesas_por_categoria(ano, mes)),
+        'cartoes': list(core.CARTOES),
+        'meses_cartoes': list(meses_cartoes),
+        'valores_cartoes': {cartao: list(valores) for cartao, valores in valores_cartoes.items()},
+    }
+
+def _gravar_pdf(caminho, conteudo):
+    fd, caminho_tmp = tempfile.mkstemp(prefix='.tmp_', suffix='.pdf', dir=os.path.dirname(caminho) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(conteudo)
+        os.replace(caminho_tmp, caminho)
+    except BaseException:
+        try:
+            os.remove(caminho_tmp)
+        except OSError:
+            pass
+        raise
+
+def _verificador_cancelamento(cancelado):
+    def verificar_cancelamento():
+        if cancelado is not None and cancelado.is_set():
+            raise RelatorioCancelado()
+    return verificar_cancelamento
+
+def _estilos():
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='TitleStyle', fontSize=24, alignment=1, spaceAfter=20, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='HeadingStyle', fontSize=14, alignment=0, spaceAfter=10, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='SubheadingStyle', fontSize=12, alignment=0, spaceAfter=8, fontName='Helvetica-Bold'))
+    return styles
+
+# Conteúdo (story) do relatório de um mês; começa pelo título do mês
+def _conteudo_mes(dados, styles, verificar_cancelamento):
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+
+    story = []
+    story.append(Paragraph(f"Relatório de Orçamento - {NOMES_MESES[dados['mes'] - 1]}/{dados['ano']}", styles['TitleStyle']))
+    story.append(Spacer(1, 12))
+
+    # Adicionar resumo
+    total_entradas = dados['total_entradas']
+    total_despesas = dados['total_despesas']
+    total_investimentos = dados['total_investimentos']
+    total_saidas = total_despesas + total_investimentos
+    saldo_final = total_entradas - total_saidas
+
+    story.append(Paragraph("Resumo Geral", styles['HeadingStyle']))
+    story.append(Paragraph(f"Total de Entradas: {formatar_moeda(total_entradas)}"))
+    story.append(Paragraph(f"Total de Saídas: {formatar_moeda(total_saidas)}"))
+    story.append(Paragraph(f"Saldo Final: {formatar_moeda(saldo_final)}"))
+
+    # Adicionar saldos dos caixas
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("Saldos Atuais dos Caixas:", styles['SubheadingStyle']))
+    story.append(Paragraph(f"Saldo Conta Corrente: {formatar_moeda(dados['conta_corrente'])}"))
+    story.append(Paragraph(f"Saldo Total de Investimentos: {formatar_moeda(dados['caixa_investimentos'])}"))
+    story.append(Paragraph(f"Saldo Total (CC + Investimentos): {formatar_moeda(dados['caixa_total'])}"))
+    story.append(Spacer(1, 24))
+
+
+    # Tabela de Receitas
+    story.append(Paragraph("Detalhamento das Receitas", styles['HeadingStyle']))
+    data_receitas = [['Descrição', 'Valor (R$)', 'Observações', 'Data']]
+    for item, valor_str in zip(dados['entradas'], formatar_moedas([item['valor'] for item in dados['entradas']])):
+        data_formatada = formatar_data(item['data'])
+        data_receitas.append([item['descricao'], valor_str, item.get('observacoes', ''), data_formatada])
+    t_receitas = Table(data_receitas, colWidths=[2.5*inch, 1*inch, 2*inch, 1*inch])
+    t_receitas.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]))
+    story.append(t_receitas)
+    story.append(Spacer(1, 12))
+    verificar_cancelamento()
+
+    # Tabela de Despesas AGRUPADA por categoria
+    story.append(Paragraph("Resumo de Despesas por Categoria", styles['HeadingStyle']))
+    data_despesas = [['Categoria', 'Valor Total (R$)']]
+    categorias_ordenadas = sorted(dados['despesas_por_categoria'].items())
+    valores_str = formatar_moedas([valor for _, valor in categorias_ordenadas])
+    for (categoria, _), valor_str in zip(categorias_ordenadas, valores_str):
+        data_despesas.append([categoria, valor_str])
+
+    t_despesas = Table(data_despesas, colWidths=[4*inch, 2.5*inch])
+    t_despesas.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]))
+    story.append(t_despesas)
+    story.append(Spacer(1, 12))
+
+
+    # Tabela de Investimentos
+    story.append(Paragraph("Detalhamento dos Investimentos", styles['HeadingStyle']))
+    data_investimentos = [['Descrição', 'Valor (R$)', 'Observações', 'Data']]
+    for item, valor_str in zip(dados['investimentos'], formatar_moedas([item['valor'] for item in dados['investimentos']])):
+        data_formatada = formatar_data(item['data'])
+        data_investimentos.append([item['descricao'], valor_str, item.get('observacoes', ''), data_formatada])
+    t_investimentos = Table(data_investimentos, colWidths=[2.5*inch, 1*inch, 2*inch, 1*inch])
+    t_investimentos.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]))
+    story.append(t_investimentos)
+    story.append(Spacer(1, 24))
+    verificar_cancelamento()
+
+    # Comparativo de Faturas de Cartão de Crédito
+    story.append(Paragraph("Comparativo de Faturas de Cartão de Crédito", styles['HeadingStyle']))
+    cartoes = dados['cartoes']
+
+    # Valores mensais de cada cartão nos últimos 12 meses
+    meses_comparativos = dados['meses_cartoes']
+    valores_mensais = dados['valores_cartoes']
+
+    # Preparar a tabela com cabeçalhos
+    data_cartoes = [['Mês/Ano'] + cartoes]
+
+    # Preencher a tabela com os dados, incluindo variação
+    for i, (ano_comp, mes_comp) in enumerate(meses_comparativos):
+        row = [f"{calendar.month_name[mes_comp].capitalize()}/{ano_comp}"]
+
+        for cartao in cartoes:
+            valor_atual = valores_mensais[cartao][i]
+
+            if i > 0:
+                valor_anterior = valores_mensais[cartao][i-1]
+                variacao = valor_atual - valor_anterior
+                if valor_anterior > 0:
+                    pct_variacao = (variacao / valor_anterior) * 100
+                else:
+                    pct_variacao = 0 if valor_atual == 0 else 100
+
+                variacao_str = formatar_moeda(variacao)
+                pct_variacao_str = formatar_percentual(pct_variacao)
+
+                row.append(f"{formatar_moeda(valor_atual)} ({variacao_str}, {pct_variacao_str})")
+            else:
+                row.append(formatar_moeda(valor_atual))
+
+        data_cartoes.append(row)
+
+
+    t_cartoes = Table(data_cartoes, colWidths=[1.5*inch, 1*inch, 1*inch, 1*inch, 1*inch, 1*inch])
+    t_cartoes.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]))
+    story.append(t_cartoes)
+    return story
+
+# Monta o PDF a partir de dados_relatorio() e grava em 'caminho'.
+# 'progresso', se informado, é chamado com a fração já feita (0 a 1).
+# 'cancelado' é um threading.Event (ou qualquer objeto com is_set()): quando
+# ligado, a geração para com RelatorioCancelado e nenhum arquivo é gravado.
+def gerar_pdf(dados, caminho, progresso=None, cancelado=None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    verificar_cancelamento = _verificador_cancelamento(cancelado)
+    saida = BytesIO()
+    doc = SimpleDocTemplate(saida, pagesize=letter)
+    story = _conteudo_mes(dados, _estilos(), verificar_cancelamento)
+
+    # O reportlab avisa a cada bloco do story processado; o cancelamento é
+    # verificado nesses pontos
+    total_blocos = [len(story)]
+    def acompanhar(tipo, valor):
+        verificar_cancelamento()
+        if tipo == 'SIZE_EST':
+            total_blocos[0] = max(valor, 1)
+        elif tipo == 'PROGRESS' and progresso is not None:
+            progresso(min(valor / total_blocos[0], 1.0))
+    doc.setProgressCallBack(acompanhar)
+    doc.build(story)
+    verificar_cancelamento()
+    _gravar_pdf(caminho, saida.getvalue())
+    if progresso is not None:
+        progresso(1.0)
+    return caminho
+
+# Um único PDF com os relatórios de vários meses (lista de dados_relatorio()),
+# cada um começando em uma página nova, e um sumário na primeira página
+def gerar_pdf_combinado(lista_dados, caminho, titulo):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak
+    from reportlab.platypus.tableofcontents import TableOfContents
+
+    # O título de cada mês vira uma entrada do sumário, com a página em que caiu
+    class DocumentoComSumario(SimpleDocTemplate):
+        def afterFlowable(self, flowable):
+            if isinstance(flowable, Paragraph) and flowable.style.name == 'TitleStyle':
+                self.notify('TOCEntry', (0, flowable.getPlainText(), self.page))
+
+    styles = _estilos()
+    verificar_cancelamento = _verificador_cancelamento(None)
+    story = [Paragraph(titulo, styles['Title']), Paragraph("Sumário", styles['HeadingStyle']), TableOfContents()]
+    for dados in lista_dados:
+        story.append(PageBreak())
+        story.extend(_conteudo_mes(dados, styles, verificar_cancelamento))
+    saida = BytesIO()
+    # multiBuild repete a montagem até as páginas do sumário se estabilizarem
+    DocumentoComSumario(saida, pagesize=letter).multiBuild(story)
+    _gravar_pdf(caminho, saida.getvalue())
+    return caminho
+
+# --- Exportação em lote ---
+
+# Meses de 'inicio' a 'fim' ((ano, mes), inclusive), do mais antigo ao mais recente
+def meses_entre(inicio, fim):
+    quantidade = (fim[0] - inicio[0]) * 12 + (fim[1] - inicio[1]) + 1
+    if quantidade <= 0:
+        raise ValueError("O mês final deve ser igual ou posterior ao inicial.")
+    return core.meses_ate(fim[0], fim[1], quantidade)
+
+def caminho_relatorio_combinado(inicio, fim, destino=None):
+    nome = f"relatorio_orcamento_{inicio[0]}_{inicio[1]:02d}_a_{fim[0]}_{fim[1]:02d}.pdf"
+    return os.path.join(destino or core.DATA_DIR, nome)
+
+# Gera os relatórios de 'inicio' a 'fim' em 'destino' (padrão: DATA_DIR) e
+# devolve os caminhos gravados. Com combinado=True gera um único PDF com
+# sumário; senão um PDF por mês, em até 'processos' processos em paralelo
+# (padrão: um por núcleo). 'ao_concluir(caminho)' é chamado a cada arquivo
+# pronto.
+def exportar_relatorios(inicio, fim, destino=None, combinado=False, processos=None, ao_concluir=None):
+    meses = meses_entre(inicio, fim)
+    destino = destino or core.DATA_DIR
+    os.makedirs(destino, exist_ok=True)
+
+    # Os dados são lidos uma vez, aqui; cada mês recebe seu trecho dos 12
+    # meses do comparativo de cartões a partir de uma única consulta que
+    # cobre o intervalo inteiro, em vez de refazer janelas sobrepostas.
+    meses_janela, valores_janela = core.comparativo_cartoes(fim[0], fim[1], core.CARTOES, quantidade=len(meses) + 11)
+    lista_dados = []
+    for i, (ano, mes) in enumerate(meses):
+        trecho = slice(i, i + 12)
+        comparativo = (meses_janela[trecho], {cartao: valores[trecho] for cartao, valores in valores_janela.items()})
+        lista_dados.append(dados_relatorio(ano, mes, comparativo))
+
+    if combinado:
+        titulo = f"Relatórios de Orçamento - {NOMES_MESES[inicio[1] - 1]}/{inicio[0]} a {NOMES_MESES[fim[1] - 1]}/{fim[0]}"
+        caminhos = [gerar_pdf_combinado(lista_dados, caminho_relatorio_combinado(inicio, fim, destino), titulo)]
+        if ao_concluir is not None:
+            ao_concluir(caminhos[0])
+        return caminhos
+
+    tarefas = [(dados, os.path.join(destino, os.path.basename(caminho_relatorio(dados['ano'], dados['mes'])))) for dados in lista_dados]
+    caminhos = []
+    if processos == 1 or len(tarefas) == 1:
+        for dados, caminho in tarefas:
+            caminhos.append(gerar_pdf(dados, caminho))
+            if ao_concluir is not None:
+                ao_concluir(caminho)
+        return caminhos
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(gerar_pdf, dados, caminho) for dados, caminho in tarefas]
+        for futuro in as_completed(futuros):
+            caminhos.append(futuro.result())
+            if ao_concluir is not None:
+                ao_concluir(caminhos[-1])
+    return sorted(caminhos)
+
+def _ler_mes(texto):
+    try:
+        ano, mes = (int(parte) for parte in texto.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mês inválido: {texto!r} (use AAAA-MM)")
+    if not 1 <= mes <= 12:
+        raise argparse.ArgumentTypeError(f"mês inválido: {texto!r} (use AAAA-MM)")
+    return ano, mes
+
+# Imprime o caminho de cada arquivo assim que ele fica pronto
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Gera os relatórios em PDF de um intervalo de meses.")
+    parser.add_argument('inicio', type=_ler_mes, help="primeiro mês (AAAA-MM)")
+    parser.add_argument('fim', type=_ler_mes, help="último mês (AAAA-MM)")
+    parser.add_argument('--combinado', action='store_true', help="um único PDF com sumário em vez de um por mês")
+    parser.add_argument('--processos', type=int, default=None, help="processos em paralelo (padrão: um por núcleo)")
+    parser.add_argument('--destino', default=None, help="pasta dos PDFs (padrão: a pasta dos dados)")
+    args = parser.parse_args(argumentos)
+    try:
+        exportar_relatorios(args.inicio, args.fim, args.destino, args.combinado, args.processos,
+                            ao_concluir=lambda caminho: print(caminho, flush=True))
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == '__main__':
+    main()
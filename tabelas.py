@@ -0,0 +1,66 @@
+# Atualização incremental das Treeviews da interface.
+#
+# Para cada Treeview guardamos os valores exibidos em cada linha. O iid de cada
+# linha é a chave estável do registro (o id do lançamento, o nome do
+# investimento, a categoria). Uma atualização compara com a lista nova e só
+# insere, altera, move ou apaga as linhas que mudaram; seleção e rolagem são
+# mantidas.
+#
+# O módulo não importa tkinter: qualquer objeto com insert/move/item/delete
+# serve, o que permite testar a sincronização sem abrir janela.
+import orcamento_core as core
+
+linhas_treeview = {}
+
+# 'linhas' é a lista [(chave, valores)] na ordem em que deve aparecer
+def sincronizar_treeview(treeview, linhas):
+    estado = linhas_treeview.setdefault(str(treeview), {'valores': {}, 'ordem': []})
+    valores_exibidos = estado['valores']
+
+    novas_chaves = {chave for chave, _ in linhas}
+    removidas = [chave for chave in estado['ordem'] if chave not in novas_chaves]
+    if removidas:
+        treeview.delete(*removidas)
+        for chave in removidas:
+            del valores_exibidos[chave]
+    ordem_atual = [chave for chave in estado['ordem'] if chave in valores_exibidos]
+
+    # Percorre a lista nova junto com a ordem atual: linhas que já estão na
+    # posição certa não são tocadas.
+    posicionadas = set()
+    j = 0
+    for indice, (chave, valores) in enumerate(linhas):
+        while j < len(ordem_atual) and ordem_atual[j] in posicionadas:
+            j += 1
+        if chave in valores_exibidos:
+            if j < len(ordem_atual) and ordem_atual[j] == chave:
+                j += 1
+            else:
+                treeview.move(chave, '', indice)
+            if valores_exibidos[chave] != valores:
+                treeview.item(chave, values=valores)
+                valores_exibidos[chave] = valores
+        else:
+            treeview.insert('', indice, iid=chave, values=valores)
+            valores_exibidos[chave] = valores
+        posicionadas.add(chave)
+
+    estado['ordem'] = [chave for chave, _ in linhas]
+
+# --- Filtro e ordenação das tabelas de lançamentos ---
+ORDENACAO_LANCAMENTOS = {
+    'Descrição': lambda item: item['descricao'].casefold(),
+    'Valor': lambda item: item['valor'],
+    'Observações': lambda item: item.get('observacoes', '').casefold(),
+    'Data': lambda item: item.get('data', ''),
+}
+
+# 'filtro' já normalizado (core.normalizar_texto); 'coluna' None mantém a
+# ordem dos itens. A lista recebida não é modificada.
+def filtrar_e_ordenar(itens, filtro, coluna, decrescente):
+    visiveis = itens
+    if filtro:
+        visiveis = [item for item in visiveis if filtro in core.normalizar_texto(f"{item['descricao']} {item.get('observacoes', '')}")]
+    if coluna is not None:
+        visiveis = sorted(visiveis, key=ORDENACAO_LANCAMENTOS[coluna], reverse=decrescente)
+    return visiveis
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Os módulos ficam na raiz do repositório; a pasta de dados padrão ('data')
+# não deve ser criada nem usada pelos testes
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ['ORCAMENTO_DATA_DIR'] = tempfile.mkdtemp(prefix='orcamento_testes_')
+os.environ.pop('ORCAMENTO_DIARIO', None)
+
+import orcamento_core as core
+
+# Pasta de dados vazia para o teste, com o armazenamento JSON
+@pytest.fixture
+def pasta_dados(tmp_path):
+    core.configurar(str(tmp_path), 'json')
+    yield tmp_path
+    core.gravar_pendentes()
@@ -0,0 +1,111 @@
+import json
+import sqlite3
+import pytest
+import orcamento_core as core
+
+MESES = [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+
+@pytest.fixture
+def pasta_sqlite(tmp_path):
+    core.configurar(str(tmp_path), 'sqlite')
+    yield tmp_path
+    core.gravar_pendentes()
+    core.configurar(backend='json')
+
+# Lançamentos de todos os tipos em alguns meses, inclusive sem caixa,
+# movimentos entre contas e saldo inicial informado
+def _lancar():
+    core.adicionar_transacao('entradas', 'Salário', 500000, '', 2024, 11)
+    core.adicionar_transacao('despesas', 'Aluguel', 150000, '', 2024, 11)
+    core.adicionar_transacao('despesas', 'Presente', 9990, '', 2024, 12, atualizar_caixas=False)
+    core.adicionar_investimento('CDB', 100000, '', 2024, 12)
+    core.adicionar_investimento('Ações', 5000, '', 2024, 12, atualizar_caixas=False)
+    core.resgatar_investimento('CDB', 30000, 2025, 1)
+    core.definir_conta_corrente(400000, 2025, 2)
+    core.adicionar_transacao('despesas', 'Mercado', 45050, '', 2025, 2)
+
+def test_consultas_do_banco_iguais_aos_resumos(pasta_sqlite):
+    _lancar()
+    core.gravar_pendentes()
+    totais = core.armazenamento.totais_meses(MESES[0], MESES[-1])
+    fluxos = core.armazenamento.fluxos_meses(MESES[0], MESES[-1])
+    assert sorted(totais) == sorted(fluxos) == MESES
+    for chave in MESES:
+        dados = core.carregar_dados(*chave)
+        assert totais[chave] == core.calcular_resumo(dados)['totais']
+        assert fluxos[chave] == core.calcular_fluxo(dados)
+    assert core.armazenamento.totais_meses((2024, 12), (2025, 1)).keys() == {(2024, 12), (2025, 1)}
+
+def test_saldos_iguais_nos_dois_armazenamentos(tmp_path):
+    saldos = {}
+    for backend in ('json', 'sqlite'):
+        core.configurar(str(tmp_path / backend), backend)
+        _lancar()
+        core.gravar_pendentes()
+        core.invalidar_cache()
+        saldos[backend] = [core.saldos_mes(*chave) for chave in MESES + [(2025, 6)]]
+    core.configurar(backend='json')
+    assert saldos['json'] == saldos['sqlite']
+    assert saldos['sqlite'][-1]['fechamento'][core.CONTA_CORRENTE] == 400000 - 45050
+
+def test_consultas_usam_o_banco_e_as_alteracoes_em_memoria(pasta_sqlite, monkeypatch):
+    _lancar()
+    core.gravar_pendentes()
+    core.invalidar_cache()
+    resumo_mensal = core.resumo_mensal
+    lidos = []
+    def resumo_contado(ano, mes):
+        lidos.append((ano, mes))
+        return resumo_mensal(ano, mes)
+    monkeypatch.setattr(core, 'resumo_mensal', resumo_contado)
+    assert core.totais_meses(MESES[0], MESES[-1])[(2024, 11)]['despesas'] == 150000
+    assert lidos == []
+    # Um mês com alteração ainda não gravada sai dos dados em memória
+    core.adicionar_transacao('despesas', 'Farmácia', 1000, '', 2024, 11)
+    assert core.totais_meses(MESES[0], MESES[-1])[(2024, 11)]['despesas'] == 151000
+    assert lidos == [(2024, 11)]
+    assert core.saldos_mes(2025, 2)['fechamento'][core.CONTA_CORRENTE] == 400000 - 45050
+
+def test_banco_antigo_convertido(tmp_path):
+    caminho = tmp_path / 'orcamento.db'
+    conexao = sqlite3.connect(caminho)
+    with conexao:
+        conexao.execute('CREATE TABLE meses (ano INTEGER NOT NULL, mes INTEGER NOT NULL, versao INTEGER NOT NULL DEFAULT 0, extras TEXT, PRIMARY KEY (ano, mes))')
+        conexao.execute('''CREATE TABLE caixas (ano INTEGER NOT NULL, mes INTEGER NOT NULL, categoria TEXT NOT NULL,
+                           nome TEXT NOT NULL, valor REAL NOT NULL, PRIMARY KEY (ano, mes, categoria, nome))''')
+        # Mês no formato 2, com os caixas na tabela antiga
+        conexao.execute("INSERT INTO meses VALUES (2024, 12, 1, ?)", (json.dumps({'formato': 2}),))
+        conexao.executemany("INSERT INTO caixas VALUES (2024, 12, ?, ?, ?)",
+                            [('conta_corrente', '', 50000.0), ('investimentos', 'CDB', 1000.0)])
+        # Mês no formato 3 com movimentos e saldos iniciais dentro de extras
+        movimento = {'id': 'm1', 'descricao': 'Resgate CDB', 'de': 'CDB', 'para': 'conta_corrente', 'valor': 400, 'data': '2025-01-05 10:00:00'}
+        conexao.execute("INSERT INTO meses VALUES (2025, 1, 1, ?)",
+                        (json.dumps({'formato': 3, 'movimentos': [movimento], 'saldo_inicial': {'Ações': 700}}),))
+    conexao.close()
+
+    core.configurar(str(tmp_path), 'sqlite')
+    try:
+        conexao = sqlite3.connect(caminho)
+        assert conexao.execute('SELECT de, para, valor FROM movimentos').fetchall() == [('CDB', 'conta_corrente', 400)]
+        assert conexao.execute('SELECT conta, valor FROM saldos_iniciais').fetchall() == [('Ações', 700)]
+        assert conexao.execute('SELECT extras FROM meses WHERE ano = 2025').fetchone() == (json.dumps({'formato': 3}),)
+        assert conexao.execute('PRAGMA user_version').fetchone() == (1,)
+
+        dados = core.carregar_dados(2025, 1)
+        assert dados['movimentos'][0]['id'] == 'm1'
+        assert dados['saldo_inicial'] == {'Ações': 700}
+        # Ler o mês antigo o converte e regrava; sem meses antigos, a tabela de caixas some
+        assert core.carregar_dados(2024, 12)['saldo_inicial'] == {core.CONTA_CORRENTE: 50000, 'CDB': 1000}
+        assert conexao.execute("SELECT name FROM sqlite_master WHERE name = 'caixas'").fetchone() is None
+        fechamento = core.saldos_mes(2025, 1)['fechamento']
+        assert (fechamento[core.CONTA_CORRENTE], fechamento['CDB'], fechamento['Ações']) == (50400, 600, 700)
+        conexao.close()
+    finally:
+        core.configurar(backend='json')
+
+def test_banco_novo_sem_tabela_de_caixas(pasta_sqlite):
+    core.adicionar_transacao('despesas', 'Padaria', 1000, '', 2025, 3)
+    core.gravar_pendentes()
+    conexao = sqlite3.connect(pasta_sqlite / 'orcamento.db')
+    assert conexao.execute("SELECT name FROM sqlite_master WHERE name = 'caixas'").fetchone() is None
+    conexao.close()
@@ -0,0 +1,39 @@
+import pytest
+import orcamento_core as core
+
+@pytest.mark.parametrize('total, parcelas, esperado', [
+    (1000, 3, [334, 333, 333]),
+    (1001, 3, [334, 334, 333]),
+    (999, 3, [333, 333, 333]),
+    (5, 7, [1, 1, 1, 1, 1, 0, 0]),
+    (123456, 1, [123456]),
+])
+def test_dividir_parcelas(total, parcelas, esperado):
+    resultado = core.dividir_parcelas(total, parcelas)
+    assert resultado == esperado
+    assert sum(resultado) == total
+
+def test_fatura_parcelada_soma_o_total(pasta_dados):
+    core.adicionar_fatura_parcelada(core.CARTOES[0], 'Geladeira', 100000, 3, 2025, 11)
+    parcelas = [despesa['valor'] for ano, mes in [(2025, 11), (2025, 12), (2026, 1)]
+                for despesa in core.carregar_dados(ano, mes)['despesas']]
+    assert parcelas == [33334, 33333, 33333]
+
+# Dois lançamentos iguais: a exclusão é pelo id, não pelo valor
+def test_excluir_transacao_pelo_id(pasta_dados):
+    primeira = core.adicionar_transacao('despesas', 'Padaria', 1250, '', 2025, 3)
+    segunda = core.adicionar_transacao('despesas', 'Padaria', 1250, '', 2025, 3)
+    core.excluir_transacao('despesas', primeira['id'], 2025, 3)
+    assert [item['id'] for item in core.carregar_dados(2025, 3)['despesas']] == [segunda['id']]
+
+def test_migrar_para_centavos_uma_vez_so():
+    dados = core.normalizar_dados({'entradas': [{'descricao': 'x', 'valor': 0.1}],
+                                   'despesas': [{'descricao': 'y', 'valor': 19.99}],
+                                   'caixas': {'conta_corrente': 1.25, 'investimentos': {'CDB': 2.5}}})
+    assert core.migrar_para_centavos(dados)
+    assert dados['entradas'][0]['valor'] == 10
+    assert dados['despesas'][0]['valor'] == 1999
+    assert dados['caixas'] == {'conta_corrente': 125, 'investimentos': {'CDB': 250}}
+    assert dados['formato'] == core.FORMATO_CENTAVOS
+    assert not core.migrar_para_centavos(dados)
+    assert dados['entradas'][0]['valor'] == 10
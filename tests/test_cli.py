@@ -0,0 +1,53 @@
+import json
+import cli_orcamento
+import orcamento_core as core
+
+def _executar(capsys, pasta, *argumentos):
+    codigo = cli_orcamento.main(['--dados', str(pasta), '--backend', 'json', *argumentos])
+    return codigo, json.loads(capsys.readouterr().out)
+
+def _gravar_lote(pasta, linhas):
+    caminho = pasta / 'lote.jsonl'
+    caminho.write_text('\n'.join(json.dumps(linha) for linha in linhas) + '\n', encoding='utf-8')
+    return str(caminho)
+
+def test_transacao(pasta_dados, capsys):
+    codigo, saida = _executar(capsys, pasta_dados, 'transacao', '--tipo', 'despesas', '--descricao', 'Aluguel',
+                              '--valor', '1.500,00', '--mes', '2025-03')
+    assert codigo == 0 and saida['ok']
+    assert saida['resultado']['valor'] == 150000
+    assert (pasta_dados / 'data_orcamento_2025_03.json').exists()
+
+def test_lote_aplicado(pasta_dados, capsys):
+    arquivo = _gravar_lote(pasta_dados, [
+        {'comando': 'transacao', 'tipo': 'entradas', 'descricao': 'Salário', 'valor': '5.000,00', 'mes': '2025-03'},
+        {'comando': 'transacao', 'tipo': 'despesas', 'descricao': 'Aluguel', 'valor': 150000, 'mes': '2025-03'},
+        {'comando': 'transacao', 'tipo': 'despesas', 'descricao': 'Mercado', 'valor': '320,50', 'mes': '2025-04'},
+    ])
+    codigo, saida = _executar(capsys, pasta_dados, 'lote', arquivo)
+    assert codigo == 0 and saida['ok']
+    assert saida['resultado']['aplicados'] == 3
+    assert saida['resultado']['meses'] == ['2025-03', '2025-04']
+    assert [item['valor'] for item in core.carregar_dados(2025, 3)['despesas']] == [150000]
+    assert [item['valor'] for item in core.carregar_dados(2025, 4)['despesas']] == [32050]
+
+# Uma linha inválida desfaz o lote inteiro, inclusive as linhas anteriores
+def test_lote_desfeito_por_linha_invalida(pasta_dados, capsys):
+    core.adicionar_transacao('despesas', 'Padaria', 1000, '', 2025, 3)
+    core.gravar_pendentes()
+    arquivo = _gravar_lote(pasta_dados, [
+        {'comando': 'transacao', 'tipo': 'despesas', 'descricao': 'Aluguel', 'valor': '1.500,00', 'mes': '2025-03'},
+        {'comando': 'transacao', 'tipo': 'entradas', 'descricao': 'Salário', 'valor': '5.000,00', 'mes': '2025-05'},
+        {'comando': 'transacao', 'tipo': 'despesas', 'descricao': 'Mercado', 'mes': '2025-03'},
+    ])
+    codigo, saida = _executar(capsys, pasta_dados, 'lote', arquivo)
+    assert codigo == 1 and not saida['ok']
+    assert saida['erro'].startswith('Linha 3:')
+    assert [item['descricao'] for item in core.carregar_dados(2025, 3)['despesas']] == ['Padaria']
+    assert not (pasta_dados / 'data_orcamento_2025_05.json').exists()
+
+def test_lote_recusa_comando_fora_do_lote(pasta_dados, capsys):
+    arquivo = _gravar_lote(pasta_dados, [{'comando': 'exportar', 'arquivo': 'x.csv'}])
+    codigo, saida = _executar(capsys, pasta_dados, 'lote', arquivo)
+    assert codigo == 1
+    assert 'Comando inválido no lote' in saida['erro']
@@ -0,0 +1,65 @@
+import json
+import orcamento_core as core
+from diario import Diario
+
+def _despesa(descricao, valor):
+    return {'op': 'adicionar', 'lista': 'despesas', 'item': {'id': descricao, 'descricao': descricao, 'valor': valor}}
+
+def test_reaplicar_so_registros_depois_do_snapshot(tmp_path):
+    diario = Diario(str(tmp_path))
+    for seq, descricao in enumerate(['a', 'b', 'c'], 1):
+        diario.anexar(2025, 3, seq, [_despesa(descricao, seq * 100)], formato=core.FORMATO_DADOS)
+    dados = core.criar_dados_vazios()
+    dados['despesas'].append({'id': 'a', 'descricao': 'a', 'valor': 100})
+    dados['diario_seq'] = 1
+    diario.reaplicar(dados, 2025, 3)
+    assert [item['id'] for item in dados['despesas']] == ['a', 'b', 'c']
+    assert dados['diario_seq'] == 3
+
+def test_linha_incompleta_ignorada(tmp_path):
+    diario = Diario(str(tmp_path))
+    diario.anexar(2025, 3, 1, [_despesa('a', 100)])
+    with open(diario.caminho(2025, 3), 'a') as f:
+        f.write('{"seq": 2, "ops": [')  # queda no meio da escrita
+    diario.anexar(2025, 3, 2, [_despesa('b', 200)])
+    assert [registro['seq'] for registro in diario.ler_registros(2025, 3)] == [1, 2]
+
+def test_compactar_move_para_o_historico(tmp_path):
+    diario = Diario(str(tmp_path))
+    for seq in (1, 2, 3):
+        diario.anexar(2025, 3, seq, [_despesa(str(seq), seq)])
+    diario.compactar(2025, 3, 2)
+    assert [registro['seq'] for registro in diario.ler_registros(2025, 3)] == [3]
+    with open(diario.caminho_historico(2025, 3)) as f:
+        assert [json.loads(linha)['seq'] for linha in f] == [1, 2]
+    diario.compactar(2025, 3, 3)
+    assert diario.assinatura(2025, 3) is None
+    assert diario.listar_meses() == []
+
+def test_registros_antigos_em_reais_convertidos(pasta_dados):
+    core.diario.anexar(2025, 3, 1, [{'op': 'adicionar', 'lista': 'despesas', 'item': {'id': 'x', 'descricao': 'Padaria', 'valor': 12.5}}])
+    assert core.carregar_dados(2025, 3)['despesas'][0]['valor'] == 1250
+
+def test_modo_diario_reaplica_e_compacta(pasta_dados, monkeypatch):
+    monkeypatch.setattr(core, 'DIARIO_ATIVO', True)
+    core.adicionar_transacao('despesas', 'Padaria', 1000, '', 2025, 3)
+    core.adicionar_transacao('despesas', 'Mercado', 2000, '', 2025, 3)
+    # Só o diário foi escrito; o mês é refeito a partir dele ao ser relido
+    assert not (pasta_dados / 'data_orcamento_2025_03.json').exists()
+    assert [registro['seq'] for registro in core.diario.ler_registros(2025, 3)] == [1, 2]
+    core.invalidar_cache()
+    dados = core.carregar_dados(2025, 3)
+    assert [item['descricao'] for item in dados['despesas']] == ['Padaria', 'Mercado']
+    assert core.resumo_mensal(2025, 3)['totais']['despesas'] == 3000
+    assert core.listar_meses() == [(2025, 3)]
+
+    # Passado o limite, o mês é regravado e o diário compactado
+    monkeypatch.setattr(core, 'LIMITE_DIARIO_BYTES', 0)
+    core.adicionar_transacao('despesas', 'Farmácia', 3000, '', 2025, 3)
+    core.gravar_pendentes()
+    assert core.diario.assinatura(2025, 3) is None
+    gravado = json.loads((pasta_dados / 'data_orcamento_2025_03.json').read_text())
+    assert gravado['diario_seq'] == 3
+    assert [item['descricao'] for item in gravado['despesas']] == ['Padaria', 'Mercado', 'Farmácia']
+    core.invalidar_cache()
+    assert len(core.carregar_dados(2025, 3)['despesas']) == 3
@@ -0,0 +1,65 @@
+import pytest
+import importacao
+import orcamento_core as core
+
+@pytest.mark.parametrize('texto, centavos', [
+    ('1.234,56', 123456),
+    ('1,234.56', 123456),
+    ('-1234.56', -123456),
+    ('R$ 10,00', 1000),
+    ('1.234', 123400),
+    ('1,234', 123400),
+    ('1.234.567,89', 123456789),
+    ('1,234,567.89', 123456789),
+    ('12,5', 1250),
+    ('0.005', 1),
+    ('0,005', 1),
+    ('-0.250', -25),
+    (',500', 50),
+    ('-7', -700),
+])
+def test_converter_valor(texto, centavos):
+    assert importacao._converter_valor(texto) == centavos
+
+def test_converter_valor_ofx_sem_milhar():
+    assert importacao._converter_valor('-1.500', so_decimal=True) == -150
+    assert importacao._converter_valor('-1.50', so_decimal=True) == -150
+
+@pytest.mark.parametrize('texto', ['', 'abc', '1.2.3,4,5', 'NaN'])
+def test_converter_valor_invalido(texto):
+    with pytest.raises(ValueError):
+        importacao._converter_valor(texto)
+
+def test_csv_com_latin1_depois_do_primeiro_bloco(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    linhas = ['Data;Descrição;Valor'.encode('utf-8')]
+    linhas += [b'10/03/2025;PADARIA;-1,00'] * (importacao.TAMANHO_BLOCO // 20)
+    linhas.append('12/03/2025;PÃO DE AÇÚCAR;-1.234,56'.encode('latin-1'))
+    caminho.write_bytes(b'\r\n'.join(linhas) + b'\r\n')
+    assert importacao._codificacao(str(caminho)) == 'utf-8-sig'
+    lancamentos = list(importacao.ler_csv(str(caminho)))
+    assert not [l for l in lancamentos if 'erro' in l]
+    assert len(lancamentos) == len(linhas) - 1
+    assert lancamentos[-1]['descricao_original'] == 'PÃO DE AÇÚCAR'
+    assert lancamentos[-1]['valor'] == -123456
+    assert lancamentos[-1]['data'] == '2025-03-12 00:00:00'
+
+def test_csv_latin1(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_bytes('Data;Histórico;Valor\n01/02/2025;SALÁRIO;5.000,00\n'.encode('latin-1'))
+    assert importacao._codificacao(str(caminho)) == 'latin-1'
+    [lancamento] = importacao.ler_csv(str(caminho))
+    assert lancamento['descricao_original'] == 'SALÁRIO'
+    assert lancamento['valor'] == 500000
+
+def _extrato(pasta):
+    caminho = pasta / 'extrato.csv'
+    caminho.write_text('Data;Descrição;Valor\n01/02/2025;SALARIO;5.000,00\n03/02/2025;PADARIA;-12,50\n', encoding='utf-8')
+    return str(caminho)
+
+# Como na interface, a importação movimenta a conta corrente por padrão
+@pytest.mark.parametrize('atualizar_caixas, conta_corrente', [(True, 500000 - 1250), (False, 0)])
+def test_importar_movimenta_a_conta_corrente(pasta_dados, atualizar_caixas, conta_corrente):
+    resultado = importacao.importar(_extrato(pasta_dados), atualizar_caixas=atualizar_caixas)
+    assert resultado['total'] == 2
+    assert core.saldos_mes(2025, 2)['fechamento'].get(core.CONTA_CORRENTE, 0) == conta_corrente
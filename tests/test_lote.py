@@ -0,0 +1,103 @@
+import os
+import json
+import threading
+import pytest
+import orcamento_core as core
+
+def _descricoes(ano, mes, lista='despesas'):
+    return [item['descricao'] for item in core.carregar_dados(ano, mes)[lista]]
+
+def test_fatura_parcelada_grava_todos_os_meses(pasta_dados):
+    core.adicionar_fatura_parcelada(core.CARTOES[0], 'Geladeira', 100000, 3, 2025, 11)
+    core.gravar_pendentes()
+    core.invalidar_cache()
+    assert len(core.carregar_dados(2025, 11)['cartoes_parcelados']) == 1
+    for ano, mes in [(2025, 11), (2025, 12), (2026, 1)]:
+        assert len(_descricoes(ano, mes)) == 1
+        assert (pasta_dados / f'data_orcamento_{ano}_{mes:02d}.json').exists()
+
+def test_transacao_desfeita_se_ocorrer_erro(pasta_dados):
+    with pytest.raises(RuntimeError):
+        with core.TransacaoMeses() as transacao:
+            transacao.mes(2025, 3)['despesas'].append({'id': core.novo_id(), 'descricao': 'Mercado', 'valor': 100})
+            transacao.mes(2025, 4)['despesas'].append({'id': core.novo_id(), 'descricao': 'Mercado', 'valor': 100})
+            raise RuntimeError("falha no meio da transação")
+    assert _descricoes(2025, 3) == [] and _descricoes(2025, 4) == []
+    assert core.listar_meses() == []
+
+def test_lote_desfeito_se_ocorrer_erro(pasta_dados):
+    core.adicionar_transacao('despesas', 'Padaria', 1000, '', 2025, 3)
+    with pytest.raises(RuntimeError):
+        with core.LoteOperacoes():
+            core.adicionar_transacao('despesas', 'Mercado', 5000, '', 2025, 3)
+            core.adicionar_transacao('entradas', 'Salário', 90000, '', 2025, 4)
+            assert len(core.carregar_dados(2025, 3)['despesas']) == 2
+            raise RuntimeError("falha no meio do lote")
+    assert _descricoes(2025, 3) == ['Padaria']
+    assert core.carregar_dados(2025, 4)['entradas'] == []
+    core.gravar_pendentes()
+    assert not (pasta_dados / 'data_orcamento_2025_04.json').exists()
+    # O lote foi fechado: outro pode ser aberto na mesma thread
+    with core.LoteOperacoes():
+        core.adicionar_transacao('entradas', 'Salário', 90000, '', 2025, 4)
+    assert len(core.carregar_dados(2025, 4)['entradas']) == 1
+
+def _em_outra_thread(funcao):
+    thread = threading.Thread(target=funcao)
+    thread.start()
+    thread.join()
+
+def test_lote_nao_apaga_alteracao_de_outra_thread(pasta_dados):
+    with pytest.raises(core.ConflitoMeses):
+        with core.LoteOperacoes():
+            core.adicionar_transacao('despesas', 'Do lote', 1000, '', 2025, 3)
+            core.adicionar_transacao('despesas', 'Do lote', 1000, '', 2025, 4)
+            _em_outra_thread(lambda: core.adicionar_transacao('despesas', 'De fora', 2000, '', 2025, 3))
+    assert _descricoes(2025, 3) == ['De fora']
+    assert _descricoes(2025, 4) == []
+
+def test_transacao_nao_apaga_alteracao_de_outra_thread(pasta_dados):
+    with pytest.raises(core.ConflitoMeses):
+        with core.TransacaoMeses() as transacao:
+            transacao.mes(2025, 3)['despesas'].append({'id': core.novo_id(), 'descricao': 'Da transação', 'valor': 100})
+            _em_outra_thread(lambda: core.adicionar_transacao('despesas', 'De fora', 2000, '', 2025, 3))
+    assert _descricoes(2025, 3) == ['De fora']
+
+def test_lote_sem_conflito_em_outros_meses(pasta_dados):
+    with core.LoteOperacoes():
+        core.adicionar_transacao('despesas', 'Do lote', 1000, '', 2025, 3)
+        _em_outra_thread(lambda: core.adicionar_transacao('despesas', 'De fora', 2000, '', 2025, 5))
+    assert _descricoes(2025, 3) == ['Do lote']
+    assert _descricoes(2025, 5) == ['De fora']
+
+def test_gravacao_interrompida_concluida_ao_abrir(tmp_path, monkeypatch):
+    armazenamento = core.ArmazenamentoJSON(str(tmp_path))
+    armazenamento.gravar_meses({(2025, 3): {'versao': 1}, (2025, 4): {'versao': 1}})
+
+    # Queda depois da primeira troca da fase 2
+    trocar = os.replace
+    trocas = []
+    def trocar_e_cair(origem, destino):
+        if os.path.basename(destino).startswith('data_orcamento_'):
+            if trocas:
+                raise KeyboardInterrupt
+            trocas.append(destino)
+        trocar(origem, destino)
+    monkeypatch.setattr(os, 'replace', trocar_e_cair)
+    with pytest.raises(KeyboardInterrupt):
+        armazenamento.gravar_meses({(2025, 3): {'versao': 2}, (2025, 4): {'versao': 2}})
+    monkeypatch.setattr(os, 'replace', trocar)
+    versoes = [armazenamento.ler_mes(2025, mes)['versao'] for mes in (3, 4)]
+    assert sorted(versoes) == [1, 2]
+
+    # Ao abrir a pasta de novo, o resto do lote é trocado
+    armazenamento = core.ArmazenamentoJSON(str(tmp_path))
+    assert [armazenamento.ler_mes(2025, mes)['versao'] for mes in (3, 4)] == [2, 2]
+    assert not (tmp_path / core.ARQUIVO_TROCAS).exists()
+    assert not [nome for nome in os.listdir(tmp_path) if nome.startswith('.tmp_')]
+
+def test_gravacao_sem_queda_nao_deixa_lista_de_trocas(tmp_path):
+    armazenamento = core.ArmazenamentoJSON(str(tmp_path))
+    armazenamento.gravar_meses({(2025, 3): {'versao': 1}, (2025, 4): {'versao': 1}})
+    assert sorted(os.listdir(tmp_path)) == ['data_orcamento_2025_03.json', 'data_orcamento_2025_04.json']
+    assert json.loads((tmp_path / 'data_orcamento_2025_03.json').read_text()) == {'versao': 1}
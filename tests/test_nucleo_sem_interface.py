@@ -0,0 +1,28 @@
+import os
+import sys
+import subprocess
+from conftest import RAIZ
+
+# O núcleo e a linha de comando funcionam sem Tk, matplotlib e reportlab:
+# num processo em que importar qualquer um deles falha, os módulos são
+# importados e um lançamento é gravado e resumido
+CODIGO = '''
+import sys
+
+class Bloqueio:
+    def find_spec(self, nome, caminho=None, alvo=None):
+        if nome.split('.')[0] in ('tkinter', '_tkinter', 'matplotlib', 'reportlab'):
+            raise ImportError(f"{nome} indisponível neste teste")
+
+sys.meta_path.insert(0, Bloqueio())
+import orcamento_core as core
+import cli_orcamento
+core.adicionar_transacao('despesas', 'Padaria', 1250, '', 2025, 3)
+core.gravar_pendentes()
+assert core.resumo_mes(2025, 3)['total_despesas'] == 1250
+'''
+
+def test_nucleo_importavel_sem_interface(tmp_path):
+    ambiente = dict(os.environ, ORCAMENTO_DATA_DIR=str(tmp_path), ORCAMENTO_BACKEND='json')
+    processo = subprocess.run([sys.executable, '-c', CODIGO], cwd=RAIZ, env=ambiente, capture_output=True, text=True)
+    assert processo.returncode == 0, processo.stderr
@@ -0,0 +1,92 @@
+import json
+import pytest
+import orcamento_core as core
+
+# Mês gravado antes dos centavos e dos saldos derivados: valores em reais e
+# os caixas guardados no arquivo
+def _gravar_mes_antigo(pasta, ano, mes):
+    antigo = {
+        'entradas': [{'descricao': 'Salário', 'valor': 1000.1, 'observacoes': '', 'data': '2024-05-05 10:00:00'}],
+        'despesas': [{'descricao': 'Padaria', 'valor': 250.5, 'observacoes': '', 'data': '2024-05-06 10:00:00'}],
+        'investimentos': [{'descricao': 'CDB', 'valor': 100.0, 'observacoes': '', 'data': '2024-05-07 10:00:00'}],
+        'cartoes_parcelados': [],
+        'caixas': {'conta_corrente': 5000.55, 'investimentos': {'CDB': 300.0, 'Ações': 0}},
+    }
+    (pasta / f'data_orcamento_{ano}_{mes:02d}.json').write_text(json.dumps(antigo))
+
+def test_migracao_de_mes_antigo(pasta_dados):
+    _gravar_mes_antigo(pasta_dados, 2024, 5)
+    dados = core.carregar_dados(2024, 5)
+    assert dados['formato'] == core.FORMATO_DADOS
+    assert 'caixas' not in dados
+    assert [item['valor'] for item in dados['entradas'] + dados['despesas'] + dados['investimentos']] == [100010, 25050, 10000]
+    assert all('id' in item for item in dados['entradas'] + dados['despesas'] + dados['investimentos'])
+    # Saldo inicial = saldo guardado menos o movimento do mês; contas zeradas ficam de fora
+    assert dados['saldo_inicial'] == {core.CONTA_CORRENTE: 500055 - (100010 - 25050 - 10000), 'CDB': 20000}
+    # O fechamento do mês continua igual aos caixas guardados
+    fechamento = core.saldos_mes(2024, 5)['fechamento']
+    assert fechamento[core.CONTA_CORRENTE] == 500055
+    assert fechamento['CDB'] == 30000
+    # O mês convertido é regravado no formato novo
+    gravado = json.loads((pasta_dados / 'data_orcamento_2024_05.json').read_text())
+    assert gravado['formato'] == core.FORMATO_DADOS
+    assert 'caixas' not in gravado
+
+def test_migrar_saldos_uma_vez_so():
+    dados = core.normalizar_dados({'entradas': [{'descricao': 'x', 'valor': 10}],
+                                   'caixas': {'conta_corrente': 125, 'investimentos': {'CDB': 250}},
+                                   'formato': core.FORMATO_CENTAVOS})
+    assert core.migrar_saldos(dados)
+    assert dados['saldo_inicial'] == {core.CONTA_CORRENTE: 115, 'CDB': 250}
+    assert not core.migrar_saldos(dados)
+
+def test_saldos_recalculados_depois_de_alterar_mes_anterior(pasta_dados):
+    core.adicionar_transacao('entradas', 'Salário', 100000, '', 2025, 1)
+    core.adicionar_transacao('despesas', 'Aluguel', 30000, '', 2025, 2)
+    core.adicionar_transacao('despesas', 'Mercado', 10000, '', 2025, 3)
+    assert core.saldos_mes(2025, 3)['fechamento'][core.CONTA_CORRENTE] == 60000
+    assert core.saldos_mes(2025, 4)['abertura'][core.CONTA_CORRENTE] == 60000
+
+    # Alterar janeiro muda os saldos dos meses seguintes, já calculados
+    despesa = core.adicionar_transacao('despesas', 'Farmácia', 5000, '', 2025, 1)
+    assert core.saldos_mes(2025, 1)['fechamento'][core.CONTA_CORRENTE] == 95000
+    assert core.saldos_mes(2025, 3)['fechamento'][core.CONTA_CORRENTE] == 55000
+    core.excluir_transacao('despesas', despesa['id'], 2025, 1)
+    assert core.saldos_mes(2025, 3)['fechamento'][core.CONTA_CORRENTE] == 60000
+
+    # Um saldo informado em fevereiro vale dali em diante
+    core.definir_conta_corrente(20000, 2025, 2)
+    assert core.saldos_mes(2025, 1)['fechamento'][core.CONTA_CORRENTE] == 100000
+    assert core.saldos_mes(2025, 2)['fechamento'][core.CONTA_CORRENTE] == 20000
+    assert core.saldos_mes(2025, 3)['fechamento'][core.CONTA_CORRENTE] == 10000
+
+    # Um mês criado antes do primeiro também entra no livro
+    core.adicionar_transacao('entradas', 'Bônus', 7000, '', 2024, 12)
+    assert core.saldos_mes(2025, 1)['fechamento'][core.CONTA_CORRENTE] == 107000
+    assert core.saldos_mes(2025, 3)['fechamento'][core.CONTA_CORRENTE] == 10000
+
+def test_investimento_passa_para_os_meses_seguintes(pasta_dados):
+    core.adicionar_investimento('CDB', 50000, '', 2025, 1)
+    assert core.saldos_mes(2025, 4)['abertura']['CDB'] == 50000
+    core.resgatar_investimento('CDB', 20000, 2025, 3)
+    assert core.saldos_mes(2025, 4)['abertura']['CDB'] == 30000
+    assert core.saldos_mes(2025, 4)['abertura'][core.CONTA_CORRENTE] == -30000
+
+@pytest.mark.parametrize('nome, valor', [
+    ('Poupança', 1000),
+    (core.CONTA_CORRENTE, 1000),
+    ('CDB', 0),
+    ('CDB', -500),
+    ('CDB', 50001),
+])
+def test_resgate_invalido_recusado(pasta_dados, nome, valor):
+    core.adicionar_investimento('CDB', 50000, '', 2025, 1)
+    with pytest.raises(ValueError):
+        core.resgatar_investimento(nome, valor, 2025, 2)
+    assert core.saldos_mes(2025, 2)['fechamento']['CDB'] == 50000
+
+# Confirmado na interface, o resgate pode passar do saldo
+def test_resgate_acima_do_saldo_confirmado(pasta_dados):
+    core.adicionar_investimento('CDB', 50000, '', 2025, 1)
+    core.resgatar_investimento('CDB', 60000, 2025, 2, acima_do_saldo=True)
+    assert core.saldos_mes(2025, 2)['fechamento']['CDB'] == -10000
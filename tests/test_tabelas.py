@@ -0,0 +1,110 @@
+import pytest
+import tabelas
+from tabelas import sincronizar_treeview, filtrar_e_ordenar
+
+# Treeview de mentira: guarda as linhas em ordem e conta as operações
+class TreeviewFalsa:
+    def __init__(self, nome):
+        self.nome = nome
+        self.ordem = []
+        self.valores = {}
+        self.operacoes = []
+
+    def __str__(self):
+        return self.nome
+
+    def insert(self, pai, indice, iid, values):
+        assert iid not in self.valores
+        self.ordem.insert(indice, iid)
+        self.valores[iid] = values
+        self.operacoes.append(('insert', iid))
+
+    def move(self, iid, pai, indice):
+        self.ordem.remove(iid)
+        self.ordem.insert(indice, iid)
+        self.operacoes.append(('move', iid))
+
+    def item(self, iid, values):
+        self.valores[iid] = values
+        self.operacoes.append(('item', iid))
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.ordem.remove(iid)
+            del self.valores[iid]
+            self.operacoes.append(('delete', iid))
+
+# Cada teste começa sem nenhuma Treeview registrada
+@pytest.fixture(autouse=True)
+def limpar_estado():
+    tabelas.linhas_treeview.clear()
+    yield
+    tabelas.linhas_treeview.clear()
+
+def _sincronizar_e_conferir(treeview, linhas):
+    treeview.operacoes = []
+    sincronizar_treeview(treeview, linhas)
+    assert treeview.ordem == [chave for chave, _ in linhas]
+    assert treeview.valores == dict(linhas)
+    return treeview.operacoes
+
+def test_primeira_carga_insere_em_ordem():
+    treeview = TreeviewFalsa('.t1')
+    operacoes = _sincronizar_e_conferir(treeview, [('a', (1,)), ('b', (2,)), ('c', (3,))])
+    assert operacoes == [('insert', 'a'), ('insert', 'b'), ('insert', 'c')]
+
+def test_sem_mudancas_nao_toca_a_treeview():
+    treeview = TreeviewFalsa('.t2')
+    linhas = [('a', (1,)), ('b', (2,)), ('c', (3,))]
+    sincronizar_treeview(treeview, linhas)
+    assert _sincronizar_e_conferir(treeview, list(linhas)) == []
+
+def test_so_as_linhas_alteradas_mudam():
+    treeview = TreeviewFalsa('.t3')
+    sincronizar_treeview(treeview, [('a', (1,)), ('b', (2,)), ('c', (3,)), ('d', (4,))])
+    operacoes = _sincronizar_e_conferir(treeview, [('a', (1,)), ('c', (30,)), ('e', (5,)), ('d', (4,))])
+    assert sorted(operacoes) == [('delete', 'b'), ('insert', 'e'), ('item', 'c')]
+
+@pytest.mark.parametrize('nova_ordem', [
+    ['d', 'a', 'b', 'c'],
+    ['b', 'c', 'd', 'a'],
+    ['d', 'c', 'b', 'a'],
+    ['a', 'c', 'b', 'd'],
+])
+def test_reordenacao(nova_ordem):
+    treeview = TreeviewFalsa('.t4')
+    sincronizar_treeview(treeview, [(chave, (chave,)) for chave in 'abcd'])
+    operacoes = _sincronizar_e_conferir(treeview, [(chave, (chave,)) for chave in nova_ordem])
+    assert all(tipo == 'move' for tipo, _ in operacoes)
+
+def test_treeviews_separadas():
+    primeira, segunda = TreeviewFalsa('.t5'), TreeviewFalsa('.t6')
+    sincronizar_treeview(primeira, [('a', (1,))])
+    _sincronizar_e_conferir(segunda, [('a', (2,)), ('b', (3,))])
+    assert primeira.valores == {'a': (1,)}
+
+ITENS = [
+    {'id': 1, 'descricao': 'Padaria', 'valor': 1250, 'observacoes': 'pão de queijo', 'data': '2024-05-03'},
+    {'id': 2, 'descricao': 'Farmácia', 'valor': 4990, 'data': '2024-05-01'},
+    {'id': 3, 'descricao': 'açougue', 'valor': 7800, 'observacoes': '', 'data': '2024-05-02'},
+]
+
+def _ids(itens):
+    return [item['id'] for item in itens]
+
+def test_sem_filtro_nem_ordem_devolve_os_itens():
+    assert filtrar_e_ordenar(ITENS, '', None, False) is ITENS
+
+def test_filtro_ignora_acentos_e_caixa_e_olha_as_observacoes():
+    assert _ids(filtrar_e_ordenar(ITENS, 'ACOUGUE', None, False)) == [3]
+    assert _ids(filtrar_e_ordenar(ITENS, 'PAO DE', None, False)) == [1]
+
+@pytest.mark.parametrize('coluna, decrescente, esperado', [
+    ('Descrição', False, [3, 2, 1]),
+    ('Valor', True, [3, 2, 1]),
+    ('Observações', False, [2, 3, 1]),
+    ('Data', False, [2, 3, 1]),
+])
+def test_ordenacao_por_coluna(coluna, decrescente, esperado):
+    assert _ids(filtrar_e_ordenar(ITENS, '', coluna, decrescente)) == esperado
+    assert _ids(ITENS) == [1, 2, 3]